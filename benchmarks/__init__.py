@@ -0,0 +1 @@
+"""Benchmarks and local stand-ins for the external systems used by the process"""
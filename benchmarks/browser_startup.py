@@ -0,0 +1,96 @@
+"""
+Benchmark of the Chrome launch profiles: cold start to logged in, and the OPUS page load after it.
+
+Every run launches a new headless Chrome with the profile, logs in to the OPUS mock and opens
+'Bilag og fakturaer'. The first 'fast' run starts with an empty disk cache, later runs reuse it.
+
+Usage:
+    python -m benchmarks.browser_startup --profiles default eager fast --runs 5 --json results.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.opus_mock import OpusMock
+
+
+def _median(values: list[float]) -> float:
+    return round(statistics.median(values), 3)
+
+
+def run_profile(profile: str, runs: int) -> dict:
+    """Launch, log in and navigate runs times with the profile and return the median timings."""
+
+    # pylint: disable=import-outside-toplevel
+    from helpers import outlay_ticket_creation
+
+    launch, login, navigate = [], [], []
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        browser = outlay_ticket_creation.launch_browser(headless=True, profile=profile)
+        launched = time.perf_counter()
+
+        try:
+            outlay_ticket_creation.login_to_opus(browser, "benchmark", "benchmark")
+            logged_in = time.perf_counter()
+
+            outlay_ticket_creation.navigate_to_opus(browser)
+            navigated = time.perf_counter()
+
+        finally:
+            browser.quit()
+
+        launch.append(launched - start)
+        login.append(logged_in - launched)
+        navigate.append(navigated - logged_in)
+
+    return {
+        "profile": profile,
+        "runs": runs,
+        "launch_seconds": _median(launch),
+        "login_seconds": _median(login),
+        "cold_start_to_logged_in_seconds": _median([a + b for a, b in zip(launch, login)]),
+        "navigate_seconds": _median(navigate),
+    }
+
+
+def main_cli(argv: list[str] | None = None) -> int:
+    """Command line entry point."""
+
+    # pylint: disable=import-outside-toplevel
+    from helpers import chrome_profiles, config
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", default=list(chrome_profiles.PROFILES), choices=list(chrome_profiles.PROFILES))
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--json", dest="json_path", help="write the results to this file")
+    args = parser.parse_args(argv)
+
+    config.CHROME_CACHE_DIR = os.path.join(tempfile.mkdtemp(prefix="egenbefordring_chrome_"), "cache")
+
+    results = []
+
+    with OpusMock() as opus:
+        config.OPUS_PORTAL_URL = opus.portal_url
+
+        for profile in args.profiles:
+            result = run_profile(profile, args.runs)
+            results.append(result)
+
+            print(json.dumps(result))
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,225 @@
+"""
+Synthetic egenbefordring sheets for the benchmarks.
+
+Rows use the same columns as finalize_process.COLUMNS and mimic the OS2Forms export:
+python-literal 'test' date lists, attachment strings, school list entries with institution codes,
+and the mix of beløb formats the case workers produce.
+
+Usage:
+    python -m benchmarks.dataset --rows 100000 --out egenbefordring_100k.xlsx
+"""
+
+import argparse
+import random
+import sys
+from collections.abc import Callable, Iterator
+from datetime import date, timedelta
+from io import BytesIO
+
+from openpyxl import Workbook
+
+from processes.finalize_process import COLUMNS
+
+SCHOOLS = [
+    "Langagerskolen (751090#1830)",
+    "Langagerskolen, afd. 751090#2471",
+    "Stensagerskolen (751903#591)",
+    "Stensagerskolen - 751903#2521",
+    "Tranbjergskolen (751012#1201)",
+    "Skåde Skole (751045#1390)",
+    "Katrinebjergskolen (751022#1240)",
+    "Elev Skole (751008#1123)",
+    "Bakkegårdsskolen (751003#1103)",
+    "Engdalskolen (751011#1183)",
+]
+
+OTHER_SCHOOLS = ["Friskolen i Kolt", "Rudolf Steiner-Skolen", "Dagtilbud Åbyhøj", "Efterskolen ved Aarhus"]
+
+FIRST_NAMES = ["Anna", "Oliver", "Freja", "Noah", "Ida", "William", "Clara", "Karl", "Alma", "Emil", "Søren", "Aske", "Æbla", "Østen"]
+LAST_NAMES = ["Jensen", "Nielsen", "Hansen", "Pedersen", "Andersen", "Christensen", "Larsen", "Sørensen", "Møller", "Kjær"]
+
+COMMENTS = ["Beløb rettet efter kontrol", "Kun halv periode", "Kvittering eftersendt", "Godkendt jf. aftale med skolen"]
+
+SIZES = (1_000, 10_000, 100_000, 500_000)
+
+
+def _cpr(rnd: random.Random) -> str:
+    birthday = date(2008, 1, 1) + timedelta(days=rnd.randint(0, 6000))
+
+    return f"{birthday:%d%m%y}{rnd.randint(0, 9999):04d}"
+
+
+def _school_days(rnd: random.Random) -> list[date]:
+    """Weekdays over one or two consecutive months, as claimed in the form."""
+
+    year = rnd.choice((2024, 2025))
+    month = rnd.randint(1, 12)
+    start = date(year, month, 1)
+
+    span = 28 if rnd.random() < 0.8 else 56
+    days = [start + timedelta(days=d) for d in range(span)]
+
+    weekdays = [d for d in days if d.weekday() < 5]
+
+    return sorted(rnd.sample(weekdays, k=rnd.randint(1, len(weekdays))))
+
+
+def _beloeb(rnd: random.Random, amount: float):
+    """An amount in one of the formats found in the sheets."""
+
+    style = rnd.random()
+
+    if style < 0.6:
+        return amount
+
+    if style < 0.75:
+        return round(amount)
+
+    if style < 0.85:
+        return f"{amount:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+    if style < 0.95:
+        return f"{amount:.2f}".replace(".", ",")
+
+    return f"{amount:.1f}"
+
+
+def _godkendt(rnd: random.Random) -> str | None:
+    style = rnd.random()
+
+    if style < 0.85:
+        return "x"
+
+    if style < 0.9:
+        return "X"
+
+    if style < 0.97:
+        return None
+
+    return "nej"
+
+
+def iter_rows(count: int, attachment_url: Callable[[str], str] | None = None, seed: int = 0) -> Iterator[dict]:
+    """
+    Yield sheet rows one at a time.
+
+    attachment_url is called with the form uuid and returns the receipt URL for that row.
+    """
+
+    rnd = random.Random(seed)
+
+    if attachment_url is None:
+        def attachment_url(form_uuid):
+            return f"https://selvbetjening.aarhuskommune.dk/system/files/webform/egenbefordring/{form_uuid}/kvittering.pdf"
+
+    for i in range(count):
+        form_uuid = f"{rnd.getrandbits(32):08x}-{i >> 16 & 0xffff:04x}-4{i & 0xfff:03x}-8000-{rnd.getrandbits(48):012x}"
+
+        days = _school_days(rnd)
+        km_to, km_from = rnd.randint(3, 25), rnd.randint(3, 25)
+        takst = 3.79
+
+        amount = round(len(days) * (km_to + km_from) * takst, 2)
+
+        other_school = rnd.random() < 0.1
+        other_recipient = rnd.random() < 0.05
+        changed_amount = rnd.random() < 0.1
+
+        godkendt = _godkendt(rnd)
+
+        if rnd.random() < 0.97:
+            attachments = str([{
+                "url": attachment_url(form_uuid),
+                "description": "",
+                "filename": "kvittering.pdf",
+                "mime": "application/pdf",
+            }])
+
+        else:
+            attachments = ""
+
+        row = dict.fromkeys(COLUMNS)
+        row.update({
+            "adresse1": f"{rnd.choice(LAST_NAMES)}svej {rnd.randint(1, 200)}, 8{rnd.randint(0, 399):03d} Aarhus",
+            "anden_beloebsmodtager_": "Ja" if other_recipient else "Nej",
+            "antal_dage": len(days),
+            "antal_km_i_alt": len(days) * (km_to + km_from),
+            "barnets_navn": f"{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}",
+            "beloeb_i_alt": _beloeb(rnd, amount),
+            "cpr_barnet": _cpr(rnd),
+            "cpr_nr": _cpr(rnd),
+            "cpr_nr_paaanden": _cpr(rnd) if other_recipient else None,
+            "jeg_erklaerer_paa_tro_og_love_at_de_oplysninger_jeg_har_givet_er": "Ja",
+            "jeg_er_indforstaaet_med_at_aarhus_kommune_behandler_angivne_oply": "Ja",
+            "kilometer_i_alt_fra_skole": km_from * len(days),
+            "kilometer_i_alt_til_skole": km_to * len(days),
+            "kunne_du_ikke_finde_skole_eller_dagtilbud_paa_listen_": "Ja" if other_school else None,
+            "navn_paa_anden_beloebsmodtager": f"{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}" if other_recipient else None,
+            "navn_paa_beloebsmodtager": f"{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}",
+            "skoleliste": None if other_school else rnd.choice(SCHOOLS),
+            "skriv_dit_barns_skole_eller_dagtilbud": rnd.choice(OTHER_SCHOOLS) if other_school else None,
+            "takst": takst,
+            "computed_twig_tjek_for_ugenummer": ", ".join(sorted({str(d.isocalendar().week) for d in days})),
+            "modtagelsesdato": (days[-1] + timedelta(days=rnd.randint(1, 30))).isoformat(),
+            "aendret_beloeb_i_alt": _beloeb(rnd, round(amount * rnd.uniform(0.5, 1), 2)) if changed_amount else None,
+            "godkendt": godkendt,
+            "godkendt_af": f"AZ{rnd.randint(10000, 99999)}" if godkendt else None,
+            "evt_kommentar": rnd.choice(COMMENTS) if rnd.random() < 0.1 else None,
+            "test": str([
+                {"dato": d.isoformat(), "antal_km_til_skole": km_to, "antal_km_fra_skole": km_from}
+                for d in days
+            ]),
+            "attachments": attachments,
+            "uuid": form_uuid,
+        })
+
+        yield row
+
+
+def generate_rows(count: int, attachment_url: Callable[[str], str] | None = None, seed: int = 0) -> list[dict]:
+    """Generate a list of sheet rows."""
+
+    return list(iter_rows(count, attachment_url=attachment_url, seed=seed))
+
+
+def write_workbook(target, rows) -> None:
+    """Stream rows into an xlsx workbook with the COLUMNS header. target is a path or a file object."""
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+
+    ws.append(COLUMNS)
+
+    for row in rows:
+        ws.append([row.get(col) for col in COLUMNS])
+
+    wb.save(target)
+
+
+def workbook_bytes(rows) -> bytes:
+    """Serialize rows into xlsx bytes."""
+
+    buffer = BytesIO()
+    write_workbook(buffer, rows)
+
+    return buffer.getvalue()
+
+
+def main_cli(argv: list[str] | None = None) -> int:
+    """Command line entry point."""
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", required=True, help="path of the xlsx file to write")
+    args = parser.parse_args(argv)
+
+    write_workbook(args.out, iter_rows(args.rows, seed=args.seed))
+
+    print(f"Wrote {args.rows} rows to {args.out}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,68 @@
+"""
+Dry run of main.py --queue and --process with every integration faked, OPUS included.
+
+Runs the same setup as benchmarks.e2e, but OPUS is replaced by benchmarks.fixture_opus, so no
+browser is started and the queue, scheduling, journal and finalization throughput can be measured
+on its own. Step latencies are fixed with --latency or replayed from a real run's timing log.
+
+Usage:
+    python -m benchmarks.dry_run --items 200 --latency fill_form=2.5 --json results.json
+    python -m benchmarks.dry_run --items 200 --fixture C:\\tmp\\Koerselsgodtgoerelse_timings.jsonl --scale 0.1
+"""
+
+import argparse
+import json
+import logging
+import sys
+
+from benchmarks import e2e
+from benchmarks.fixture_opus import ITEM_STEPS, LOGIN_STEPS, FixtureOpus
+from benchmarks.opus_mock import DEFAULT_CONTROL_TEXT
+
+
+def _parse_latency(value: str) -> tuple[str, float]:
+    step, _, seconds = value.partition("=")
+
+    if step not in LOGIN_STEPS + ITEM_STEPS:
+        raise argparse.ArgumentTypeError(f"unknown step '{step}', expected one of {', '.join(LOGIN_STEPS + ITEM_STEPS)}")
+
+    return step, float(seconds)
+
+
+def main_cli(argv: list[str] | None = None) -> int:
+    """Command line entry point."""
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=50, help="number of approved rows in the generated sheet")
+    parser.add_argument("--mode", choices=("queue", "process", "both", "pipelined"), default="both", help="pipelined runs --queue and --process together")
+    parser.add_argument("--fixture", help="timing log of a real run to replay the OPUS step latencies from")
+    parser.add_argument("--latency", type=_parse_latency, action="append", default=[], metavar="STEP=SECONDS", help="fixed latency of a step, repeatable")
+    parser.add_argument("--scale", type=float, default=1.0, help="factor applied to every step latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of items ending in a BusinessError at the control step")
+    parser.add_argument("--create-ticket", action="store_true", help="also run the create_ticket step")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", help="write the results to this file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s [%(levelname)s] %(name)s — %(message)s")
+
+    options = {"scale": args.scale, "error_rate": args.error_rate, "create_ticket": args.create_ticket, "seed": args.seed}
+
+    driver = FixtureOpus.from_timing_log(args.fixture, **options) if args.fixture else FixtureOpus(**options)
+
+    for step, seconds in args.latency:
+        driver.latencies[step] = [seconds]
+
+    results = e2e.run(items=args.items, mode=args.mode, control_text=DEFAULT_CONTROL_TEXT, seed=args.seed, opus_driver=driver)
+
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
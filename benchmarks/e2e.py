@@ -0,0 +1,191 @@
+"""
+End-to-end benchmark of main.py --queue and --process against local stand-ins.
+
+Starts a fake ATS, a fake OS2Forms attachment server and the OPUS mock, swaps SharePoint,
+the RPA database and SMTP for local fakes, and drives the real process code with headless Chrome.
+
+Usage:
+    python -m benchmarks.e2e --items 20 --mode both --json results.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import smtplib
+import sys
+import tempfile
+import time
+from contextlib import nullcontext
+
+from benchmarks.fakes import (
+    FakeATS,
+    FakeOS2Forms,
+    FakeRPAConnection,
+    FakeSharepoint,
+    FakeSMTP,
+)
+from benchmarks.opus_mock import DEFAULT_CONTROL_TEXT, OpusMock
+
+logger = logging.getLogger(__name__)
+
+FILE_NAME = "benchmark_egenbefordring.xlsx"
+
+
+def _patch_process(sharepoint: FakeSharepoint, work_dir: str):
+    """
+    Swap the production integrations for the local fakes.
+
+    Must run after the environment is configured, since helpers.ats_functions reads ATS_URL on import.
+    """
+
+    # pylint: disable=import-outside-toplevel
+    import main
+    from helpers import config, constants_cache, helper_functions, sharepoint_client
+
+    config.PATH = os.path.join(work_dir, "receipts")
+    config.JOURNAL_PATH = os.path.join(work_dir, "journal.jsonl")
+    config.OPUS_SESSION_PATH = os.path.join(work_dir, "opus_session.bin")
+    config.ROW_FINGERPRINT_PATH = os.path.join(work_dir, "row_fingerprints.json")
+    config.TIMING_ENABLED = True
+    config.TIMING_LOG_PATH = os.path.join(work_dir, "timings.jsonl")
+
+    sharepoint_client.reset()
+    sharepoint_client.new_sharepoint = lambda: sharepoint
+
+    constants_cache.RPAConnection = FakeRPAConnection
+
+    smtplib.SMTP = FakeSMTP
+
+    # Attachment URLs must be https:// to be picked up, the fake serves plain http
+    download = helper_functions.documents.download_file_bytes
+    helper_functions.documents.download_file_bytes = lambda url, key: download(url.replace("https://", "http://", 1), key)
+
+    return main
+
+
+def run(items: int, mode: str, control_text: str, seed: int, opus_driver=None) -> dict:
+    """
+    Run the benchmark and return the results.
+
+    With opus_driver (a benchmarks.fixture_opus.FixtureOpus) the OPUS steps are replayed by the driver
+    instead of driving the OPUS mock in Chrome.
+    """
+
+    work_dir = tempfile.mkdtemp(prefix="egenbefordring_bench_")
+
+    opus_context = OpusMock(control_text=control_text) if opus_driver is None else nullcontext()
+
+    with FakeATS() as ats_fake, FakeOS2Forms(api_key="benchmark") as os2forms, opus_context as opus:
+        ats_fake.configure_environment()
+
+        if opus is not None:
+            os.environ["OPUS_PORTAL_URL"] = opus.portal_url
+
+        os.environ.setdefault("OPENORCHESTRATORKEY", "benchmark-key")
+
+        sharepoint = FakeSharepoint(root=os.path.join(work_dir, "sharepoint"))
+
+        main = _patch_process(sharepoint, work_dir)
+
+        # pylint: disable=import-outside-toplevel
+        from automation_server_client import AutomationServer
+
+        from benchmarks import dataset
+        from helpers import config, network_filter, timing, upload_guard
+
+        config.OS2FORMS_URL = os2forms.url
+        config.NETWORK_REPORT = True
+
+        if opus is not None:
+            config.OPUS_PORTAL_URL = opus.portal_url
+
+        else:
+            opus_driver.install()
+
+        rows = dataset.generate_rows(items, attachment_url=lambda u: os2forms.attachment_url(u).replace("http://", "https://", 1), seed=seed)
+        sharepoint.upload_file_from_bytes(dataset.workbook_bytes(rows), FILE_NAME, config.FOLDER_NAME)
+
+        workqueue = AutomationServer.from_environment().workqueue()
+
+        results = {"items": items, "mode": mode}
+
+        if mode in ("queue", "both"):
+            start = time.perf_counter()
+            asyncio.run(main.populate_queue(workqueue))
+            elapsed = time.perf_counter() - start
+
+            queued = len(ats_fake.items)
+
+            results["queued_items"] = queued
+            results["queue_seconds"] = round(elapsed, 3)
+            results["queue_items_per_hour"] = round(queued / elapsed * 3600, 1) if elapsed else None
+
+        if mode in ("process", "both"):
+            start = time.perf_counter()
+            asyncio.run(main.process_workqueue(workqueue))
+            elapsed = time.perf_counter() - start
+
+            processed = sum(n for status, n in ats_fake.status_counts().items() if status != "new")
+
+            results["process_seconds"] = round(elapsed, 3)
+            results["process_items_per_hour"] = round(processed / elapsed * 3600, 1) if elapsed else None
+
+        if mode == "pipelined":
+            start = time.perf_counter()
+            main.populate_and_process(workqueue)
+            elapsed = time.perf_counter() - start
+
+            processed = sum(n for status, n in ats_fake.status_counts().items() if status != "new")
+
+            results["queued_items"] = len(ats_fake.items)
+            results["pipelined_seconds"] = round(elapsed, 3)
+            results["process_items_per_hour"] = round(processed / elapsed * 3600, 1) if elapsed else None
+
+        results["statuses"] = ats_fake.status_counts()
+        results["receipt_downloads"] = os2forms.downloads
+
+        if opus is not None:
+            results["portal_loads"] = opus.portal_loads
+
+        else:
+            results["opus_steps"] = dict(opus_driver.calls)
+
+        results["sharepoint_uploads"] = sharepoint.uploads
+        results["upload_bytes_saved"] = upload_guard.bytes_saved()
+        results["network"] = network_filter.totals()
+        results["emails_sent"] = len(FakeSMTP.sent)
+        results["smtp_connections"] = FakeSMTP.connections
+        results["db_connections"] = FakeRPAConnection.connections
+        results["stages"] = timing.summary()
+
+    return results
+
+
+def main_cli(argv: list[str] | None = None) -> int:
+    """Command line entry point."""
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=10, help="number of approved rows in the generated sheet")
+    parser.add_argument("--mode", choices=("queue", "process", "both", "pipelined"), default="both", help="pipelined runs --queue and --process together")
+    parser.add_argument("--control-text", default=DEFAULT_CONTROL_TEXT, help="text the OPUS mock shows after 'Kontroller'")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", help="write the results to this file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s [%(levelname)s] %(name)s — %(message)s")
+
+    results = run(items=args.items, mode=args.mode, control_text=args.control_text, seed=args.seed)
+
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
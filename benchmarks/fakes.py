@@ -0,0 +1,648 @@
+"""
+Local stand-ins for ATS, SharePoint, OS2Forms, the RPA database and SMTP.
+
+The fakes implement only the parts of each system that the process actually uses,
+so the process can run end to end on a developer machine without production access.
+"""
+
+import json
+import logging
+import os
+import threading
+import uuid as uuid_lib
+from datetime import UTC, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import ClassVar
+from urllib.parse import parse_qs, unquote, urlparse
+
+logger = logging.getLogger(__name__)
+
+# Minimal valid one-page PDF used as receipt content
+RECEIPT_PDF = (
+    b"%PDF-1.4\n1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj\n"
+    b"2 0 obj<</Type/Pages/Kids[3 0 R]/Count 1>>endobj\n"
+    b"3 0 obj<</Type/Page/Parent 2 0 R/MediaBox[0 0 595 842]>>endobj\n"
+    b"trailer<</Root 1 0 R>>\n%%EOF\n"
+)
+
+
+class _LocalServer:
+    """Base class running a ThreadingHTTPServer on a free local port in a daemon thread."""
+
+    handler_class: type[BaseHTTPRequestHandler]
+
+    def __init__(self):
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        """Base URL of the running server."""
+
+        host, port = self._server.server_address[:2]
+
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Start serving in a background thread."""
+
+        handler = type("Handler", (self.handler_class,), {"fake": self})
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+        logger.info(f"{type(self).__name__} listening on {self.url}")
+
+        return self
+
+    def stop(self):
+        """Stop the server."""
+
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+class _JsonHandler(BaseHTTPRequestHandler):
+    """Request handler with small JSON helpers and quiet logging."""
+
+    fake = None
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Silence the default stderr access log."""
+
+    def _send_json(self, payload, status: int = 200):
+        body = json.dumps(payload, default=str).encode("utf-8")
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_empty(self, status: int):
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+
+        return json.loads(self.rfile.read(length) or b"{}")
+
+
+# ----------------------
+# ATS
+# ----------------------
+class _ATSHandler(_JsonHandler):
+    """Routes the subset of the ATS REST API used by the process and automation_server_client."""
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Handle GET requests."""
+
+        parsed = urlparse(self.path)
+        parts = [unquote(p) for p in parsed.path.strip("/").split("/")]
+        query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+
+        fake: FakeATS = self.fake
+
+        match parts:
+            case ["workqueues", "by_name", name]:
+                self._send_json(fake.workqueue_json(name=name))
+
+            case ["workqueues", _, "items"]:
+                self._send_json(fake.list_items(
+                    page=int(query.get("page", 1)),
+                    size=int(query.get("size", 50)),
+                    search=query.get("search", ""),
+                    status=query.get("status"),
+                ))
+
+            case ["workqueues", _, "next_item"]:
+                item = fake.next_item()
+
+                if item is None:
+                    self._send_empty(204)
+
+                else:
+                    self._send_json(item)
+
+            case ["workqueues", _]:
+                self._send_json(fake.workqueue_json())
+
+            case ["workitems", "by-reference", reference]:
+                self._send_json(fake.items_by_reference(reference))
+
+            case ["workitems", item_id]:
+                self._send_json(fake.items[int(item_id)])
+
+            case ["sessions", session_id]:
+                self._send_json({"id": int(session_id), "process_id": 1, "resource_id": 1, "status": "in progress", "parameters": ""})
+
+            case ["processes", process_id]:
+                self._send_json({"id": int(process_id), "name": "egenbefordring", "workqueue_id": fake.workqueue_id, "target_type": "python"})
+
+            case _:
+                self._send_empty(404)
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Handle POST requests."""
+
+        parts = urlparse(self.path).path.strip("/").split("/")
+
+        if parts[0] == "workqueues" and parts[-1] == "add":
+            payload = self._read_json()
+
+            self._send_json(self.fake.add_item(payload.get("data", {}), payload.get("reference", "")))
+
+        else:
+            self._send_empty(404)
+
+    def do_PUT(self):  # pylint: disable=invalid-name
+        """Handle PUT requests."""
+
+        parts = urlparse(self.path).path.strip("/").split("/")
+        payload = self._read_json()
+
+        match parts:
+            case ["workitems", item_id, "status"]:
+                self._send_json(self.fake.set_status(int(item_id), payload.get("status"), payload.get("message", "")))
+
+            case ["workitems", item_id]:
+                self._send_json(self.fake.update_data(int(item_id), payload.get("data", {})))
+
+            case _:
+                self._send_empty(404)
+
+
+class FakeATS(_LocalServer):
+    """In-memory ATS workqueue served over HTTP."""
+
+    handler_class = _ATSHandler
+
+    def __init__(self, workqueue_name: str = "bur.befordring.udbetaling_af_egenbefordring", workqueue_id: int = 1):
+        super().__init__()
+
+        self.workqueue_name = workqueue_name
+        self.workqueue_id = workqueue_id
+
+        self.items: dict[int, dict] = {}
+
+        self._lock = threading.Lock()
+        self._next_id = 1
+
+    def workqueue_json(self, name: str | None = None) -> dict:
+        """Workqueue description as returned by ATS."""
+
+        now = _now()
+
+        return {
+            "id": self.workqueue_id,
+            "name": name or self.workqueue_name,
+            "description": "",
+            "enabled": True,
+            "deleted": False,
+            "created_at": now,
+            "updated_at": now,
+        }
+
+    def add_item(self, data: dict, reference: str) -> dict:
+        """Add a new work item."""
+
+        with self._lock:
+            item_id = self._next_id
+            self._next_id += 1
+
+            now = _now()
+
+            item = {
+                "id": item_id,
+                "workqueue_id": self.workqueue_id,
+                "data": data,
+                "reference": reference,
+                "locked": False,
+                "status": "new",
+                "message": "",
+                "created_at": now,
+                "updated_at": now,
+            }
+
+            self.items[item_id] = item
+
+        return item
+
+    def next_item(self) -> dict | None:
+        """Claim the oldest new item."""
+
+        with self._lock:
+            for item in self.items.values():
+                if item["status"] == "new":
+                    item["status"] = "in progress"
+                    item["locked"] = True
+                    item["updated_at"] = _now()
+
+                    return item
+
+        return None
+
+    def list_items(self, page: int, size: int, search: str = "", status: str | None = None) -> dict:
+        """Paginated item listing, newest first like ATS."""
+
+        with self._lock:
+            items = list(reversed(self.items.values()))
+
+        if search:
+            items = [i for i in items if search in i["reference"] or search in json.dumps(i["data"], default=str)]
+
+        if status:
+            items = [i for i in items if i["status"] == status]
+
+        start = (page - 1) * size
+
+        return {"items": items[start:start + size], "total_items": len(items), "page": page, "size": size}
+
+    def items_by_reference(self, reference: str) -> list[dict]:
+        """All items with the given reference."""
+
+        with self._lock:
+            return [i for i in self.items.values() if i["reference"] == reference]
+
+    def update_data(self, item_id: int, data: dict) -> dict:
+        """Replace the data of an item."""
+
+        with self._lock:
+            item = self.items[item_id]
+            item["data"] = data
+            item["updated_at"] = _now()
+
+        return item
+
+    def set_status(self, item_id: int, status: str, message: str = "") -> dict:
+        """Set the status of an item."""
+
+        with self._lock:
+            item = self.items[item_id]
+            item["status"] = status
+            item["message"] = message
+            item["locked"] = False
+            item["updated_at"] = _now()
+
+        return item
+
+    def status_counts(self) -> dict:
+        """Number of items per status."""
+
+        counts: dict[str, int] = {}
+
+        with self._lock:
+            for item in self.items.values():
+                counts[item["status"]] = counts.get(item["status"], 0) + 1
+
+        return counts
+
+    def configure_environment(self, token: str = "benchmark"):
+        """Point the ATS client environment variables at this fake."""
+
+        os.environ["ATS_URL"] = self.url
+        os.environ["ATS_TOKEN"] = token
+        os.environ["ATS_SESSION"] = "1"
+        os.environ["ATS_RESOURCE"] = "1"
+        os.environ["ATS_PROCESS"] = "1"
+        os.environ["ATS_WORKQUEUE_OVERRIDE"] = str(self.workqueue_id)
+
+
+def _now() -> str:
+    return datetime.now(UTC).isoformat()
+
+
+# ----------------------
+# OS2Forms
+# ----------------------
+class _OS2FormsHandler(_JsonHandler):
+    """Serves receipt PDFs for any attachment URL."""
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Handle GET requests."""
+
+        fake: FakeOS2Forms = self.fake
+
+        if fake.api_key and self.headers.get("api-key") != fake.api_key:
+            self._send_empty(401)
+            return
+
+        with fake.lock:
+            fake.downloads += 1
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Content-Length", str(len(fake.content)))
+        self.end_headers()
+        self.wfile.write(fake.content)
+
+
+class FakeOS2Forms(_LocalServer):
+    """OS2Forms attachment server returning the same receipt for every URL."""
+
+    handler_class = _OS2FormsHandler
+
+    def __init__(self, api_key: str = "", content: bytes = RECEIPT_PDF):
+        super().__init__()
+
+        self.api_key = api_key
+        self.content = content
+        self.downloads = 0
+        self.lock = threading.Lock()
+
+    def attachment_url(self, form_uuid: str) -> str:
+        """Attachment URL for a submission, as found in the 'attachments' column."""
+
+        return f"{self.url}/system/files/webform/egenbefordring/{form_uuid}/receipt.pdf"
+
+
+# ----------------------
+# SharePoint
+# ----------------------
+class _FakeQuery:
+    """Mimics the deferred office365 query object."""
+
+    def __init__(self, action=None):
+        self._action = action
+
+    def execute_query(self):
+        """Run the deferred action."""
+
+        if self._action:
+            self._action()
+
+        return self
+
+
+class _FakeFolders:
+    def __init__(self, root: str):
+        self._root = root
+
+    def add(self, folder_url: str) -> _FakeQuery:
+        """Create a folder relative to the document library root."""
+
+        return _FakeQuery(lambda: os.makedirs(os.path.join(self._root, *folder_url.split("/")), exist_ok=True))
+
+
+class _FakeFile:
+    def __init__(self, path: str):
+        self.name = os.path.basename(path)
+        self.length = os.path.getsize(path)
+
+
+class _FakeFileCollection(list):
+    def __init__(self, folder: "_FakeFolder"):
+        super().__init__()
+
+        self._folder = folder
+
+    def load(self):
+        """Read the directory listing, like ctx.load(files) + execute_query()."""
+
+        path = self._folder.path
+
+        self[:] = [_FakeFile(os.path.join(path, f)) for f in sorted(os.listdir(path)) if os.path.isfile(os.path.join(path, f))] if os.path.isdir(path) else []
+
+    def create_upload_session(self, file_path: str, chunk_size: int, file_name: str | None = None, **_kwargs) -> _FakeQuery:
+        """Chunked upload of a local file."""
+
+        def upload():
+            with open(file_path, "rb") as f:
+                chunks = iter(lambda: f.read(chunk_size), b"")
+
+                self._folder.store(file_name or os.path.basename(file_path), b"".join(chunks))
+
+        return _FakeQuery(upload)
+
+
+class _FakeFolder:
+    def __init__(self, sharepoint: "FakeSharepoint", path: str):
+        self._sharepoint = sharepoint
+        self.path = path
+        self.files = _FakeFileCollection(self)
+
+    def store(self, file_name: str, content: bytes):
+        """Write a file and count the upload."""
+
+        os.makedirs(self.path, exist_ok=True)
+
+        with open(os.path.join(self.path, file_name), "wb") as f:
+            f.write(content)
+
+        self._sharepoint.count_upload(len(content))
+
+    def upload_file(self, file_name: str, content: bytes) -> _FakeQuery:
+        """Simple upload of bytes."""
+
+        return _FakeQuery(lambda: self.store(file_name, content))
+
+
+class _FakeWeb:
+    def __init__(self, sharepoint: "FakeSharepoint"):
+        self._sharepoint = sharepoint
+        self.folders = _FakeFolders(sharepoint.root)
+
+    def get_folder_by_server_relative_url(self, url: str) -> _FakeFolder:
+        """Resolve /{site_type}/{site_name}/{library}/{folder} to its local directory."""
+
+        prefix = f"/{self._sharepoint.site_type}/{self._sharepoint.site_name}/"
+        relative = url.removeprefix(prefix)
+
+        return _FakeFolder(self._sharepoint, os.path.join(self._sharepoint.root, *relative.split("/")))
+
+
+class _FakeContext:
+    def __init__(self, sharepoint: "FakeSharepoint"):
+        self.web = _FakeWeb(sharepoint)
+        self._pending = []
+
+    def load(self, obj):
+        """Defer loading of a file collection."""
+
+        self._pending.append(obj)
+
+    def execute_query(self):
+        """Run the deferred loads."""
+
+        pending, self._pending = self._pending, []
+
+        for obj in pending:
+            obj.load()
+
+
+class FakeSharepoint:
+    """
+    Stand-in for mbu_msoffice_integration's Sharepoint, backed by a local directory.
+
+    Folder names are resolved relative to the document library, like the real class.
+    """
+
+    def __init__(self, root: str, document_library: str = "Delte dokumenter", site_name: str = "benchmark", site_type: str = "Teams", **_kwargs):
+        self.root = root
+        self.document_library = document_library
+        self.site_name = site_name
+        self.site_type = site_type
+        self.ctx = _FakeContext(self)
+
+        self.uploaded_bytes = 0
+        self.uploads = 0
+
+        self._lock = threading.Lock()
+
+    def folder_path(self, folder_name: str) -> str:
+        """Local directory backing a SharePoint folder."""
+
+        path = os.path.join(self.root, self.document_library, *folder_name.split("/"))
+        os.makedirs(path, exist_ok=True)
+
+        return path
+
+    def fetch_files_list(self, folder_name: str) -> list[dict]:
+        """List the files in a folder."""
+
+        path = self.folder_path(folder_name)
+
+        return [{"Name": f} for f in sorted(os.listdir(path)) if os.path.isfile(os.path.join(path, f))]
+
+    def fetch_file_using_open_binary(self, file_name: str, folder_name: str) -> bytes | None:
+        """Read a file."""
+
+        file_path = os.path.join(self.folder_path(folder_name), file_name)
+
+        if not os.path.exists(file_path):
+            return None
+
+        with open(file_path, "rb") as f:
+            return f.read()
+
+    def upload_file_from_bytes(self, binary_content: bytes, file_name: str, folder_name: str):
+        """Store a file from bytes."""
+
+        with open(os.path.join(self.folder_path(folder_name), file_name), "wb") as f:
+            f.write(binary_content)
+
+        self.count_upload(len(binary_content))
+
+    def count_upload(self, size: int):
+        """Count an upload of size bytes."""
+
+        with self._lock:
+            self.uploads += 1
+            self.uploaded_bytes += size
+
+    def upload_file(self, folder_name: str, file_path: str, file_name: str | None = None):
+        """Store a local file."""
+
+        with open(file_path, "rb") as f:
+            self.upload_file_from_bytes(f.read(), file_name or os.path.basename(file_path), folder_name)
+
+
+# ----------------------
+# RPA database and SMTP
+# ----------------------
+DEFAULT_CONSTANTS = {
+    "egenbefordring_procargs": json.dumps({"naeste_agent": "AZ00000", "notification_email": "robot@example.org"}),
+    "e-mail_noreply": "noreply@example.org",
+    "Error Email": "errors@example.org",
+    "Email Friend": "robot@example.org",
+    "smtp_server": "localhost",
+    "smtp_port": "25",
+}
+
+DEFAULT_CREDENTIALS = {
+    "egenbefordring_udbetaling": {"username": "benchmark", "decrypted_password": "benchmark"},
+    "os2_api": {"username": "", "decrypted_password": "benchmark"},
+}
+
+
+class FakeRPAConnection:
+    """In-memory replacement for RPAConnection with the same context manager interface."""
+
+    constants: ClassVar[dict] = dict(DEFAULT_CONSTANTS)
+    credentials: ClassVar[dict] = dict(DEFAULT_CREDENTIALS)
+    connections = 0
+
+    def __init__(self, db_env: str = "PROD", commit: bool = False):
+        self.db_env = db_env
+        self.commit = commit
+
+    def __enter__(self):
+        type(self).connections += 1
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def get_constant(self, constant_name: str) -> dict:
+        """Return a constant."""
+
+        if constant_name not in self.constants:
+            raise ValueError(f"No constant found with name: {constant_name}")
+
+        return {"constant_name": constant_name, "value": self.constants[constant_name]}
+
+    def get_credential(self, credential_name: str) -> dict:
+        """Return a credential."""
+
+        if credential_name not in self.credentials:
+            raise ValueError(f"No credential found with name: {credential_name}")
+
+        return dict(self.credentials[credential_name])
+
+
+class FakeSMTP:
+    """Drop-in for smtplib.SMTP that records messages instead of sending them."""
+
+    sent: ClassVar[list] = []
+    connections = 0
+
+    def __init__(self, host: str = "", port: int = 0, *_args, **_kwargs):
+        self.host = host
+        self.port = port
+
+        type(self).connections += 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.quit()
+
+    def starttls(self, *_args, **_kwargs):
+        """No-op STARTTLS."""
+
+    def ehlo(self, *_args, **_kwargs):
+        """No-op EHLO."""
+
+    def noop(self):
+        """Always healthy."""
+
+        return 250, b"OK"
+
+    def send_message(self, msg, *_args, **_kwargs):
+        """Record the message."""
+
+        type(self).sent.append(msg)
+
+        return {}
+
+    def quit(self):
+        """No-op QUIT."""
+
+
+def new_form_uuid() -> str:
+    """Random OS2Forms submission uuid."""
+
+    return str(uuid_lib.uuid4())
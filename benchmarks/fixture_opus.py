@@ -0,0 +1,173 @@
+"""
+Recorded-fixture stand-in for helpers.outlay_ticket_creation.
+
+Replaces the Selenium driven OPUS steps with sleeps, so the rest of the pipeline (queue, scheduling,
+journal, error handling, finalization) can be measured without a browser. Step latencies are either
+fixed or replayed from the per-item records of a timing log (config.TIMING_LOG_PATH) of a real run.
+"""
+
+import json
+import random
+import threading
+import time
+from io import BytesIO
+
+from mbu_rpa_core.exceptions import BusinessError
+from PIL import Image
+
+from helpers import circuit_breaker, opus_session, outlay_ticket_creation, timing
+
+# The OPUS steps in the order handle_opus runs them, create_ticket only with create_ticket=True
+LOGIN_STEPS = ("launch_browser", "login_to_opus")
+ITEM_STEPS = ("navigate_to_opus", "fill_form", "upload_attachment", "fill_out_form_and_control", "create_ticket")
+
+
+class FixtureBrowser:
+    """Answers the calls the browser manager, screenshots and network report make on a browser."""
+
+    def __init__(self):
+        self.closed = False
+
+    def execute_script(self, script, *args):  # pylint: disable=unused-argument
+        return 1
+
+    def execute_cdp_cmd(self, cmd, args):  # pylint: disable=unused-argument
+        return {}
+
+    def get_log(self, log_type):  # pylint: disable=unused-argument
+        return []
+
+    def get_screenshot_as_png(self) -> bytes:
+        buffer = BytesIO()
+        Image.new("RGB", (1920, 1080), "white").save(buffer, format="PNG")
+
+        return buffer.getvalue()
+
+    @property
+    def page_source(self) -> str:
+        return ""
+
+    def quit(self):
+        self.closed = True
+
+
+class FixtureOpus:
+    """
+    OPUS driver that sleeps through each step.
+
+    Args:
+        latencies: Seconds per step, a list is sampled from for every call. Missing steps take no time.
+        scale: Factor applied to every latency, e.g. 0.1 to run ten times faster than recorded.
+        error_rate: Share of items that end in a BusinessError at the control step.
+        create_ticket: Also run the create_ticket step, which handle_opus currently skips.
+    """
+
+    def __init__(self, latencies: dict[str, list[float]] | None = None, scale: float = 1.0, error_rate: float = 0.0, create_ticket: bool = False, seed: int = 0):
+        self.latencies = latencies or {}
+        self.scale = scale
+        self.error_rate = error_rate
+        self.create_ticket = create_ticket
+
+        self.calls: dict[str, int] = {}
+
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+
+    @classmethod
+    def from_timing_log(cls, path: str, **kwargs) -> "FixtureOpus":
+        """Build the latencies from the per-item stage timings a real run wrote to its timing log."""
+
+        latencies: dict[str, list[float]] = {}
+
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    stages = json.loads(line).get("stages", {})
+
+                except ValueError:
+                    continue
+
+                for step in LOGIN_STEPS + ITEM_STEPS:
+                    if step in stages:
+                        latencies.setdefault(step, []).append(stages[step])
+
+        return cls(latencies=latencies, **kwargs)
+
+    def _step(self, step: str) -> None:
+        with self._lock:
+            self.calls[step] = self.calls.get(step, 0) + 1
+
+            values = self.latencies.get(step)
+            seconds = self._random.choice(values) * self.scale if values else 0.0
+
+        with timing.span(step):
+            time.sleep(seconds)
+
+    def initialize_browser(self, opus_username, opus_password, headless=False, profile=None):
+        """Stand-in for outlay_ticket_creation.initialize_browser."""
+
+        browser = self.launch_browser(headless=headless, profile=profile)
+
+        self.log_in(browser, opus_username, opus_password)
+
+        return browser
+
+    def launch_browser(self, headless=False, profile=None):  # pylint: disable=unused-argument
+        """Stand-in for outlay_ticket_creation.launch_browser."""
+
+        self._step("launch_browser")
+
+        return FixtureBrowser()
+
+    def log_in(self, browser, opus_username, opus_password):
+        """Stand-in for outlay_ticket_creation.log_in, which always logs in since there is no session to restore."""
+
+        self.login_to_opus(browser, opus_username, opus_password)
+
+    def login_to_opus(self, browser, username, password):  # pylint: disable=unused-argument
+        """Stand-in for outlay_ticket_creation.login_to_opus."""
+
+        self._step("login_to_opus")
+
+    def is_logged_in(self, browser):  # pylint: disable=unused-argument
+        """Stand-in for opus_session.is_logged_in, a fixture browser stays logged in."""
+
+        return True
+
+    def handle_opus(self, item_data, path, browser, headless, on_stage=None):  # pylint: disable=unused-argument
+        """Stand-in for outlay_ticket_creation.handle_opus, with the same journal stages."""
+
+        for step in ITEM_STEPS[:3]:
+            self._step(step)
+
+        if on_stage:
+            on_stage("form_filled")
+
+        self._step("fill_out_form_and_control")
+
+        with self._lock:
+            failed = self._random.random() < self.error_rate
+
+        if failed:
+            raise BusinessError("Fixture: udgiftsbilaget blev ikke kontrolleret og OK")
+
+        if on_stage:
+            on_stage("controlled")
+
+        if self.create_ticket:
+            self._step("create_ticket")
+
+    def install(self) -> None:
+        """
+        Swap the OPUS functions the process calls for this driver's, handle_opus behind the same circuit breaker.
+
+        Every entry point that starts or logs in a browser is swapped, login_to_opus included, so no caller
+        reaches Selenium whichever of them it goes through.
+        """
+
+        outlay_ticket_creation.initialize_browser = self.initialize_browser
+        outlay_ticket_creation.launch_browser = self.launch_browser
+        outlay_ticket_creation.log_in = self.log_in
+        outlay_ticket_creation.login_to_opus = self.login_to_opus
+        opus_session.is_logged_in = self.is_logged_in
+        outlay_ticket_creation.handle_opus = circuit_breaker.guard("opus", ignore=(BusinessError,))(self.handle_opus)
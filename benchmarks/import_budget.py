@@ -0,0 +1,154 @@
+"""
+Import-time budget of main.py per mode.
+
+Each mode is imported in a fresh interpreter with python -X importtime, as the robot does on a cold start.
+The check fails (exit code 1) when a mode imports a module it must not load, or when its median import
+time is over budget. The slowest imports are listed, to see what a regression pulled in.
+
+Usage:
+    python -m benchmarks.import_budget --runs 5 --json results.json
+    python -m benchmarks.import_budget --modes queue --budget queue=1.5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# What each mode imports, the modules it must not load, and its budget in seconds
+MODES = {
+    # main.py --queue: SharePoint, the sheet and ATS, but nothing of the OPUS side
+    "queue": {
+        "imports": ["main"],
+        "forbidden": ["selenium", "pynput", "helpers.outlay_ticket_creation", "helpers.screenshot", "processes.error_handling"],
+        "budget": 2.0,
+    },
+
+    # main.py --process: everything process_workqueue imports, pynput only once a visible browser uploads a file
+    "process": {
+        "imports": ["main", "helpers.outlay_ticket_creation", "helpers.browser_manager", "processes.startup_orchestrator", "processes.error_handling", "processes.process_item"],
+        "forbidden": ["pynput"],
+        "budget": 2.5,
+    },
+
+    # The finalization after a run: ATS, SharePoint and the result workbook
+    "finalize": {
+        "imports": ["processes.finalize_process"],
+        "forbidden": ["selenium", "pynput", "helpers.outlay_ticket_creation", "helpers.screenshot"],
+        "budget": 2.0,
+    },
+}
+
+
+def import_times(modules: list[str]) -> dict[str, tuple[float, float, bool]]:
+    """
+    Import the modules in a fresh interpreter.
+
+    Returns:
+        dict: {module: (self seconds, cumulative seconds, whether it was imported at the top level)}
+    """
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "; ".join(f"import {m}" for m in modules) or "pass"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {', '.join(modules)} failed:\n{result.stderr[-2000:]}")
+
+    times = {}
+
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+
+        # Nested imports are indented by two spaces per level
+        top_level = len(name) - len(name.lstrip()) == 1
+
+        times[name.strip()] = (int(self_us) / 1e6, int(cumulative_us) / 1e6, top_level)
+
+    return times
+
+
+def run_mode(mode: str, runs: int, budget: float, top: int) -> dict:
+    """Measure one mode runs times and check it against its budget and forbidden modules."""
+
+    spec = MODES[mode]
+
+    # What the interpreter imports at startup is not the mode's cost
+    startup = set(import_times([]))
+
+    totals = []
+
+    for _ in range(runs):
+        times = import_times(spec["imports"])
+
+        totals.append(sum(cumulative for name, (_, cumulative, top_level) in times.items() if top_level and name not in startup))
+
+    forbidden = sorted({f for f in spec["forbidden"] for m in times if m == f or m.startswith(f + ".")})
+
+    seconds = statistics.median(totals)
+
+    return {
+        "mode": mode,
+        "runs": runs,
+        "seconds": round(seconds, 3),
+        "budget": budget,
+        "over_budget": seconds > budget,
+        "forbidden_imports": forbidden,
+        "slowest": [
+            {"module": name, "self_seconds": round(s, 3)}
+            for name, (s, _, _) in sorted(times.items(), key=lambda kv: kv[1][0], reverse=True)[:top]
+        ],
+    }
+
+
+def main_cli(argv: list[str] | None = None) -> int:
+    """Command line entry point."""
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters per mode, the median is checked")
+    parser.add_argument("--budget", action="append", default=[], metavar="MODE=SECONDS", help="override a mode's budget")
+    parser.add_argument("--top", type=int, default=10, help="number of slowest imports to list")
+    parser.add_argument("--json", dest="json_path", help="write the results to this file")
+    args = parser.parse_args(argv)
+
+    budgets = {mode: spec["budget"] for mode, spec in MODES.items()}
+
+    for override in args.budget:
+        mode, _, seconds = override.partition("=")
+        budgets[mode] = float(seconds)
+
+    os.environ.setdefault("OPENORCHESTRATORKEY", "benchmark-key")
+
+    results = []
+    failed = False
+
+    for mode in args.modes:
+        result = run_mode(mode, runs=args.runs, budget=budgets[mode], top=args.top)
+        results.append(result)
+
+        print(json.dumps(result, ensure_ascii=False))
+
+        failed = failed or result["over_budget"] or bool(result["forbidden_imports"])
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,289 @@
+"""
+Local mock of the KMD portal and the OPUS 'Bilag og fakturaer' frames.
+
+The pages are built in the browser from the same element IDs, frame IDs and absolute XPaths
+that helpers.outlay_ticket_creation uses, so the real Selenium code can drive the mock
+in headless Chrome. Point config.OPUS_PORTAL_URL at OpusMock.portal_url to use it.
+"""
+
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler
+
+from benchmarks.fakes import _LocalServer
+
+# Text shown when 'Kontroller' is pressed. The real OPUS message contains 'kontrolleret og OK'.
+DEFAULT_CONTROL_TEXT = "Udgiftsbilaget er kontrolleret og OK"
+
+PORTAL_XPATHS = [
+    {"xpath": "/html/body/div[1]/table/tbody/tr[1]/td/div/div[1]/div[9]/div[2]/span[2]", "text": "Udgiftsbilag", "action": "open_content"},
+]
+
+_ROOT = (
+    "/html/body/table/tbody/tr/td/div/table/tbody/tr/td/div/table/tbody/"
+    "tr/td/div/table/tbody/tr[2]/td/div/div/table/tbody/tr[2]/td/"
+    "table/tbody/tr/td/div/div[1]/div/div/div/table/tbody/tr[1]/td/"
+    "div/div/table/tbody/tr/td[1]/div/div/table/tbody/tr/td/div/"
+    "div/table/tbody/"
+)
+
+FORM_XPATHS = [
+    # Creditor CPR and 'Hent'
+    {"xpath": _ROOT + "tr[2]/td/div/div/table/tbody/tr/td[1]/div/div/table/tbody/tr[1]/td[2]/div/div/table/tbody/tr/td[1]/span/input"},
+    {"xpath": _ROOT + "tr[2]/td/div/div/table/tbody/tr/td[1]/div/div/table/tbody/tr[1]/td[2]/div/div/table/tbody/tr/td[2]/div", "text": "Hent"},
+    # Kommentar
+    {
+        "xpath": "/html/body/table/tbody/tr/td/div/table/tbody/tr/td/div/table/tbody/tr/td/div/table/tbody/tr[2]/td/div/div/table/tbody/"
+                 "tr[2]/td/table/tbody/tr/td/div/div[1]/div/div/div/table/tbody/tr[1]/td/div/div/table/tbody/tr/td[2]/table/tbody/tr/td/div/"
+                 "table/tbody/tr[1]/td/div/div/div/div/table/tbody/tr[2]/td/div/textarea",
+    },
+    # Udbetalingstekst, posteringstekst, reference, beløb and næste agent
+    {"xpath": _ROOT + "tr[3]/td/div/div/table/tbody/tr[1]/td[1]/div/div/table/tbody/tr/td/div/div/table/tbody/tr[1]/td[2]/span/input"},
+    {"xpath": _ROOT + "tr[3]/td/div/div/table/tbody/tr[2]/td/div/div/table/tbody/tr[2]/td[2]/span/input"},
+    {"xpath": _ROOT + "tr[3]/td/div/div/table/tbody/tr[2]/td/div/div/table/tbody/tr[3]/td[2]/span/input"},
+    {"xpath": _ROOT + "tr[3]/td/div/div/table/tbody/tr[2]/td/div/div/table/tbody/tr[4]/td[2]/div/div/table/tbody/tr/td[1]/span/input"},
+    {"xpath": _ROOT + "tr[4]/td/div/div/table/tbody/tr[2]/td[2]/div/div/table/tbody/tr[1]/td[1]/span/input"},
+    # Popup button next to udbetalingstekst
+    {
+        "xpath": _ROOT + "tr[3]/td/div/div/table/tbody/tr[1]/td[1]/div/div/table/tbody/tr/td/div/div/table/tbody/tr[1]/td[3]/div",
+        "text": "...",
+        "action": "open_name_popup",
+    },
+    # 'Vedhæft nyt'
+    {
+        "xpath": "/html/body/table/tbody/tr/td/div/table/tbody/tr/td/div/table/tbody/tr/td/div/table/tbody/tr[2]/td/div/div/table/tbody/tr[2]/td/table/"
+                 "tbody/tr/td/div/div[1]/div/div/div/table/tbody/tr[1]/td/div/div/table/tbody/tr/td[2]/table/tbody/tr/td/div/table/tbody/tr[3]/td/div/"
+                 "span/span/div/span/span[1]/table/thead/tr[2]/th/div/div/div/span/div",
+        "text": "Vedhæft nyt",
+        "action": "open_upload_popup",
+    },
+    # First cell in the posting grid
+    {
+        "xpath": "/html/body/table/tbody/tr/td/div/table/tbody/tr/td/div/table/tbody/tr/td/div/table/tbody/tr[2]/td/div/div/table/tbody/tr[2]/td/"
+                 "table/tbody/tr/td/div/div[1]/div/div/div/table/tbody/tr[2]/td/div/span/span[1]/div/span/span[1]/div/div/div/span/span/table/tbody/"
+                 "tr[2]/td/div/table/tbody/tr/td/div/table/tbody/tr[1]/td/table/tbody/tr[2]/td[3]/table/tbody/tr/td/span",
+        "text": "Artskonto",
+        "action": "focus_grid",
+    },
+    # 'Opret' and 'Kontroller'
+    {"xpath": "/html/body/table/tbody/tr/td/div/table/tbody/tr/td/div/table/tbody/tr/td/div/table/tbody/tr[1]/td/div/div[2]/div/div/div/span[1]/div", "text": "Opret", "action": "opret"},
+    {"xpath": "/html/body/table/tbody/tr/td/div/table/tbody/tr/td/div/table/tbody/tr/td/div/table/tbody/tr[1]/td/div/div[2]/div/div/div/span[4]/div", "text": "Kontroller", "action": "kontroller"},
+]
+
+UPLOAD_POPUP_XPATHS = [
+    {
+        "xpath": "/html/body/table/tbody/tr/td/div/div[1]/div/div[3]/table/tbody/tr/td/div/div/span/span[2]/form",
+        "attrs": {"style": "display:block;min-height:20px"},
+    },
+    {"xpath": "/html/body/table/tbody/tr/td/div/div[1]/div/div[3]/table/tbody/tr/td/div/div/span/span[2]/form/input[@type='file']"},
+    {"xpath": "/html/body/table/tbody/tr/td/div/div[1]/div/div[4]/div/table/tbody/tr/td[3]/table/tbody/tr/td[1]/div", "text": "OK", "action": "close_popup"},
+]
+
+_STEP = re.compile(r"^([a-z0-9]+)(?:\[(\d+)\])?(?:\[@([\w-]+)='([^']*)'\])?$")
+
+_BUILDER_JS = """
+function buildFromXPaths(specs, actions) {
+  for (const spec of specs) {
+    let node = document.documentElement;
+    for (const [tag, index, attrs] of spec.steps) {
+      if (tag === "body") { node = document.body; continue; }
+      const matching = () => Array.from(node.children).filter(
+        c => c.tagName.toLowerCase() === tag && Object.entries(attrs).every(([k, v]) => c.getAttribute(k) === v));
+      let found = matching();
+      while (found.length < index) {
+        const el = document.createElement(tag);
+        for (const [k, v] of Object.entries(attrs)) el.setAttribute(k, v);
+        node.appendChild(el);
+        found = matching();
+      }
+      node = found[index - 1];
+    }
+    for (const [k, v] of Object.entries(spec.attrs || {})) node.setAttribute(k, v);
+    if (spec.text) node.textContent = spec.text;
+    if (spec.action) { const target = node; target.addEventListener("click", () => actions[spec.action](target)); }
+  }
+}
+"""
+
+_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<script>
+{builder}
+const ACTIONS = {actions};
+document.addEventListener("DOMContentLoaded", () => {{
+  buildFromXPaths({specs}, ACTIONS);
+  {extra}
+}});
+</script></head><body></body></html>
+"""
+
+_LOGIN_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Logon</title></head><body>
+<input id="logonuidfield" type="text"><input id="logonpassfield" type="password">
+<div id="buttonLogon" onclick="document.cookie='opus_session=1; path=/'; location.reload();">Log on</div>
+</body></html>
+"""
+
+_PORTAL_ACTIONS = """{
+  open_content: () => {
+    const old = document.getElementById("contentAreaFrame");
+    if (old) old.remove();
+    const frame = document.createElement("iframe");
+    frame.id = "contentAreaFrame"; frame.name = "contentAreaFrame"; frame.src = "/content";
+    frame.style = "width:100%;height:900px";
+    document.body.appendChild(frame);
+  }
+}"""
+
+_PORTAL_EXTRA = """
+  for (const label of ["Min Økonomi", "Bilag og fakturaer"]) {
+    const el = document.createElement("div"); el.textContent = label; document.body.appendChild(el);
+  }
+  window.openPopup = (src) => {
+    const old = document.getElementById("URLSPW-0");
+    if (old) old.remove();
+    const frame = document.createElement("iframe");
+    frame.id = "URLSPW-0"; frame.name = "URLSPW-0"; frame.src = src;
+    frame.style = "width:600px;height:300px";
+    document.body.appendChild(frame);
+  };
+  window.closePopup = () => { const old = document.getElementById("URLSPW-0"); if (old) old.remove(); };
+"""
+
+_FORM_ACTIONS = """{
+  open_name_popup: () => window.top.openPopup("/popup/name"),
+  open_upload_popup: () => window.top.openPopup("/popup/upload"),
+  focus_grid: () => document.getElementById("grid-1").focus(),
+  kontroller: () => { const el = document.createElement("div"); el.textContent = CONTROL_TEXT; document.body.appendChild(el); },
+  opret: () => { const el = document.createElement("div"); el.textContent = "Udgiftsbilaget er oprettet"; document.body.appendChild(el); }
+}"""
+
+_FORM_EXTRA = """
+  const grid = document.createElement("div");
+  for (let i = 1; i <= 6; i++) { const cell = document.createElement("input"); cell.id = "grid-" + i; grid.appendChild(cell); }
+  document.body.appendChild(grid);
+"""
+
+_CONTENT_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Content</title></head><body>
+<iframe id="ivuFrm_page0ivu0" name="ivuFrm_page0ivu0" src="/form" style="width:100%;height:850px"></iframe>
+</body></html>
+"""
+
+_NAME_POPUP = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Tekst</title></head><body>
+<input id="popup-text" autofocus>
+<div class="lsButton" onclick="window.top.closePopup()">Gem</div>
+<script>document.getElementById("popup-text").focus();</script>
+</body></html>
+"""
+
+
+def _compile(specs: list[dict]) -> list[dict]:
+    """Turn absolute XPaths into the step lists the in-page builder understands."""
+
+    compiled = []
+
+    for spec in specs:
+        steps = []
+
+        for raw in spec["xpath"].strip("/").split("/")[1:]:
+            match = _STEP.match(raw)
+
+            if not match:
+                raise ValueError(f"Unsupported XPath step: {raw}")
+
+            tag, index, attr, value = match.groups()
+
+            steps.append([tag, int(index or 1), {attr: value} if attr else {}])
+
+        compiled.append({**{k: v for k, v in spec.items() if k != "xpath"}, "steps": steps})
+
+    return compiled
+
+
+def _page(title: str, specs: list[dict], actions: str = "{}", extra: str = "", prelude: str = "") -> str:
+    return _PAGE.format(
+        title=title,
+        builder=prelude + _BUILDER_JS,
+        actions=actions,
+        specs=json.dumps(_compile(specs), ensure_ascii=False),
+        extra=extra,
+    )
+
+
+class _OpusHandler(BaseHTTPRequestHandler):
+    """Serves the mock portal pages."""
+
+    fake = None
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Silence the default stderr access log."""
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Handle GET requests."""
+
+        mock: OpusMock = self.fake
+        path = self.path.split("?")[0]
+
+        if path == "/irj/portal":
+            with mock.lock:
+                mock.portal_loads += 1
+
+            logged_in = "opus_session=1" in (self.headers.get("Cookie") or "")
+            body = mock.portal_page if logged_in else _LOGIN_PAGE
+
+        elif path == "/content":
+            body = _CONTENT_PAGE
+
+        elif path == "/form":
+            body = mock.form_page
+
+        elif path == "/popup/name":
+            body = _NAME_POPUP
+
+        elif path == "/popup/upload":
+            body = mock.upload_page
+
+        else:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        payload = body.encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class OpusMock(_LocalServer):
+    """HTTP server hosting the mock KMD portal and OPUS frames."""
+
+    handler_class = _OpusHandler
+
+    def __init__(self, control_text: str = DEFAULT_CONTROL_TEXT):
+        super().__init__()
+
+        self.lock = threading.Lock()
+        self.portal_loads = 0
+
+        self.portal_page = _page("Portal", PORTAL_XPATHS, _PORTAL_ACTIONS, _PORTAL_EXTRA)
+        self.form_page = _page(
+            "Bilag og fakturaer",
+            FORM_XPATHS,
+            _FORM_ACTIONS,
+            _FORM_EXTRA,
+            prelude=f"const CONTROL_TEXT = {json.dumps(control_text, ensure_ascii=False)};\n",
+        )
+        self.upload_page = _page("Vedhæft", UPLOAD_POPUP_XPATHS, "{close_popup: () => window.top.closePopup()}")
+
+    @property
+    def portal_url(self) -> str:
+        """URL to use as config.OPUS_PORTAL_URL."""
+
+        return f"{self.url}/irj/portal"
@@ -0,0 +1,148 @@
+"""
+Benchmark of the queue build: download_sheet -> iter_approved_rows -> transform_rows.
+
+Each stage is timed separately for every sheet size, and with --memory the peak
+traced allocation of each stage is measured in a second, separate pass. The stages
+hold their whole output here, to time them apart. The streamed pipeline the queue run
+uses (queue_handler.iter_items_for_file) is measured the same way, along with the time
+until it yields its first item.
+
+Usage:
+    python -m benchmarks.queue_build --sizes 1000 10000 100000 --memory --json results.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks import dataset
+from benchmarks.fakes import FakeSharepoint
+
+FILE_NAME = "benchmark_egenbefordring.xlsx"
+
+
+def _measure(func, memory: bool):
+    """Run func and return (result, seconds, peak bytes or None)."""
+
+    gc.collect()
+
+    if memory:
+        tracemalloc.start()
+
+    start = time.perf_counter()
+
+    result = func()
+
+    elapsed = time.perf_counter() - start
+
+    peak = None
+
+    if memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return result, elapsed, peak
+
+
+def _drain(stream, state: dict) -> int:
+    """Consume a stream of queue items, noting when the first one arrived. Returns the item count."""
+
+    start = time.perf_counter()
+    count = 0
+
+    for _ in stream:
+        if not count:
+            state["first_item_seconds"] = time.perf_counter() - start
+
+        count += 1
+
+    return count
+
+
+def run_size(rows: int, memory: bool, seed: int = 0) -> dict:
+    """Benchmark the queue build stages for one sheet size."""
+
+    # pylint: disable=import-outside-toplevel
+    from helpers import config, helper_functions
+    from processes.queue_handler import iter_items_for_file, queue_item
+
+    with tempfile.TemporaryDirectory(prefix="egenbefordring_queue_bench_") as work_dir:
+        config.PATH = work_dir
+
+        sharepoint = FakeSharepoint(root=work_dir)
+
+        start = time.perf_counter()
+        dataset.write_workbook(os.path.join(sharepoint.folder_path(config.FOLDER_NAME), FILE_NAME), dataset.iter_rows(rows, seed=seed))
+        generate_seconds = time.perf_counter() - start
+
+        state = {}
+
+        stages = {
+            "download_sheet": lambda: helper_functions.download_sheet(file_name=FILE_NAME, sharepoint=sharepoint),
+            "iter_approved_rows": lambda: list(helper_functions.iter_approved_rows(state["download_sheet"])),
+            "transform_rows": lambda: [queue_item(row, FILE_NAME) for row in helper_functions.transform_rows(state["iter_approved_rows"], "AZ00000", FILE_NAME)],
+            "streamed": lambda: _drain(iter_items_for_file(FILE_NAME, "AZ00000", sharepoint), state),
+        }
+
+        result = {"rows": rows, "generate_seconds": round(generate_seconds, 3), "stages": {}}
+
+        passes = (False, True) if memory else (False,)
+
+        for trace in passes:
+            state.clear()
+
+            for name, stage in stages.items():
+                state[name], seconds, peak = _measure(stage, trace)
+
+                stage_result = result["stages"].setdefault(name, {})
+
+                if trace:
+                    stage_result["peak_mb"] = round(peak / 1024 / 1024, 1)
+
+                else:
+                    stage_result["seconds"] = round(seconds, 3)
+                    stage_result["rows_per_second"] = round(rows / seconds) if seconds else None
+
+                    if "first_item_seconds" in state:
+                        stage_result["first_item_seconds"] = round(state.pop("first_item_seconds"), 3)
+
+            result["queued_items"] = len(state["transform_rows"])
+            result["streamed_items"] = state["streamed"]
+
+    return result
+
+
+def main_cli(argv: list[str] | None = None) -> int:
+    """Command line entry point."""
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(dataset.SIZES[:3]), help=f"sheet sizes, e.g. {' '.join(map(str, dataset.SIZES))}")
+    parser.add_argument("--memory", action="store_true", help="also measure peak memory per stage (separate pass)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", help="write the results to this file")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("OPENORCHESTRATORKEY", "benchmark-key")
+
+    results = []
+
+    for rows in args.sizes:
+        result = run_size(rows, memory=args.memory, seed=args.seed)
+        results.append(result)
+
+        print(json.dumps(result, ensure_ascii=False))
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,102 @@
+"""
+Benchmark of the two result workbook writers used at finalization.
+
+"rebuild" builds the workbook from the rows stored on the work items (DataFrame -> ExcelWriter),
+"patch" opens the original workbook and writes only the behandlet cells of the processed rows.
+Both are timed per sheet size, and with --memory the peak traced allocation is measured in a separate pass.
+
+Usage:
+    python -m benchmarks.result_writer --sizes 1000 10000 100000 --memory --json results.json
+"""
+
+import argparse
+import json
+import random
+import sys
+
+from benchmarks import dataset
+from benchmarks.queue_build import _measure
+
+
+def _excel_rows(rows: list[dict], seed: int) -> list[dict]:
+    """The raw_excel_data of the approved rows, marked ok or failed as update_work_item_data does."""
+
+    rnd = random.Random(seed)
+
+    excel_rows = []
+
+    for row in rows:
+        if "x" not in str(row.get("godkendt") or "").lower():
+            continue
+
+        raw = dict(row)
+        raw["behandlet_ok" if rnd.random() < 0.95 else "behandlet_fejl"] = "x"
+
+        excel_rows.append(raw)
+
+    return excel_rows
+
+
+def run_size(rows: int, memory: bool, seed: int = 0) -> dict:
+    """Benchmark both writers for one sheet size."""
+
+    # pylint: disable=import-outside-toplevel
+    from helpers import result_workbook
+    from processes.finalize_process import build_result_workbook
+
+    sheet_rows = dataset.generate_rows(rows, seed=seed)
+    original = dataset.workbook_bytes(sheet_rows)
+    excel_rows = _excel_rows(sheet_rows, seed)
+
+    writers = {
+        "rebuild": lambda: build_result_workbook(excel_rows=excel_rows),
+        "patch": lambda: result_workbook.patch_workbook(original=original, excel_rows=excel_rows),
+    }
+
+    result = {"rows": rows, "processed_rows": len(excel_rows), "writers": {}}
+
+    passes = (False, True) if memory else (False,)
+
+    for trace in passes:
+        for name, writer in writers.items():
+            output, seconds, peak = _measure(writer, trace)
+
+            writer_result = result["writers"].setdefault(name, {})
+
+            if trace:
+                writer_result["peak_mb"] = round(peak / 1024 / 1024, 1)
+
+            else:
+                writer_result["seconds"] = round(seconds, 3)
+                writer_result["output_bytes"] = len(output)
+
+    return result
+
+
+def main_cli(argv: list[str] | None = None) -> int:
+    """Command line entry point."""
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(dataset.SIZES[:2]), help=f"sheet sizes, e.g. {' '.join(map(str, dataset.SIZES))}")
+    parser.add_argument("--memory", action="store_true", help="also measure peak memory per writer (separate pass)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", help="write the results to this file")
+    args = parser.parse_args(argv)
+
+    results = []
+
+    for rows in args.sizes:
+        result = run_size(rows, memory=args.memory, seed=args.seed)
+        results.append(result)
+
+        print(json.dumps(result, ensure_ascii=False))
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -7,11 +7,13 @@ from datetime import datetime
 
 import requests
 
-from dateutil.parser import isoparse
-
 from automation_server_client import WorkItem, Workqueue
 from dotenv import load_dotenv
 
+from helpers import circuit_breaker, timing
+
+logger = logging.getLogger(__name__)
+
 load_dotenv()
 
 URL = os.getenv("ATS_URL")
@@ -19,7 +21,11 @@ TOKEN = os.getenv("ATS_TOKEN")
 
 HEADERS = {"Authorization": f"Bearer {TOKEN}"}
 
+# Shared, so the calls reuse pooled connections to ATS instead of a new TLS handshake each
+SESSION = requests.Session()
 
+
+@timing.span("ats.get_workqueue_items")
 def get_workqueue_items(workqueue: Workqueue, return_data=False):
     """
     Retrieve items from the specified workqueue.
@@ -36,7 +42,7 @@ def get_workqueue_items(workqueue: Workqueue, return_data=False):
 
     while True:
         full_url = f"{URL}/workqueues/{workqueue.id}/items?page={page}&size={size}"
-        response = requests.get(full_url, headers=HEADERS, timeout=60)
+        response = SESSION.get(full_url, headers=HEADERS, timeout=60)
         response.raise_for_status()
 
         res_json = response.json().get("items", [])
@@ -54,6 +60,8 @@ def get_workqueue_items(workqueue: Workqueue, return_data=False):
     return workqueue_items
 
 
+@timing.span("ats.fetch_run_workqueue_items")
+@circuit_breaker.guard("ats")
 def fetch_run_workqueue_items(file_name: str = ""):
     """
     ATS helper to fetch workqueue items for the current run
@@ -63,26 +71,41 @@ def fetch_run_workqueue_items(file_name: str = ""):
 
     workqueue_url = f"{URL}/workqueues/by_name/{workqueue_name}"
 
-    workqueue_respone_json = requests.get(url=workqueue_url, headers=HEADERS, timeout=10).json()
+    workqueue_respone_json = SESSION.get(url=workqueue_url, headers=HEADERS, timeout=10).json()
 
     workqueue_id = workqueue_respone_json.get("id")
 
     work_items_url = f"{URL}/workqueues/{workqueue_id}/items?page=1&size=200&search={file_name}"
 
-    run_workqueue_items = requests.get(url=work_items_url, headers=HEADERS, timeout=10).json()["items"]
+    run_workqueue_items = SESSION.get(url=work_items_url, headers=HEADERS, timeout=10).json()["items"]
 
     return run_workqueue_items
 
 
-def update_work_item_data(item_reference: str, failed: bool):
+@timing.span("ats.get_work_item_by_reference")
+def get_work_item_by_reference(item_reference: str) -> WorkItem | None:
     """
-    ATS helper to update work item data
+    ATS helper to fetch a work item by its reference
     """
 
     url = f"{URL}/workitems/by-reference/{item_reference}"
 
-    raw = requests.get(url=url, headers=HEADERS, timeout=20).json()[0]
-    work_item = WorkItem(**raw)
+    response = SESSION.get(url=url, headers=HEADERS, timeout=20)
+    response.raise_for_status()
+
+    items = response.json()
+
+    return WorkItem(**items[0]) if items else None
+
+
+@timing.span("ats.update_work_item_data")
+@circuit_breaker.guard("ats")
+def update_work_item_data(item_reference: str, failed: bool):
+    """
+    ATS helper to update work item data
+    """
+
+    work_item = get_work_item_by_reference(item_reference)
 
     if failed:
         work_item.data["item"]["data"]["raw_excel_data"]["behandlet_fejl"] = "x"
@@ -93,9 +116,26 @@ def update_work_item_data(item_reference: str, failed: bool):
     work_item.update(work_item.data)
 
 
+@timing.span("ats.complete_work_item")
+@circuit_breaker.guard("ats")
+def complete_work_item(item_reference: str, message: str) -> None:
+    """
+    ATS helper to complete a work item that was left in progress
+    """
+
+    work_item = get_work_item_by_reference(item_reference)
+
+    if work_item is not None and work_item.status == "in progress":
+        work_item.complete(message)
+
+
+@timing.span("ats.get_failed_workqueue_items")
 def get_failed_workqueue_items(workqueue: Workqueue, from_date: datetime, to_date: datetime):
     """
     Function to retrieve failed workqueue items for a given time period
+
+    ATS filters on the status, so only the failed items are paged through. It has no date filter and does
+    not promise an order, so every page is read and the period is applied here.
     """
 
     load_dotenv()
@@ -109,8 +149,8 @@ def get_failed_workqueue_items(workqueue: Workqueue, from_date: datetime, to_dat
     size = 200  # max allowed
 
     while True:
-        full_url = f"{URL}/workqueues/{workqueue.id}/items?page={page}&size={size}"
-        response = requests.get(full_url, headers=HEADERS, timeout=60)
+        full_url = f"{URL}/workqueues/{workqueue.id}/items?page={page}&size={size}&status=failed"
+        response = SESSION.get(full_url, headers=HEADERS, timeout=60)
         response.raise_for_status()
 
         res_items = response.json().get("items", [])
@@ -124,11 +164,12 @@ def get_failed_workqueue_items(workqueue: Workqueue, from_date: datetime, to_dat
             if not item_created_at_str:
                 continue  # or handle differently
 
-            item_created_at = isoparse(item_created_at_str)
+            item_created_at = datetime.fromisoformat(item_created_at_str)
 
             if not from_date < item_created_at < to_date:
                 continue
 
+            # Checked here too, in case ATS ignores the status filter
             status = row.get("status")
 
             if status == "failed":
@@ -139,6 +180,38 @@ def get_failed_workqueue_items(workqueue: Workqueue, from_date: datetime, to_dat
     return failed_items
 
 
+def release_work_item(item: WorkItem, message: str) -> None:
+    """
+    ATS helper to hand a work item back to the queue untouched, so it is picked up again later
+    """
+
+    try:
+        response = SESSION.put(url=f"{URL}/workitems/{item.id}/status", headers=HEADERS, json={"status": "new", "message": message}, timeout=20)
+        response.raise_for_status()
+
+    except requests.exceptions.RequestException as e:
+        # The item stays in progress, and is resumed from the journal on the next run
+        logger.warning(f"Could not release {item.reference}: {e}")
+
+        return
+
+    # Keeps the work item context from completing the item on exit
+    item.status = "new"
+
+
+def warm_up() -> None:
+    """Open a pooled connection to ATS, so the first real call does not pay for the handshake."""
+
+    if not URL:
+        return
+
+    try:
+        SESSION.head(URL, headers=HEADERS, timeout=10)
+
+    except requests.exceptions.RequestException as e:
+        logger.warning(f"ATS is not reachable: {e}")
+
+
 def get_item_info(item: WorkItem):
     """Unpack item"""
     return item.data["item"]["data"], item.data["item"]["reference"]
@@ -0,0 +1,189 @@
+"""Lifecycle of the OPUS browser: liveness check before each item, periodic recycling and a warm spare"""
+
+import logging
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from selenium.common.exceptions import WebDriverException
+
+from helpers import config, opus_session, timing
+
+logger = logging.getLogger(__name__)
+
+
+class BrowserManager:
+    """
+    Hands out a live, logged in browser for each item.
+
+    The browser is replaced when it no longer answers, after config.BROWSER_RECYCLE_AFTER items, or when its
+    JS heap grows past config.BROWSER_MAX_HEAP_MB. With warm_spare the next browser is launched and logged in
+    in the background, so a swap does not wait for a launch and login.
+    """
+
+    def __init__(self, factory: Callable, warm_spare: bool = True):
+        self._factory = factory
+        self._warm_spare = warm_spare
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="browser-spare")
+        self._lock = threading.Lock()
+
+        self.browser = None
+        self.items_served = 0
+
+        self._spare: Future | None = None
+
+    def _launch_spare(self) -> None:
+        if self._warm_spare and self._spare is None:
+            self._spare = self._executor.submit(self._factory)
+
+    def _take_spare(self):
+        """Return the spare browser if it was launched successfully and is still logged in, None otherwise."""
+
+        spare, self._spare = self._spare, None
+
+        if spare is None:
+            return None
+
+        try:
+            browser = spare.result()
+
+        except (WebDriverException, OSError) as e:
+            logger.warning(f"Warm spare browser failed to start: {e}")
+
+            return None
+
+        if not is_alive(browser):
+            _quit(browser)
+
+            return None
+
+        # The spare may have sat idle long enough for the OPUS session to time out
+        if not opus_session.is_logged_in(browser):
+            logger.info("Warm spare browser was logged out of OPUS, launching a new one")
+
+            _quit(browser)
+
+            return None
+
+        return browser
+
+    def _reason_to_recycle(self) -> str | None:
+        if not is_alive(self.browser):
+            return "not responding"
+
+        if self.items_served >= config.BROWSER_RECYCLE_AFTER:
+            return f"served {self.items_served} items"
+
+        heap_mb = js_heap_mb(self.browser)
+
+        if heap_mb is not None and heap_mb > config.BROWSER_MAX_HEAP_MB:
+            return f"JS heap at {heap_mb:.0f} MB"
+
+        return None
+
+    def adopt(self, browser) -> None:
+        """Use a browser that was launched and logged in elsewhere as the current one."""
+
+        with self._lock:
+            if self.browser is not None:
+                self._retire()
+
+            self.browser = browser
+            self.items_served = 0
+
+    def acquire(self):
+        """Return a healthy browser for the next item, swapping the current one out if needed."""
+
+        with self._lock, timing.span("browser.acquire"):
+            if self.browser is not None:
+                reason = self._reason_to_recycle()
+
+                if reason:
+                    logger.info(f"Recycling browser: {reason}")
+
+                    self._retire()
+
+            if self.browser is None:
+                self.browser = self._take_spare()
+
+                if self.browser is None:
+                    with timing.span("browser.launch"):
+                        self.browser = self._factory()
+
+                self.items_served = 0
+
+            self._launch_spare()
+
+            self.items_served += 1
+
+            return self.browser
+
+    def _retire(self) -> None:
+        browser, self.browser = self.browser, None
+
+        # Quitting can take seconds, the next item does not need to wait for it
+        threading.Thread(target=_quit, args=(browser,), daemon=True).start()
+
+    def recycle(self) -> None:
+        """Drop the current browser, so the next acquire swaps in a fresh one."""
+
+        with self._lock:
+            if self.browser is not None:
+                self._retire()
+
+    def close(self) -> None:
+        """Quit the current and the spare browser."""
+
+        with self._lock:
+            if self.browser is not None:
+                _quit(self.browser)
+
+                self.browser = None
+
+            if self._spare is not None:
+                self._spare.add_done_callback(_quit_launched)
+
+                self._spare = None
+
+        self._executor.shutdown(wait=False)
+
+
+def is_alive(browser) -> bool:
+    """Whether the browser still answers a trivial command."""
+
+    try:
+        browser.execute_script("return 1")
+
+        return True
+
+    except WebDriverException:
+        return False
+
+
+def js_heap_mb(browser) -> float | None:
+    """Used JS heap of the current page in MB, None if Chrome does not report it."""
+
+    try:
+        browser.execute_cdp_cmd("Performance.enable", {})
+
+        metrics = browser.execute_cdp_cmd("Performance.getMetrics", {})["metrics"]
+
+    except (WebDriverException, AttributeError, KeyError):
+        return None
+
+    used = next((m["value"] for m in metrics if m["name"] == "JSHeapUsedSize"), None)
+
+    return used / (1024 * 1024) if used is not None else None
+
+
+def _quit_launched(future: Future) -> None:
+    if future.exception() is None:
+        _quit(future.result())
+
+
+def _quit(browser) -> None:
+    try:
+        browser.quit()
+
+    except Exception as e:  # noqa: BLE001 - a dead browser raises urllib3 errors as well as Selenium's, and is dropped either way
+        logger.info(f"Browser did not quit cleanly: {e}")
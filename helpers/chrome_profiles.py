@@ -0,0 +1,137 @@
+"""Chrome launch profiles for the OPUS browser"""
+
+import itertools
+import logging
+import os
+from dataclasses import dataclass
+
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+
+from helpers import config
+
+logger = logging.getLogger(__name__)
+
+# Chrome cannot share a disk cache between running instances, so launches rotate over this many cache folders
+# (the browser in use, the warm spare and one still quitting)
+_CACHE_SLOTS = 3
+
+_cache_slot = itertools.count()
+
+
+@dataclass(frozen=True)
+class LaunchProfile:
+    """How Chrome is started for OPUS"""
+
+    page_load_strategy: str = "normal"
+    incognito: bool = True
+    block_images: bool = False
+    block_remote_fonts: bool = False
+    disable_extensions: bool = False
+    disable_background_networking: bool = False
+    disk_cache: bool = False
+    block_requests: bool = False
+
+
+PROFILES = {
+    # The original launch: incognito, every resource loaded, get() waits for the full page load
+    "default": LaunchProfile(),
+
+    # get() returns once the DOM is ready, the element waits cover the rest
+    "eager": LaunchProfile(page_load_strategy="eager"),
+
+    # Nothing OPUS does not need for the robot, with config.BLOCKED_URL_PATTERNS blocked,
+    # and static assets served from a disk cache kept between runs
+    "fast": LaunchProfile(
+        page_load_strategy="eager",
+        incognito=False,
+        block_images=True,
+        block_remote_fonts=True,
+        disable_extensions=True,
+        disable_background_networking=True,
+        disk_cache=True,
+        block_requests=True,
+    ),
+}
+
+
+def get_profile(name: str | None = None) -> LaunchProfile:
+    """Return the named profile, config.CHROME_PROFILE by default."""
+
+    name = name or config.CHROME_PROFILE
+
+    if name not in PROFILES:
+        raise ValueError(f"Unknown Chrome profile '{name}', expected one of {', '.join(PROFILES)}")
+
+    return PROFILES[name]
+
+
+def build_options(profile: LaunchProfile, headless: bool) -> Options:
+    """Chrome options for a profile."""
+
+    chrome_options = Options()
+
+    chrome_options.page_load_strategy = profile.page_load_strategy
+
+    # Chrome prefs
+    prefs = {"safebrowsing.enabled": False}
+
+    if profile.block_images:
+        prefs["profile.managed_default_content_settings.images"] = 2
+
+    chrome_options.add_experimental_option("prefs", prefs)
+
+    # Common browser flags
+    chrome_options.add_argument("test-type")
+    chrome_options.add_argument("--start-maximized")
+    chrome_options.add_argument("--disable-web-security")
+    chrome_options.add_argument("--allow-running-insecure-content")
+    chrome_options.add_argument("--disable-search-engine-choice-screen")
+
+    if profile.incognito:
+        chrome_options.add_argument("--incognito")
+
+    if profile.block_remote_fonts:
+        chrome_options.add_argument("--disable-remote-fonts")
+
+    if profile.disable_extensions:
+        chrome_options.add_argument("--disable-extensions")
+        chrome_options.add_argument("--disable-component-extensions-with-background-pages")
+
+    if profile.disable_background_networking:
+        chrome_options.add_argument("--disable-background-networking")
+        chrome_options.add_argument("--disable-component-update")
+        chrome_options.add_argument("--disable-sync")
+        chrome_options.add_argument("--no-first-run")
+        chrome_options.add_argument("--no-default-browser-check")
+
+    if profile.disk_cache:
+        cache_dir = os.path.join(config.CHROME_CACHE_DIR, str(next(_cache_slot) % _CACHE_SLOTS))
+
+        os.makedirs(cache_dir, exist_ok=True)
+
+        chrome_options.add_argument(f"--disk-cache-dir={cache_dir}")
+
+    if config.NETWORK_REPORT:
+        # Read back by helpers.network_filter.page_report
+        chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+    # Enable headless mode
+    if headless:
+        chrome_options.add_argument("--headless=new")
+        chrome_options.add_argument("--window-size=1920,1080")
+
+    return chrome_options
+
+
+def build_service() -> Service:
+    """
+    Chromedriver service, using config.CHROMEDRIVER_PATH when set.
+
+    A pinned path skips Selenium Manager, which otherwise looks up the driver (possibly over the network) on every launch.
+    """
+
+    if config.CHROMEDRIVER_PATH:
+        return Service(executable_path=config.CHROMEDRIVER_PATH)
+
+    return Service()
@@ -0,0 +1,183 @@
+"""Circuit breakers for the external dependencies: OPUS, OS2Forms, ATS and SharePoint"""
+
+import functools
+import logging
+import threading
+import time
+from collections import deque
+
+from helpers import config
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit is open"""
+
+    def __init__(self, breaker: "CircuitBreaker"):
+        super().__init__(f"{breaker.name} is unavailable (circuit open for another {breaker.remaining_open_seconds():.0f}s)")
+
+        self.breaker = breaker
+
+
+class CircuitBreaker:
+    """
+    Tracks the outcome of the last calls to a dependency.
+
+    When at least min_calls of the last window calls were made and failure_rate of them failed, the circuit opens
+    and calls fail fast with CircuitOpenError for open_seconds. After that a single probe call is let through:
+    success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, name: str, window: int, min_calls: int, failure_rate: float, open_seconds: float):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+
+        self.state = CLOSED
+
+        self._lock = threading.Lock()
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probing = False
+
+    def remaining_open_seconds(self) -> float:
+        """Seconds until the circuit lets a probe call through, 0 if it is not open."""
+
+        if self.state != OPEN:
+            return 0.0
+
+        return max(self._opened_at + self.open_seconds - time.monotonic(), 0.0)
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError if the call may not go through."""
+
+        with self._lock:
+            if self.state == OPEN and self.remaining_open_seconds() == 0:
+                logger.info(f"Circuit for {self.name} half-open, probing")
+
+                self.state = HALF_OPEN
+                self._probing = False
+
+            if self.state == OPEN or (self.state == HALF_OPEN and self._probing):
+                raise CircuitOpenError(self)
+
+            if self.state == HALF_OPEN:
+                self._probing = True
+
+    def record_success(self) -> None:
+        """Record a successful call."""
+
+        with self._lock:
+            if self.state == HALF_OPEN:
+                logger.info(f"Circuit for {self.name} closed again")
+
+                self._outcomes.clear()
+
+            self.state = CLOSED
+            self._probing = False
+            self._outcomes.append(True)
+
+    def record_failure(self) -> None:
+        """Record a failed call, opening the circuit if the failure rate is reached."""
+
+        with self._lock:
+            self._outcomes.append(False)
+
+            failures = self._outcomes.count(False)
+
+            tripped = len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_rate
+
+            if self.state == HALF_OPEN or tripped:
+                if self.state != OPEN:
+                    logger.warning(f"Circuit for {self.name} opened after {failures} of the last {len(self._outcomes)} calls failed")
+
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    def reset(self) -> None:
+        """Close the circuit and forget all outcomes."""
+
+        with self._lock:
+            self.state = CLOSED
+            self._outcomes.clear()
+            self._probing = False
+
+
+def _new_breaker(name: str) -> CircuitBreaker:
+    return CircuitBreaker(
+        name=name,
+        window=config.CIRCUIT_WINDOW,
+        min_calls=config.CIRCUIT_MIN_CALLS,
+        failure_rate=config.CIRCUIT_FAILURE_RATE,
+        open_seconds=config.CIRCUIT_OPEN_SECONDS,
+    )
+
+
+BREAKERS = {name: _new_breaker(name) for name in ("opus", "os2forms", "ats", "sharepoint")}
+
+
+def guard(name: str, ignore: tuple[type[BaseException], ...] = ()):
+    """
+    Decorator that runs a function through the named circuit breaker.
+
+    Exceptions in ignore are business outcomes, not dependency failures, and count as successful calls.
+    """
+
+    breaker = BREAKERS[name]
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            breaker.before_call()
+
+            try:
+                result = func(*args, **kwargs)
+
+            except ignore:
+                breaker.record_success()
+
+                raise
+
+            except Exception:
+                breaker.record_failure()
+
+                raise
+
+            breaker.record_success()
+
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def wait_until_half_open(breaker: CircuitBreaker, waited: float) -> float | None:
+    """
+    Sleep until the breaker lets a probe through, unless that would take the total wait this run past
+    config.CIRCUIT_MAX_WAIT.
+
+    Returns:
+        float | None: The total seconds waited so far, None if the caller should give up.
+    """
+
+    remaining = breaker.remaining_open_seconds()
+
+    if waited + remaining > config.CIRCUIT_MAX_WAIT:
+        logger.error(f"{breaker.name} still unavailable after waiting {waited:.0f}s, giving up")
+
+        return None
+
+    logger.info(f"Waiting {remaining:.0f}s for {breaker.name} before probing")
+
+    time.sleep(remaining)
+
+    return waited + remaining
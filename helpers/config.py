@@ -15,6 +15,33 @@ RETRY_BASE_DELAY = 0.5  # seconds (exponential backoff)
 # Whether the robot should be marked as failed if MAX_RETRY_COUNT is reached.
 FAIL_ROBOT_ON_TOO_MANY_ERRORS = True
 
+# ----------------------
+# Timing instrumentation
+# ----------------------
+# Set TIMING_ENABLED=1 to record per-stage timings for each item
+TIMING_ENABLED = os.getenv("TIMING_ENABLED", "").lower() in ("1", "true", "yes")
+TIMING_LOG_PATH = os.getenv("TIMING_LOG_PATH", "C:\\tmp\\Koerselsgodtgoerelse_timings.jsonl")
+
+# SMTP connections are kept open for the run and checked with NOOP when idle for longer than this
+SMTP_TIMEOUT = 30  # seconds
+SMTP_HEALTHCHECK_INTERVAL = 60  # seconds
+SMTP_MAX_RETRIES = 2  # reconnects per message before giving up
+
+# Error emails: the first ERROR_IMMEDIATE_PER_TYPE errors of each type are sent at once,
+# the rest are batched into one digest per ERROR_DIGEST_WINDOW seconds (0 = one digest at the end of the run)
+ERROR_IMMEDIATE_PER_TYPE = 3
+ERROR_DIGEST_WINDOW = 30 * 60
+
+# Error screenshots are taken from the OPUS browser and re-encoded off the processing thread
+SCREENSHOT_SIZE = (960, 540)
+SCREENSHOT_FORMAT = "JPEG"  # or "WEBP"
+SCREENSHOT_QUALITY = 70
+SCREENSHOT_MAX_BYTES = 200_000
+# The OPUS page source holds the CPR numbers in plain text, so it is only attached when debugging
+SCREENSHOT_INCLUDE_DOM = False
+SCREENSHOT_DOM_MAX_BYTES = 500_000
+SCREENSHOT_TIMEOUT = 30  # seconds the email sender waits for an encoded screenshot
+
 # Error screenshot config
 SMTP_SERVER = "smtp.adm.aarhuskommune.dk"
 SMTP_PORT = 25
@@ -22,6 +49,16 @@ SCREENSHOT_SENDER = "robot@friend.dk"
 
 # Constant/Credential names
 ERROR_EMAIL = "Error Email"
+ERROR_SENDER = "Email Friend"
+NOREPLY_EMAIL = "e-mail_noreply"
+PROCARGS = "egenbefordring_procargs"
+OPUS_CREDENTIAL = "egenbefordring_udbetaling"
+OS2_API_CREDENTIAL = "os2_api"
+
+# Constants and credentials fetched in one connection at startup and cached for the run
+PREFETCH_CONSTANTS = [PROCARGS, NOREPLY_EMAIL, ERROR_EMAIL, ERROR_SENDER, "smtp_server", "smtp_port"]
+PREFETCH_CREDENTIALS = [OPUS_CREDENTIAL, OS2_API_CREDENTIAL]
+CONSTANTS_CACHE_TTL = 6 * 60 * 60  # seconds
 
 SERVICE_NOW_API_DEV_USER = "service_now_dev_user"
 SERVICE_NOW_API_PROD_USER = "service_now_prod_user"
@@ -36,8 +73,13 @@ MAX_TASK_COUNT = 100
 
 PATH = "C:\\tmp\\Koerselsgodtgoerelse"
 
+OPUS_PORTAL_URL = os.getenv("OPUS_PORTAL_URL", "https://portal.kmd.dk/irj/portal")
+
 SHAREPOINT_SITE_URL = "https://aarhuskommune.sharepoint.com"
 
+# The receipts are downloaded from here, checked for reachability when --process starts
+OS2FORMS_URL = os.getenv("OS2FORMS_URL", "https://selvbetjening.aarhuskommune.dk")
+
 # SHAREPOINT_SITE_NAME = "MBU-RPA-Egenbefordring"
 SHAREPOINT_SITE_NAME = "MBURPA"
 
@@ -53,5 +95,90 @@ SHAREPOINT_KWARGS = {
     "document_library": DOCUMENT_LIBRARY,
 }
 
+# SharePoint access tokens are shared by all clients in the process and refreshed this many seconds before they expire.
+# The token cache is persisted encrypted at SHAREPOINT_TOKEN_CACHE_PATH so --queue and --process runs can share it ("" disables).
+SHAREPOINT_TOKEN_REFRESH_MARGIN = 5 * 60
+SHAREPOINT_TOKEN_CACHE_PATH = os.getenv("SHAREPOINT_TOKEN_CACHE_PATH", os.path.join(os.path.expanduser("~"), ".egenbefordring", "sharepoint_token_cache.bin"))
+
+# Journal of the stages each item has been through, so a restarted robot can resume unfinished items.
+# Kept outside PATH, since the queue stage empties PATH.
+JOURNAL_PATH = os.getenv("JOURNAL_PATH", os.path.join(os.path.expanduser("~"), ".egenbefordring", "journal.jsonl"))
+JOURNAL_FSYNC = True
+
+# Fingerprints of the queued rows, so --queue only transforms rows that are new or changed ("" disables).
+# Kept outside PATH, since the queue stage empties PATH.
+ROW_FINGERPRINT_PATH = os.getenv("ROW_FINGERPRINT_PATH", os.path.join(os.path.expanduser("~"), ".egenbefordring", "row_fingerprints.json"))
+
+# How the result workbook is written at finalization:
+# "patch" writes the behandlet marks into the original workbook saved by the queue stage,
+# "rebuild" builds a new workbook from the rows stored on the work items
+RESULT_WRITER_MODE = os.getenv("RESULT_WRITER_MODE", "patch")
+
+# Hashes of the last uploaded result workbooks are kept in this file under PATH, so unchanged workbooks are not uploaded again.
+# Verifying against SharePoint costs a folder listing, but catches files deleted or replaced there.
+UPLOAD_HASH_STORE_FILE = "upload_hashes.json"
+UPLOAD_GUARD_VERIFY_REMOTE = False
+
+# Sheets waiting in FOLDER_NAME are downloaded and parsed concurrently by the queue stage
+QUEUE_FILE_WORKERS = 4
+
+# Queue items parsed ahead of the workers adding them to the queue, parsing pauses while the buffer is full
+QUEUE_BUFFER_SIZE = 500
+
+# With both --queue and --process, items added by this process are handed to the processing side from memory,
+# up to this many at a time
+PIPELINE_CACHE_SIZE = 1000
+
+# Receipts of failed items are uploaded concurrently, files above the chunk size through an upload session
+SHAREPOINT_UPLOAD_WORKERS = 4
+SHAREPOINT_UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024  # bytes
+SHAREPOINT_UPLOAD_RETRIES = 3
+SHAREPOINT_UPLOAD_BACKOFF = 1.0  # seconds (exponential backoff)
+
+# Cookies and local storage of the OPUS login are saved encrypted here, so new browsers skip the login while
+# the session is valid ("" disables). Restoring waits this many seconds for the portal to show it is logged in.
+OPUS_SESSION_PATH = os.getenv("OPUS_SESSION_PATH", os.path.join(os.path.expanduser("~"), ".egenbefordring", "opus_session.bin"))
+OPUS_SESSION_CHECK_TIMEOUT = 10
+
+# Chrome launch profile for OPUS, see helpers.chrome_profiles.PROFILES ("default", "eager" or "fast").
+# CHROMEDRIVER_PATH pins the driver instead of resolving it through Selenium Manager on every launch.
+CHROME_PROFILE = os.getenv("CHROME_PROFILE", "default")
+CHROMEDRIVER_PATH = os.getenv("CHROMEDRIVER_PATH", "")
+CHROME_CACHE_DIR = os.getenv("CHROME_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".egenbefordring", "chrome_cache"))
+
+# URL patterns (DevTools wildcards) blocked in the OPUS browser by launch profiles with block_requests,
+# and whether a per page report of blocked, cached and transferred requests is logged
+BLOCKED_URL_PATTERNS = [
+    "*.png",
+    "*.jpg",
+    "*.jpeg",
+    "*.gif",
+    "*.ico",
+    "*.woff",
+    "*.woff2",
+    "*.ttf",
+    "*google-analytics.com*",
+    "*googletagmanager.com*",
+    "*doubleclick.net*",
+]
+# Reading the performance log costs a round trip per page, so the report is off outside benchmarks/e2e.py
+NETWORK_REPORT = False
+
+# The OPUS browser is checked before each item and replaced after BROWSER_RECYCLE_AFTER items or when the page's
+# JS heap passes BROWSER_MAX_HEAP_MB. With BROWSER_WARM_SPARE a second browser is kept launched and logged in for the swap.
+BROWSER_RECYCLE_AFTER = 50
+BROWSER_MAX_HEAP_MB = 512
+BROWSER_WARM_SPARE = True
+
+# Circuit breakers for OPUS, OS2Forms, ATS and SharePoint: a dependency is considered down when at least
+# CIRCUIT_MIN_CALLS of its last CIRCUIT_WINDOW calls were made and CIRCUIT_FAILURE_RATE of them failed.
+# Calls then fail fast for CIRCUIT_OPEN_SECONDS before a single probe is let through. Items hitting an open
+# circuit are released back to the queue, and the run gives up after waiting CIRCUIT_MAX_WAIT in total.
+CIRCUIT_WINDOW = 10
+CIRCUIT_MIN_CALLS = 3
+CIRCUIT_FAILURE_RATE = 0.6
+CIRCUIT_OPEN_SECONDS = 120
+CIRCUIT_MAX_WAIT = 15 * 60  # seconds
+
 # FOLDER_NAME = "General/Til udbetaling"
 FOLDER_NAME = "Egenbefordring/Til udbetaling"
@@ -0,0 +1,89 @@
+"""Process-wide cache of the constants and credentials fetched from the RPA database"""
+
+import logging
+import threading
+import time
+
+from mbu_dev_shared_components.database.connection import RPAConnection
+
+from helpers import config, timing
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.RLock()
+
+_constants: dict[str, dict] = {}
+_credentials: dict[str, dict] = {}
+
+_fetched_at: float | None = None
+
+
+def prefetch(constants: list[str] | None = None, credentials: list[str] | None = None) -> None:
+    """
+    Fetch all constants and credentials used by the process in a single database connection.
+
+    The configured names, any extra names given and names fetched earlier in the run are all fetched,
+    so the whole cache shares one timestamp.
+    """
+
+    global _fetched_at  # pylint: disable=global-statement
+
+    constant_names = set(config.PREFETCH_CONSTANTS) | set(constants or []) | set(_constants)
+    credential_names = set(config.PREFETCH_CREDENTIALS) | set(credentials or []) | set(_credentials)
+
+    with _lock, timing.span("db.prefetch_constants"):
+        logger.info(f"Fetching {len(constant_names)} constants and {len(credential_names)} credentials")
+
+        with RPAConnection(db_env="PROD", commit=False) as rpa_conn:
+            fetched_constants = {name: rpa_conn.get_constant(name) for name in constant_names}
+            fetched_credentials = {name: rpa_conn.get_credential(name) for name in credential_names}
+
+        _constants.update(fetched_constants)
+        _credentials.update(fetched_credentials)
+
+        _fetched_at = time.monotonic()
+
+
+def refresh() -> None:
+    """Force a refetch of everything in the cache."""
+
+    prefetch()
+
+
+def _ensure_fresh(cache: dict, name: str, force_refresh: bool, **prefetch_kwargs) -> None:
+    """Prefetch when the cache is expired, forced or missing the name."""
+
+    expired = _fetched_at is None or time.monotonic() - _fetched_at > config.CONSTANTS_CACHE_TTL
+
+    if force_refresh or expired or name not in cache:
+        prefetch(**prefetch_kwargs)
+
+
+def get_constant(constant_name: str, force_refresh: bool = False) -> dict:
+    """Return a constant in the same shape as RPAConnection.get_constant."""
+
+    with _lock:
+        _ensure_fresh(_constants, constant_name, force_refresh, constants=[constant_name])
+
+        return _constants[constant_name]
+
+
+def get_credential(credential_name: str, force_refresh: bool = False) -> dict:
+    """Return a credential in the same shape as RPAConnection.get_credential."""
+
+    with _lock:
+        _ensure_fresh(_credentials, credential_name, force_refresh, credentials=[credential_name])
+
+        return _credentials[credential_name]
+
+
+def clear() -> None:
+    """Drop everything from the cache."""
+
+    global _fetched_at  # pylint: disable=global-statement
+
+    with _lock:
+        _constants.clear()
+        _credentials.clear()
+
+        _fetched_at = None
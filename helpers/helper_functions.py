@@ -7,6 +7,8 @@ import ast
 
 import shutil
 
+from collections.abc import Iterable, Iterator
+
 from datetime import datetime
 
 from io import BytesIO
@@ -18,15 +20,22 @@ import pandas as pd
 from mbu_dev_shared_components.os2forms import documents
 
 from mbu_dev_shared_components.utils.fernet_encryptor import Encryptor
-from mbu_dev_shared_components.database.connection import RPAConnection
 
 from mbu_msoffice_integration.sharepoint_class import Sharepoint
 
-from helpers import config, smtp_util, ats_functions
+from openpyxl import load_workbook
+
+from helpers import config, constants_cache, smtp_util, ats_functions, circuit_breaker, journal, result_workbook, timing
 from processes import finalize_process
 
 logger = logging.getLogger(__name__)
 
+# Columns read as text, so CPR numbers keep their digits as written
+TEXT_COLUMNS = ("cpr_barnet", "cpr_nr", "cpr_nr_paaanden")
+
+# Amounts transform_row formats as text, with some typed in as numbers and some as text
+AMOUNT_COLUMNS = ("beloeb_i_alt", "aendret_beloeb_i_alt")
+
 
 def delete_all_files_in_path(path):
     """Delete all files and directories in the given path."""
@@ -55,8 +64,8 @@ def delete_all_files_in_path(path):
             logger.info(f"Failed to delete {file_path}. Reason: {e}")
 
 
-def fetch_files(folder_name, sharepoint):
-    """Download Excel files from SharePoint to the specified path."""
+def fetch_files(folder_name, sharepoint) -> list[str]:
+    """List the names of the Excel files waiting in the SharePoint folder."""
 
     files = sharepoint.fetch_files_list(folder_name)
     logger.info(files)
@@ -64,21 +73,12 @@ def fetch_files(folder_name, sharepoint):
     if not files:
         logger.info("No files found in the specified SharePoint folder.")
 
-    if len(files) > 1:
-        raise Exception(f"More than 1 file in folder - len of files: {len(files)}")
-
-    file_name = files[0].get("Name")
+    return [file.get("Name") for file in files]
 
-    return file_name
-
-
-def load_excel_data(file_name: str, sharepoint: Sharepoint) -> pd.DataFrame:
-    """
-    Load an Excel file from SharePoint into a pandas DataFrame,
-    keeping only rows where 'godkendt' contains 'x' (case-insensitive).
-    """
 
-    logger.info("Loading Excel data...")
+@timing.span("sharepoint.download_sheet")
+def download_sheet(file_name: str, sharepoint: Sharepoint) -> bytes:
+    """Download a sheet from the SharePoint folder, keeping the original for the result workbook."""
 
     bytes_data = sharepoint.fetch_file_using_open_binary(
         file_name=file_name,
@@ -88,107 +88,161 @@ def load_excel_data(file_name: str, sharepoint: Sharepoint) -> pd.DataFrame:
     if not bytes_data:
         raise ValueError("No data returned from SharePoint")
 
-    df = pd.read_excel(
-        BytesIO(bytes_data),
-        dtype={
-            "cpr_barnet": str,
-            "cpr_nr": str,
-            "cpr_nr_paaanden": str,
-        },
-    )
+    if config.RESULT_WRITER_MODE == "patch":
+        result_workbook.save_original(file_name, bytes_data)
 
-    logger.info(f"Rows before filtering: {len(df)}")
+    return bytes_data
 
-    df = df[
-        df["godkendt"]
-        .astype(str)
-        .str.lower()
-        .str.contains("x", na=False)
-    ]
 
-    logger.info(f"Rows after filtering on godkendt='x': {len(df)}")
+def _as_text(value):
+    """Read a number cell as text the way pandas does with dtype=str, e.g. 511095313 -> '511095313'."""
 
-    return df
+    if value is None or isinstance(value, str):
+        return value
 
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
 
-def process_data(df: pd.DataFrame, naeste_agent: str, file_name) -> pd.DataFrame:
-    """Process the data and return a DataFrame with the required format."""
+    return str(value)
 
-    encryptor = Encryptor()
 
-    processed_data = []
+def _as_amount(value):
+    """Read an amount cell the way pandas does in a column of mixed values, e.g. 250.0 -> 250."""
+
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+
+    return value
+
+
+def iter_approved_rows(bytes_data: bytes) -> Iterator[dict]:
+    """
+    Stream the rows of the first sheet where 'godkendt' contains 'x' (case-insensitive), one dict per row.
+
+    The workbook is read in openpyxl's read-only mode, so only the current row is held in memory, and the first
+    row is yielded without reading the rest of the sheet. The columns transform_row formats get the values
+    pandas.read_excel with the TEXT_COLUMNS as text used to give. The other columns keep openpyxl's values, so
+    e.g. a date stays a datetime and a whole number in a column with empty cells stays an int.
+    """
+
+    wb = load_workbook(BytesIO(bytes_data), read_only=True, data_only=True)
+
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+
+        header = [str(value) if value is not None else f"Unnamed: {i}" for i, value in enumerate(next(rows, ()))]
+
+        text_columns = [column for column in header if column in TEXT_COLUMNS]
+        amount_columns = [column for column in header if column in AMOUNT_COLUMNS]
+
+        total = approved = 0
+
+        for values in rows:
+            row = dict.fromkeys(header)
+            row.update(zip(header, values))
+
+            if not any(value is not None for value in row.values()):
+                continue
+
+            total += 1
+
+            if "x" not in str(row.get("godkendt") or "").lower():
+                continue
+
+            approved += 1
+
+            for column in text_columns:
+                row[column] = _as_text(row[column])
+
+            for column in amount_columns:
+                row[column] = _as_amount(row[column])
+
+            yield row
 
-    for _, row in df.iterrows():
-        cpr_nr = (
-            str(row["cpr_nr_paaanden"])
-            if not pd.isnull(row["cpr_nr_paaanden"])
-            else str(row["cpr_nr"])
-        )
+        logger.info(f"{approved} of {total} rows have godkendt='x'")
 
-        attachments_str = str(row.get("attachments", ""))
-        url = extract_url_from_attachments(attachments_str)
+    finally:
+        wb.close()
 
-        skoleliste = (
-            str(row["skoleliste"]).lower() if not pd.isnull(row["skoleliste"]) else ""
-        )
 
-        barnets_navn = str(row["barnets_navn"])
+def transform_rows(rows: Iterable[dict], naeste_agent: str, file_name) -> Iterator[dict]:
+    """Transform sheet rows one at a time, see transform_row."""
 
-        month_year = extract_months_and_year(row["test"])
-        month_year_child_name = f"{month_year}_{barnets_navn}"
+    encryptor = Encryptor()
 
-        psp_value = determine_psp_value(skoleliste, row)
+    for row in rows:
+        yield transform_row(row, naeste_agent, file_name, encryptor)
 
-        encrypted_cpr = encryptor.encrypt(cpr_nr).decode("utf-8")
 
-        # Ensure that the beloeb value is a string, replace all . with , and keep only the last comma
-        beloeb_value = (
-            row["aendret_beloeb_i_alt"]
-            if not pd.isnull(row["aendret_beloeb_i_alt"])
-            else row["beloeb_i_alt"]
-        )
+def transform_row(row: dict, naeste_agent: str, file_name, encryptor: Encryptor) -> dict:
+    """Transform one sheet row into the item data the process needs, with the CPR number encrypted."""
 
-        if pd.notnull(beloeb_value):
-            # Replace all periods with commas
-            beloeb_value = str(beloeb_value).replace(".", ",")
+    cpr_nr = (
+        str(row["cpr_nr_paaanden"])
+        if not pd.isnull(row["cpr_nr_paaanden"])
+        else str(row["cpr_nr"])
+    )
 
-            # If there are multiple commas, keep only the last one
-            if beloeb_value.count(",") > 1:
-                parts = beloeb_value.split(",")
+    attachments_str = str(row.get("attachments", ""))
+    url = extract_url_from_attachments(attachments_str)
 
-                # Join all but the last part without commas, then add the last part with a comma
-                beloeb_value = "".join(parts[:-1]) + "," + parts[-1]
+    skoleliste = (
+        str(row["skoleliste"]).lower() if not pd.isnull(row["skoleliste"]) else ""
+    )
 
-        raw_excel_data = {k: nan_to_none(v) for k, v in row.to_dict().items()}
+    barnets_navn = str(row["barnets_navn"])
 
-        new_row = {
-            "file_name": file_name,
-            "cpr_encrypted": encrypted_cpr,
-            "barnets_navn": barnets_navn,
-            "beloeb": beloeb_value,
-            "reference": month_year_child_name,
-            "arts_konto": "40430002",
-            "psp": psp_value,
-            "posteringstekst": f"Egenbefordring {month_year}",
-            "naeste_agent": naeste_agent,
-            "attachment": url,
-            "uuid": row.get("uuid", pd.NA),
-            "godkendt_af": row.get("godkendt_af", pd.NA),
-            "skole": row["skriv_dit_barns_skole_eller_dagtilbud"]
-            if not pd.isnull(row["skriv_dit_barns_skole_eller_dagtilbud"])
-            else row["skoleliste"],
-            "is_godkendt": "x" in str(row.get("godkendt", "")).lower(),
-            "evt_kommentar": None if pd.isna(row.get("evt_kommentar")) else row.get("evt_kommentar"),
-            "raw_excel_data": raw_excel_data
-        }
+    month_year = extract_months_and_year(row["test"])
+    month_year_child_name = f"{month_year}_{barnets_navn}"
 
-        new_row = {k: nan_to_none(v) for k, v in new_row.items()}
+    psp_value = determine_psp_value(skoleliste, row)
 
-        processed_data.append(new_row)
+    encrypted_cpr = encryptor.encrypt(cpr_nr).decode("utf-8")
 
-    df_processed = pd.DataFrame(processed_data)
+    # Ensure that the beloeb value is a string, replace all . with , and keep only the last comma
+    beloeb_value = (
+        row["aendret_beloeb_i_alt"]
+        if not pd.isnull(row["aendret_beloeb_i_alt"])
+        else row["beloeb_i_alt"]
+    )
 
-    return df_processed
+    if pd.notnull(beloeb_value):
+        # Replace all periods with commas
+        beloeb_value = str(beloeb_value).replace(".", ",")
+
+        # If there are multiple commas, keep only the last one
+        if beloeb_value.count(",") > 1:
+            parts = beloeb_value.split(",")
+
+            # Join all but the last part without commas, then add the last part with a comma
+            beloeb_value = "".join(parts[:-1]) + "," + parts[-1]
+
+    raw_excel_data = {k: nan_to_none(v) for k, v in row.items()}
+
+    new_row = {
+        "file_name": file_name,
+        "cpr_encrypted": encrypted_cpr,
+        "barnets_navn": barnets_navn,
+        "beloeb": beloeb_value,
+        "reference": month_year_child_name,
+        "arts_konto": "40430002",
+        "psp": psp_value,
+        "posteringstekst": f"Egenbefordring {month_year}",
+        "naeste_agent": naeste_agent,
+        "attachment": url,
+        "uuid": row.get("uuid", pd.NA),
+        "godkendt_af": row.get("godkendt_af", pd.NA),
+        "skole": row["skriv_dit_barns_skole_eller_dagtilbud"]
+        if not pd.isnull(row["skriv_dit_barns_skole_eller_dagtilbud"])
+        else row["skoleliste"],
+        "is_godkendt": "x" in str(row.get("godkendt", "")).lower(),
+        "evt_kommentar": None if pd.isna(row.get("evt_kommentar")) else row.get("evt_kommentar"),
+        "raw_excel_data": raw_excel_data
+    }
+
+    new_row = {k: nan_to_none(v) for k, v in new_row.items()}
+
+    return new_row
 
 
 def nan_to_none(value):
@@ -257,7 +311,7 @@ def extract_url_from_attachments(attachments_str: str) -> str:
     return pd.NA
 
 
-def determine_psp_value(skoleliste: str, row: pd.Series) -> str:
+def determine_psp_value(skoleliste: str, row: dict) -> str:
     """Determine PSP value based on school list."""
 
     if (
@@ -326,6 +380,7 @@ def get_status_params(journalizing_table: bool = True, form_id: str = ""):
     return status_params_inprogress, status_params_success, status_params_failed, status_params_manual
 
 
+@circuit_breaker.guard("os2forms", ignore=(ValueError,))
 def fetch_receipt(item_data, os2_api_key):
     """Fetch a receipt from OS2FORMS and save it to the specified path."""
 
@@ -369,6 +424,18 @@ def fetch_receipt(item_data, os2_api_key):
     return new_path, file_content
 
 
+def receipt_folder_path(item_data) -> str:
+    """The local folder fetch_receipt saves an item's receipt in."""
+
+    return os.path.join(config.PATH, os.path.splitext(item_data.get("file_name"))[0])
+
+
+def receipt_exists(folder_path, item_data) -> bool:
+    """Whether the receipt of an item has already been saved in folder_path."""
+
+    return os.path.exists(os.path.join(folder_path, f'receipt_{item_data["uuid"]}.pdf'))
+
+
 def remove_attachment_if_exists(folder_path, item_data):
     """Remove the attachment file if it exists."""
 
@@ -381,15 +448,60 @@ def remove_attachment_if_exists(folder_path, item_data):
 
 
 def handle_post_process(failed: bool, item_data: str, item_reference: str):
-    """Update the Excel file with the status of the element."""
-
-    ats_functions.update_work_item_data(item_reference, failed)
+    """
+    Update the Excel file with the status of the element.
 
-    logger.info(f"Behandlet status updated to {'failed' if failed else 'succeeded'}")
+    If ATS or SharePoint is behind an open circuit, the post processing is journaled as pending before
+    the CircuitOpenError is raised, and retry_pending_post_processing does it once the circuit closes.
+    """
 
     current_run_file_name = item_data.get("file_name")
 
-    finalize_process.finalize_process(current_run_file_name=current_run_file_name)
+    try:
+        if journal.reached(item_reference, "reported"):
+            logger.info(f"Resuming {item_reference}: behandlet status already updated")
+
+        else:
+            with timing.span("update_work_item_data"):
+                ats_functions.update_work_item_data(item_reference, failed)
+
+            journal.record(item_reference, "reported", failed=failed)
+
+            logger.info(f"Behandlet status updated to {'failed' if failed else 'succeeded'}")
+
+        with timing.span("finalize_process"):
+            finalize_process.finalize_process(current_run_file_name=current_run_file_name)
+
+    except circuit_breaker.CircuitOpenError:
+        # Updating the behandlet status again on the retry does no harm
+        journal.record(item_reference, "post_process_pending", failed=failed, file_name=current_run_file_name)
+
+        raise
+
+
+def retry_pending_post_processing():
+    """Post process the items an open circuit put off, in this run or an earlier one."""
+
+    for entry in journal.pending_post_processing():
+        item_reference = entry["reference"]
+
+        failed = entry.get("failed", False)
+
+        try:
+            if not failed:
+                # Completed first, so finalize_process sees the item as done
+                ats_functions.complete_work_item(item_reference, "OPUS ticket created, behandlet status updated after a retry")
+
+            handle_post_process(failed=failed, item_data={"file_name": entry.get("file_name")}, item_reference=item_reference)
+
+        except circuit_breaker.CircuitOpenError as e:
+            logger.warning(f"Post processing of {item_reference} is still pending: {e}")
+
+            continue
+
+        journal.record(item_reference, "closed")
+
+        logger.info(f"Finished the pending post processing of {item_reference}")
 
 
 def ensure_columns(df: pd.DataFrame, column_order: list) -> pd.DataFrame:
@@ -418,14 +530,13 @@ def send_mail(failed_work_items: bool):
 
     logger.info("Sending email")
 
-    with RPAConnection(db_env="PROD", commit=False) as rpa_conn:
-        # egenbefordring_procargs = json.loads(rpa_conn.get_constant(constant_name="egenbefordring_procargs").get("value"))
-        # email_receivers = egenbefordring_procargs.get("notification_email")
+    # egenbefordring_procargs = json.loads(constants_cache.get_constant(config.PROCARGS).get("value"))
+    # email_receivers = egenbefordring_procargs.get("notification_email")
 
-        email_sender = rpa_conn.get_constant("e-mail_noreply").get("value")
+    email_sender = constants_cache.get_constant(config.NOREPLY_EMAIL).get("value")
 
-        smtp_server = rpa_conn.get_constant("smtp_server").get("value")
-        smtp_port = rpa_conn.get_constant("smtp_port").get("value")
+    smtp_server = constants_cache.get_constant("smtp_server").get("value")
+    smtp_port = constants_cache.get_constant("smtp_port").get("value")
 
     if failed_work_items:
         folder_dest = "Fejlet"
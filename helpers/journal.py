@@ -0,0 +1,157 @@
+"""Append-only journal of the stages each work item has been through, used to resume after a crash"""
+
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+
+from helpers import config
+
+logger = logging.getLogger(__name__)
+
+# Stages in the order an item goes through them
+STAGES = (
+    "started",
+    "receipt_fetched",
+    "form_filled",
+    "controlled",
+    "created",
+    "post_process_pending",
+    "reported",
+)
+
+# Stages after which the item needs nothing more from this robot
+FINAL_STAGES = ("completed", "failed", "pending_user", "closed")
+
+_lock = threading.Lock()
+
+_last_entries: dict[str, dict] | None = None
+
+_partial_line = False
+
+
+def _load() -> dict[str, dict]:
+    """Read the last entry of every reference from the journal file on first use."""
+
+    global _last_entries, _partial_line  # pylint: disable=global-statement
+
+    if _last_entries is None:
+        _last_entries = {}
+
+        try:
+            with open(config.JOURNAL_PATH, encoding="utf-8") as f:
+                content = f.read()
+
+        except OSError:
+            content = ""
+
+        for line in content.splitlines():
+            try:
+                entry = json.loads(line)
+
+            except ValueError:
+                # An entry cut short by a crash
+                continue
+
+            _last_entries[entry["reference"]] = entry
+
+        # Make sure the next entry does not end up on the same line as a cut short one
+        _partial_line = bool(content) and not content.endswith("\n")
+
+    return _last_entries
+
+
+def _write(path: str, lines: list[str], mode: str = "a") -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with open(path, mode, encoding="utf-8") as f:
+        f.writelines(lines)
+        f.flush()
+
+        if config.JOURNAL_FSYNC:
+            os.fsync(f.fileno())
+
+
+def record(reference: str, stage: str, **details) -> None:
+    """Append a stage transition for a work item and flush it to disk."""
+
+    if stage not in STAGES and stage not in FINAL_STAGES:
+        raise ValueError(f"Unknown journal stage: {stage}")
+
+    entry = {"reference": reference, "stage": stage, "at": datetime.now().isoformat(timespec="seconds"), **details}
+
+    global _partial_line  # pylint: disable=global-statement
+
+    with _lock:
+        _load()[reference] = entry
+
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+
+        if _partial_line:
+            line = "\n" + line
+            _partial_line = False
+
+        try:
+            _write(config.JOURNAL_PATH, [line])
+
+        except OSError as e:
+            logger.warning(f"Could not write journal entry for {reference}: {e}")
+
+
+def last_stage(reference: str) -> str | None:
+    """The last stage recorded for a work item."""
+
+    with _lock:
+        entry = _load().get(reference)
+
+    return entry["stage"] if entry else None
+
+
+def reached(reference: str, stage: str) -> bool:
+    """Whether a work item has completed the given stage in an earlier attempt."""
+
+    last = last_stage(reference)
+
+    if last is None:
+        return False
+
+    if last in FINAL_STAGES:
+        return True
+
+    return STAGES.index(last) >= STAGES.index(stage)
+
+
+def unfinished() -> list[str]:
+    """References of the items that were started but never reached a final stage."""
+
+    with _lock:
+        return [reference for reference, entry in _load().items() if entry["stage"] not in FINAL_STAGES]
+
+
+def pending_post_processing() -> list[dict]:
+    """The last entries of the items whose post processing was put off by an open circuit."""
+
+    with _lock:
+        return [dict(entry) for entry in _load().values() if entry["stage"] == "post_process_pending"]
+
+
+def compact() -> None:
+    """Rewrite the journal with only the last entry of the unfinished items."""
+
+    with _lock:
+        entries = _load()
+
+        for reference in [r for r, entry in entries.items() if entry["stage"] in FINAL_STAGES]:
+            del entries[reference]
+
+        lines = [json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries.values()]
+
+        # Write a new file and swap it in, so a crash while compacting leaves the old journal intact
+        try:
+            _write(config.JOURNAL_PATH + ".tmp", lines, mode="w")
+
+            os.replace(config.JOURNAL_PATH + ".tmp", config.JOURNAL_PATH)
+
+        except OSError as e:
+            logger.warning(f"Could not compact journal: {e}")
@@ -0,0 +1,131 @@
+"""Request blocking and network savings report for the OPUS pages, through the Chrome DevTools protocol"""
+
+import json
+import logging
+import threading
+
+from selenium.common.exceptions import WebDriverException
+
+from helpers import config
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+
+_totals = {"requests": 0, "blocked": 0, "from_cache": 0, "bytes_transferred": 0, "bytes_from_cache": 0}
+
+
+def install(browser, blocked_urls: list[str]) -> None:
+    """
+    Enable the network domain on a new browser, keep its HTTP cache on and block the given URL patterns.
+
+    Patterns use the DevTools wildcard syntax, e.g. "*.gif" or "*google-analytics.com*".
+    """
+
+    try:
+        browser.execute_cdp_cmd("Network.enable", {})
+        browser.execute_cdp_cmd("Network.setCacheDisabled", {"cacheDisabled": False})
+
+        if blocked_urls:
+            browser.execute_cdp_cmd("Network.setBlockedURLs", {"urls": blocked_urls})
+
+    except WebDriverException as e:
+        logger.warning(f"Could not set up request blocking: {e}")
+
+
+def _summarize(entries: list[dict]) -> dict:
+    """Count requests, blocked requests and cache hits in DevTools network events from the performance log."""
+
+    requests, blocked, cached = set(), set(), set()
+    received: dict[str, int] = {}
+    transferred = 0
+
+    for entry in entries:
+        try:
+            message = json.loads(entry["message"])["message"]
+
+        except (KeyError, ValueError):
+            continue
+
+        method = message.get("method", "")
+        params = message.get("params", {})
+        request_id = params.get("requestId")
+
+        if method == "Network.requestWillBeSent":
+            requests.add(request_id)
+
+        elif method == "Network.loadingFailed" and params.get("blockedReason"):
+            blocked.add(request_id)
+
+        elif method == "Network.requestServedFromCache" or (method == "Network.responseReceived" and params.get("response", {}).get("fromDiskCache")):
+            cached.add(request_id)
+
+        elif method == "Network.dataReceived":
+            received[request_id] = received.get(request_id, 0) + params.get("dataLength", 0)
+
+        elif method == "Network.loadingFinished" and request_id not in cached:
+            transferred += int(params.get("encodedDataLength", 0))
+
+    return {
+        "requests": len(requests),
+        "blocked": len(blocked),
+        "from_cache": len(cached),
+        "bytes_transferred": transferred,
+        "bytes_from_cache": sum(received.get(request_id, 0) for request_id in cached),
+    }
+
+
+def _read_log(browser) -> list[dict] | None:
+    """Take the entries from Chrome's performance log, which empties it."""
+
+    try:
+        return browser.get_log("performance")
+
+    except (WebDriverException, AttributeError) as e:
+        logger.debug(f"No performance log for the network report: {e}")
+
+        return None
+
+
+def clear_log(browser) -> None:
+    """Drop the requests logged so far, e.g. by the login or the previous item, so they are not in the next report."""
+
+    if config.NETWORK_REPORT:
+        _read_log(browser)
+
+
+def page_report(browser, page: str) -> dict | None:
+    """
+    Report the requests made since the last report or clear_log: how many were blocked or served from cache,
+    and the bytes transferred versus served from cache.
+
+    Needs config.NETWORK_REPORT, which turns on Chrome's performance log at launch.
+    """
+
+    if not config.NETWORK_REPORT:
+        return None
+
+    entries = _read_log(browser)
+
+    if entries is None:
+        return None
+
+    report = _summarize(entries)
+
+    with _lock:
+        for key, value in report.items():
+            _totals[key] += value
+
+    logger.info(
+        f"Network {page}: {report['requests']} requests, {report['blocked']} blocked, {report['from_cache']} from cache, "
+        f"{report['bytes_transferred'] / 1024:.0f} KB transferred, {report['bytes_from_cache'] / 1024:.0f} KB from cache"
+    )
+
+    return report
+
+
+def totals() -> dict:
+    """Network totals of the run so far."""
+
+    with _lock:
+        return dict(_totals)
@@ -0,0 +1,140 @@
+"""Persisted OPUS login session, so new browsers can skip login_to_opus while the session is valid"""
+
+import json
+import logging
+import os
+
+from mbu_dev_shared_components.utils.fernet_encryptor import Encryptor
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from helpers import config, timing
+
+logger = logging.getLogger(__name__)
+
+# Shown on the portal front page once logged in, the login form shows logonuidfield instead
+_LOGGED_IN = (By.XPATH, "//div[text()='Min Økonomi']")
+_LOGIN_FORM = (By.ID, "logonuidfield")
+
+
+def save(browser) -> None:
+    """Write the cookies and local storage of a logged in browser to config.OPUS_SESSION_PATH, encrypted."""
+
+    path = config.OPUS_SESSION_PATH
+
+    if not path:
+        return
+
+    try:
+        # The login is done once the portal front page shows, before that the cookies may not be final
+        WebDriverWait(browser, config.OPUS_SESSION_CHECK_TIMEOUT).until(EC.presence_of_element_located(_LOGGED_IN))
+
+        session = {
+            "cookies": browser.get_cookies(),
+            "local_storage": browser.execute_script("return Object.assign({}, window.localStorage);"),
+        }
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write a new file and swap it in, so another robot never reads a half written session
+        with open(path + ".tmp", "wb") as f:
+            f.write(Encryptor().encrypt(json.dumps(session)))
+
+        # Readable by the robot account only
+        os.chmod(path + ".tmp", 0o600)
+
+        os.replace(path + ".tmp", path)
+
+    except (OSError, ValueError, TimeoutException, WebDriverException) as e:
+        logger.info(f"Could not save the OPUS session: {e}")
+
+
+def _load() -> dict | None:
+    path = config.OPUS_SESSION_PATH
+
+    if not path or not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, "rb") as f:
+            return json.loads(Encryptor().decrypt(f.read()))
+
+    except (OSError, ValueError) as e:
+        logger.info(f"Ignoring unreadable OPUS session: {e}")
+
+        return None
+
+
+def _to_cdp_cookie(cookie: dict) -> dict:
+    """Convert a Selenium cookie to the DevTools Network.CookieParam format."""
+
+    cdp_cookie = {key: cookie[key] for key in ("name", "value", "domain", "path", "secure", "httpOnly", "sameSite") if key in cookie}
+
+    if "expiry" in cookie:
+        cdp_cookie["expires"] = cookie["expiry"]
+
+    return cdp_cookie
+
+
+def _open_portal(browser) -> bool:
+    """Open the portal front page, and return whether it shows the browser as logged in."""
+
+    browser.get(config.OPUS_PORTAL_URL)
+
+    WebDriverWait(browser, config.OPUS_SESSION_CHECK_TIMEOUT).until(
+        EC.any_of(EC.presence_of_element_located(_LOGGED_IN), EC.presence_of_element_located(_LOGIN_FORM))
+    )
+
+    return bool(browser.find_elements(*_LOGGED_IN))
+
+
+@timing.span("opus_session.is_logged_in")
+def is_logged_in(browser) -> bool:
+    """Whether the portal still has the browser logged in, e.g. after it sat idle as a warm spare."""
+
+    try:
+        return _open_portal(browser)
+
+    except (TimeoutException, WebDriverException) as e:
+        logger.info(f"Could not check the OPUS login: {e}")
+
+        return False
+
+
+@timing.span("opus_session.restore")
+def restore(browser) -> bool:
+    """
+    Load the saved session into a new browser and open the portal with it.
+
+    Returns:
+        bool: True if the portal accepted the session, False if a full login is needed.
+    """
+
+    session = _load()
+
+    if not session:
+        return False
+
+    try:
+        # Set through DevTools, so the cookies are in place before the first request to the portal
+        browser.execute_cdp_cmd("Network.setCookies", {"cookies": [_to_cdp_cookie(c) for c in session["cookies"]]})
+
+        if not _open_portal(browser):
+            logger.info("Saved OPUS session has expired, logging in")
+
+            return False
+
+        for key, value in session.get("local_storage", {}).items():
+            browser.execute_script("window.localStorage.setItem(arguments[0], arguments[1]);", key, value)
+
+    except (TimeoutException, WebDriverException, KeyError) as e:
+        logger.info(f"Could not restore the OPUS session, logging in: {e}")
+
+        return False
+
+    logger.info("Restored the saved OPUS session")
+
+    return True
+
@@ -5,13 +5,10 @@ import time
 
 import logging
 
-from pynput.keyboard import Key, Controller
-
 from selenium import webdriver
 
 from selenium.common.exceptions import TimeoutException
 
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.common.action_chains import ActionChains
@@ -22,48 +19,53 @@ from mbu_dev_shared_components.utils.fernet_encryptor import Encryptor
 
 from mbu_rpa_core.exceptions import BusinessError
 
+from helpers import chrome_profiles, circuit_breaker, config, network_filter, opus_session, timing
 from helpers.ticket_creation_helpers import wait_and_click, enter_text, switch_to_frame
 
 logger = logging.getLogger(__name__)
 
 
-def initialize_browser(opus_username, opus_password, headless=False):
-    """Initialize the Selenium Chrome WebDriver."""
-    chrome_options = Options()
+def initialize_browser(opus_username, opus_password, headless=False, profile=None):
+    """Initialize the Selenium Chrome WebDriver and log in to OPUS, reusing the saved session if it is still valid."""
+    browser = launch_browser(headless=headless, profile=profile)
+
+    log_in(browser, opus_username, opus_password)
+
+    return browser
+
 
-    # Chrome prefs
-    prefs = {"safebrowsing.enabled": False}
-    chrome_options.add_experimental_option("prefs", prefs)
+def log_in(browser, opus_username, opus_password):
+    """Log a launched browser in to OPUS, with the saved session if it is still valid."""
+    if opus_session.restore(browser):
+        return
 
+    login_to_opus(browser, opus_username, opus_password)
+
+    opus_session.save(browser)
+
+
+@timing.span("launch_browser")
+def launch_browser(headless=False, profile=None):
+    """Start Chrome with a launch profile from helpers.chrome_profiles, config.CHROME_PROFILE by default."""
     ### REMOVE ###
     # Debug: stay open even on exit
     # chrome_options.add_experimental_option("detach", not headless)
     ### REMOVE ###
 
-    # Common browser flags
-    chrome_options.add_argument("test-type")
-    chrome_options.add_argument("--start-maximized")
-    chrome_options.add_argument("--disable-web-security")
-    chrome_options.add_argument("--allow-running-insecure-content")
-    chrome_options.add_argument("--disable-search-engine-choice-screen")
-    chrome_options.add_argument("--incognito")
-
-    # Enable headless mode
-    if headless:
-        chrome_options.add_argument("--headless=new")
-        chrome_options.add_argument("--window-size=1920,1080")
+    profile = chrome_profiles.get_profile(profile)
 
-    browser = webdriver.Chrome(options=chrome_options)
+    browser = webdriver.Chrome(service=chrome_profiles.build_service(), options=chrome_profiles.build_options(profile, headless))
 
-    login_to_opus(browser, opus_username, opus_password)
+    network_filter.install(browser, config.BLOCKED_URL_PATTERNS if profile.block_requests else [])
 
     return browser
 
 
+@timing.span("login_to_opus")
 def login_to_opus(browser, username, password):
     """Login to OPUS."""
 
-    browser.get("https://portal.kmd.dk/irj/portal")
+    browser.get(config.OPUS_PORTAL_URL)
 
     wait_and_click(browser, By.ID, 'logonuidfield')
 
@@ -73,22 +75,41 @@ def login_to_opus(browser, username, password):
     wait_and_click(browser, By.ID, 'buttonLogon')
 
 
-def handle_opus(item_data, path, browser, headless):
-    """Handle the OPUS ticket creation process."""
+@circuit_breaker.guard("opus", ignore=(BusinessError,))
+def handle_opus(item_data, path, browser, headless, on_stage=None):
+    """
+    Handle the OPUS ticket creation process.
+
+    on_stage, if given, is called with "form_filled" and "controlled" as the form gets there.
+    """
+
+    def reached(stage):
+        if on_stage:
+            on_stage(stage)
 
     attachment_path = os.path.join(path, f'receipt_{item_data["uuid"]}.pdf')
 
+    network_filter.clear_log(browser)
+
     navigate_to_opus(browser)
 
+    network_filter.page_report(browser, "navigate_to_opus")
+
     logger.info("Filling form ...")
     fill_form(browser, item_data)
 
+    network_filter.page_report(browser, "fill_form")
+
     logger.info("Uploading attachment ...")
     upload_attachment(browser, attachment_path, headless=headless)
 
+    reached("form_filled")
+
     logger.info("Filling out form and controlling ...")
     fill_out_form_and_control(browser=browser, item_data=item_data)
 
+    reached("controlled")
+
     return
 
     # logger.info("Pressing 'Opret' to create ticket ...")
@@ -97,9 +118,10 @@ def handle_opus(item_data, path, browser, headless):
     # logger.info("Successfully created outlay ticket.")
 
 
+@timing.span("navigate_to_opus")
 def navigate_to_opus(browser):
     """Navigate to OPUS page and open required tabs."""
-    browser.get("https://portal.kmd.dk/irj/portal")
+    browser.get(config.OPUS_PORTAL_URL)
 
     wait_and_click(browser, By.XPATH, "//div[text()='Min Økonomi']")
 
@@ -108,6 +130,7 @@ def navigate_to_opus(browser):
     wait_and_click(browser, By.XPATH, "/html/body/div[1]/table/tbody/tr[1]/td/div/div[1]/div[9]/div[2]/span[2]")
 
 
+@timing.span("fill_form")
 def fill_form(browser, item_data):
     """
     Fill out the OPUS ticket form using Selenium.
@@ -272,6 +295,7 @@ def decrypt_cpr(item_data):
     return encryptor.decrypt(encrypted_cpr.encode('utf-8'))
 
 
+@timing.span("upload_attachment")
 def upload_attachment(browser, attachment_path, headless=False):
     """
     Upload an attachment file into the OPUS form.
@@ -341,6 +365,9 @@ def upload_attachment(browser, attachment_path, headless=False):
         # ---------------------------------------------------------
         # Selenium CANNOT interact with Windows' native file dialog.
         # So we use pynput's keyboard to type the path into the OS dialog.
+        # Imported here, pynput needs a display and only this visible-browser path uses it
+        from pynput.keyboard import Controller, Key  # pylint: disable=import-outside-toplevel
+
         time.sleep(4)  # give OS time to open dialog window
 
         keyboard = Controller()
@@ -370,6 +397,7 @@ def upload_attachment(browser, attachment_path, headless=False):
     time.sleep(2)
 
 
+@timing.span("fill_out_form_and_control")
 def fill_out_form_and_control(browser, item_data):
     """
     Complete the OPUS form and validate the expense ticket.
@@ -471,6 +499,7 @@ def fill_out_form_and_control(browser, item_data):
     logger.info("\nbilag er kontrolleret ok\n")
 
 
+@timing.span("create_ticket")
 def create_ticket(browser):
     """
     Helper to press the 'Opret' button and create the ticket
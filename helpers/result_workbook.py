@@ -0,0 +1,374 @@
+"""Module for writing the run result into the original egenbefordring workbook"""
+
+import logging
+import os
+import posixpath
+import re
+import zipfile
+from io import BytesIO
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape, unescape
+
+from openpyxl import load_workbook
+from openpyxl.utils import column_index_from_string
+
+from helpers import config, timing
+
+logger = logging.getLogger(__name__)
+
+RESULT_COLUMNS = ["behandlet_ok", "behandlet_fejl"]
+
+_CHUNK_SIZE = 1024 * 1024
+
+_MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+_ROW = re.compile(rb"<row\b[^>]*?(?:/>|>.*?</row>)", re.DOTALL)
+_ROW_NUMBER = re.compile(rb'<row\b[^>]*?\br="(\d+)"')
+_CELL = re.compile(rb'<c\b[^>]*?\br="([A-Z]+)\d+"[^>]*?(?:/>|>.*?</c>)', re.DOTALL)
+_CELL_TYPE = re.compile(rb'\bt="(\w+)"')
+_SPANS = re.compile(rb'\sspans="[^"]*"')
+_CELL_STYLE = re.compile(rb'\bs="(\d+)"')
+_VALUE = re.compile(rb"<v>(.*?)</v>", re.DOTALL)
+_INLINE_TEXT = re.compile(rb"<t\b[^>]*>(.*?)</t>", re.DOTALL)
+
+
+def original_path(file_name: str) -> str:
+    """Local path of the original workbook saved by the queue stage."""
+
+    return os.path.join(config.PATH, "original", file_name)
+
+
+def save_original(file_name: str, bytes_data: bytes) -> None:
+    """Keep the downloaded workbook, so the process stage can patch it instead of rebuilding it."""
+
+    path = original_path(file_name)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with open(path, "wb") as f:
+        f.write(bytes_data)
+
+
+def load_original(file_name: str, sharepoint) -> bytes | None:
+    """Read the saved original workbook, downloading it again from SharePoint if it is not on this machine."""
+
+    path = original_path(file_name)
+
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            return f.read()
+
+    logger.info(f"No local copy of {file_name}, downloading the original from SharePoint")
+
+    return sharepoint.fetch_file_using_open_binary(file_name=file_name, folder_name=config.FOLDER_NAME)
+
+
+def _first_sheet_path(archive: zipfile.ZipFile) -> str:
+    """Path inside the archive of the first worksheet."""
+
+    workbook = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+    rel_id = workbook.find(f"{{{_MAIN_NS}}}sheets/{{{_MAIN_NS}}}sheet").get(f"{{{_REL_NS}}}id")
+
+    rels = ElementTree.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    target = next(rel.get("Target") for rel in rels.iter(f"{{{_PKG_REL_NS}}}Relationship") if rel.get("Id") == rel_id)
+
+    return target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+
+
+def _shared_string_indexes(archive: zipfile.ZipFile, wanted: set[str]) -> dict[str, str]:
+    """Map shared string index (as it appears in <v>) to text, for the wanted texts only."""
+
+    if "xl/sharedStrings.xml" not in archive.namelist():
+        return {}
+
+    found = {}
+
+    with archive.open("xl/sharedStrings.xml") as f:
+        index = 0
+
+        for _, element in ElementTree.iterparse(f):
+            if element.tag != f"{{{_MAIN_NS}}}si":
+                continue
+
+            text = "".join(t.text or "" for t in element.iter(f"{{{_MAIN_NS}}}t"))
+
+            if text in wanted:
+                found[str(index)] = text
+
+            index += 1
+            element.clear()
+
+    return found
+
+
+def _number_text(value: str) -> str:
+    """A number cell as str() of the value openpyxl reads from it, e.g. "123" -> "123" and "1E3" -> "1000.0"."""
+
+    if "." in value or "E" in value or "e" in value:
+        return str(float(value))
+
+    return str(int(value))
+
+
+def _cell_text(cell: bytes, shared: dict[str, str]) -> str | None:
+    """
+    Text of a string or number cell, None for anything else.
+
+    Numbers are read like openpyxl does, so a uuid matches here exactly when build_uuid_index matches it.
+    """
+
+    cell_type = _CELL_TYPE.search(cell[:cell.find(b">") + 1])
+    cell_type = cell_type.group(1) if cell_type else b"n"
+
+    if cell_type == b"inlineStr":
+        return "".join(unescape(t.decode("utf-8")) for t in _INLINE_TEXT.findall(cell))
+
+    value = _VALUE.search(cell)
+
+    if value is None:
+        return None
+
+    if cell_type == b"s":
+        return shared.get(value.group(1).decode())
+
+    if cell_type == b"str":
+        return unescape(value.group(1).decode("utf-8"))
+
+    if cell_type == b"n":
+        try:
+            return _number_text(value.group(1).decode())
+
+        except ValueError:
+            return None
+
+    return None
+
+
+def _patch_row(row: bytes, row_number: bytes, marks: dict[str, str]) -> bytes:
+    """Write inline string cells for the given column letters into a <row> element, keeping cell order."""
+
+    if row.endswith(b"/>"):
+        row = row[:-2] + b"></row>"
+
+    # spans is only an optimization hint and may no longer cover the row after patching
+    row = _SPANS.sub(b"", row, count=1)
+
+    for letter, value in marks.items():
+        ref = letter.encode() + row_number
+        column = column_index_from_string(letter)
+
+        start = end = row.rfind(b"</row>")
+        style = b""
+
+        # Replace the cell if it exists, otherwise insert it before the first cell to its right
+        for cell in _CELL.finditer(row):
+            cell_column = column_index_from_string(cell.group(1).decode())
+
+            if cell_column == column:
+                start, end = cell.span()
+
+                old_style = _CELL_STYLE.search(cell.group(0)[:cell.group(0).find(b">") + 1])
+                style = b' s="' + old_style.group(1) + b'"' if old_style else b""
+
+                break
+
+            if cell_column > column:
+                start = end = cell.start()
+
+                break
+
+        new_cell = b'<c r="' + ref + b'"' + style + b' t="inlineStr"><is><t>' + escape(value).encode("utf-8") + b"</t></is></c>"
+
+        row = row[:start] + new_cell + row[end:]
+
+    return row
+
+
+def _patch_sheet(src, dst, marks_by_uuid: dict[str, dict[str, str]], shared: dict[str, str]) -> set[str] | None:
+    """
+    Stream worksheet XML from src to dst in chunks of whole rows, patching the rows of the processed uuids.
+
+    Returns the patched uuids, or None if the header does not have the uuid and result columns.
+    """
+
+    pending = b""
+    header = None
+    uuid_cell = None
+    patched = set()
+
+    def patch(match: re.Match) -> bytes:
+        row = match.group(0)
+
+        cell = uuid_cell.search(row)
+        form_uuid = _cell_text(cell.group(0), shared) if cell else None
+
+        marks = marks_by_uuid.get(form_uuid)
+
+        if not marks:
+            return row
+
+        patched.add(form_uuid)
+
+        return _patch_row(row, _ROW_NUMBER.match(row).group(1), {header[column]: value for column, value in marks.items()})
+
+    while True:
+        chunk = src.read(_CHUNK_SIZE)
+        pending += chunk
+
+        # Only hand complete rows to the regex, the rest waits for the next chunk
+        cut = pending.rfind(b"</row>") + len(b"</row>") if chunk else len(pending)
+
+        if chunk and cut < len(b"</row>"):
+            continue
+
+        block, pending = pending[:cut], pending[cut:]
+
+        if header is None:
+            header_row = _ROW.search(block)
+
+            if header_row is None:
+                return None
+
+            header = {_cell_text(cell.group(0), shared): cell.group(1).decode() for cell in _CELL.finditer(header_row.group(0))}
+
+            if "uuid" not in header or any(column not in header for column in RESULT_COLUMNS):
+                return None
+
+            uuid_cell = re.compile(rb'<c\b[^>]*?\br="' + header["uuid"].encode() + rb'\d+"[^>]*?(?:/>|>.*?</c>)', re.DOTALL)
+
+            dst.write(block[:header_row.end()])
+            block = block[header_row.end():]
+
+        dst.write(_ROW.sub(patch, block))
+
+        if not chunk:
+            return patched
+
+
+def _patch_xml(original: bytes, excel_rows: list[dict]) -> bytes | None:
+    """
+    Patch the first worksheet's XML directly, without loading the workbook.
+
+    Returns None if the sheet does not have the uuid and result columns in its header,
+    in which case the caller falls back to openpyxl.
+    """
+
+    marks_by_uuid = {}
+
+    for row in excel_rows:
+        marks = {column: str(row[column]) for column in RESULT_COLUMNS if row.get(column)}
+
+        if marks:
+            marks_by_uuid[str(row.get("uuid"))] = marks
+
+    buffer = BytesIO()
+
+    with zipfile.ZipFile(BytesIO(original)) as archive, zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as output:
+        sheet_path = _first_sheet_path(archive)
+
+        shared = _shared_string_indexes(archive, set(marks_by_uuid) | {"uuid", *RESULT_COLUMNS})
+
+        for info in archive.infolist():
+            if info.filename != sheet_path:
+                output.writestr(info, archive.read(info.filename))
+
+                continue
+
+            with archive.open(info) as src, output.open(info, "w") as dst:
+                patched = _patch_sheet(src, dst, marks_by_uuid, shared)
+
+            if patched is None:
+                return None
+
+    missing = len(set(marks_by_uuid) - patched)
+
+    if missing:
+        logger.warning(f"{missing} processed row(s) were not found in the original workbook")
+
+    return buffer.getvalue()
+
+
+def _column_indexes(ws) -> dict[str, int]:
+    """Map header names to 1-based column indexes, appending the result columns if the sheet lacks them."""
+
+    header = {cell.value: cell.column for cell in ws[1] if cell.value is not None}
+
+    for column in RESULT_COLUMNS:
+        if column not in header:
+            header[column] = ws.max_column + 1
+            ws.cell(row=1, column=header[column], value=column)
+
+    return header
+
+
+def build_uuid_index(ws, uuid_column: int) -> dict[str, int]:
+    """Map each form uuid to its 1-based row number."""
+
+    rows = ws.iter_rows(min_row=2, min_col=uuid_column, max_col=uuid_column, values_only=True)
+
+    return {str(value): row_number for row_number, (value,) in enumerate(rows, start=2) if value}
+
+
+@timing.span("result_workbook.patch")
+def patch_workbook(original: bytes, excel_rows: list[dict]) -> bytes:
+    """
+    Write the behandlet_ok / behandlet_fejl marks of the processed rows into the original workbook.
+
+    Only the result cells are touched, so every other row, value and format is kept as it was.
+    The worksheet XML is patched in place when its header already has the result columns,
+    otherwise the workbook is loaded and saved with openpyxl.
+
+    Args:
+        original (bytes): The workbook as downloaded by the queue stage.
+        excel_rows (list[dict]): The raw_excel_data of the run's work items, keyed by uuid.
+
+    Returns:
+        bytes: The patched workbook.
+    """
+
+    patched = _patch_xml(original, excel_rows)
+
+    if patched is not None:
+        return patched
+
+    logger.info("Result columns not in the sheet header, patching the workbook with openpyxl")
+
+    return _patch_with_openpyxl(original, excel_rows)
+
+
+def _patch_with_openpyxl(original: bytes, excel_rows: list[dict]) -> bytes:
+    """Patch the workbook through openpyxl, adding the result columns if they are missing."""
+
+    wb = load_workbook(BytesIO(original))
+    ws = wb.active
+
+    columns = _column_indexes(ws)
+
+    if "uuid" not in columns:
+        raise ValueError("The original workbook has no uuid column")
+
+    uuid_index = build_uuid_index(ws, columns["uuid"])
+
+    missing = 0
+
+    for row in excel_rows:
+        row_number = uuid_index.get(str(row.get("uuid")))
+
+        if row_number is None:
+            missing += 1
+
+            continue
+
+        for column in RESULT_COLUMNS:
+            if row.get(column):
+                ws.cell(row=row_number, column=columns[column], value=str(row[column]))
+
+    if missing:
+        logger.warning(f"{missing} processed row(s) were not found in the original workbook")
+
+    buffer = BytesIO()
+    wb.save(buffer)
+
+    return buffer.getvalue()
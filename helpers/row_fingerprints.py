@@ -0,0 +1,149 @@
+"""Fingerprints of the queued sheet rows, so a --queue run only transforms rows that are new or changed"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+from collections.abc import Container, Iterable, Iterator
+from datetime import date, datetime
+
+import pandas as pd
+
+from helpers import config
+
+logger = logging.getLogger(__name__)
+
+# Written by the robot itself, so they do not count as a change made by a case worker
+_IGNORED_COLUMNS = {"behandlet_ok", "behandlet_fejl"}
+
+_lock = threading.Lock()
+
+_fingerprints: dict[str, str] | None = None
+
+# Fingerprints of the rows let through this run, stored once their items are confirmed in the queue
+_pending: dict[str, str] = {}
+
+
+def _normalize(value):
+    """Make a cell value compare the same however pandas typed its column, e.g. 9 and 9.0."""
+
+    if value is None or (isinstance(value, float) and math.isnan(value)) or value is pd.NaT:
+        return None
+
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+
+    return str(value) if not isinstance(value, (int, float, bool)) else value
+
+
+def fingerprint(row: dict) -> str:
+    """Stable hash of a row's cells, leaving out the result columns."""
+
+    cells = {column: _normalize(value) for column, value in row.items() if column not in _IGNORED_COLUMNS}
+
+    return hashlib.blake2b(json.dumps(cells, sort_keys=True, ensure_ascii=False).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _store() -> dict[str, str]:
+    """Load the fingerprint store from disk on first use."""
+
+    global _fingerprints  # pylint: disable=global-statement
+
+    if _fingerprints is None:
+        try:
+            with open(config.ROW_FINGERPRINT_PATH, encoding="utf-8") as f:
+                _fingerprints = json.load(f)
+
+        except (OSError, ValueError):
+            _fingerprints = {}
+
+    return _fingerprints
+
+
+def _save() -> None:
+    path = config.ROW_FINGERPRINT_PATH
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(_fingerprints, f)
+
+        os.replace(path + ".tmp", path)
+
+    except OSError as e:
+        logger.info(f"Could not save row fingerprints: {e}")
+
+
+def filter_rows(rows: Iterable[dict], reference_prefix: str, queue_references: Container[str]) -> Iterator[dict]:
+    """
+    Drop the rows that are unchanged since their item was queued, and whose item is still in the queue.
+
+    Rows are keyed by the queue reference, reference_prefix + "_" + uuid. Rows without a uuid are always kept.
+    Rows that were queued before and have changed since are kept and logged, since the queued item does not
+    carry the change. Unchanged rows whose item is gone from queue_references are kept, so they are queued again.
+    """
+
+    if not config.ROW_FINGERPRINT_PATH:
+        yield from rows
+
+        return
+
+    kept = skipped = 0
+
+    for row in rows:
+        uuid = _normalize(row.get("uuid"))
+
+        if uuid is None:
+            kept += 1
+
+            yield row
+
+            continue
+
+        reference = f"{reference_prefix}_{uuid}"
+        digest = fingerprint(row)
+
+        with _lock:
+            previous = _store().get(reference)
+
+            if previous != digest:
+                _pending[reference] = digest
+
+        if previous == digest and reference in queue_references:
+            skipped += 1
+
+            continue
+
+        if previous is not None:
+            logger.warning(f"Approved row {reference} was changed after it was queued")
+
+        kept += 1
+
+        yield row
+
+    logger.info(f"{skipped} unchanged row(s) skipped, {kept} new or changed")
+
+
+def commit(references) -> None:
+    """Store the fingerprints of the rows whose items are now in the queue."""
+
+    with _lock:
+        store = _store()
+
+        stored = 0
+
+        for reference in references:
+            digest = _pending.pop(reference, None)
+
+            if digest is not None:
+                store[reference] = digest
+                stored += 1
+
+        if stored:
+            _save()
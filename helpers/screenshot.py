@@ -0,0 +1,79 @@
+"""Module for capturing browser screenshots for error reports"""
+
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from io import BytesIO
+
+from PIL import Image
+from selenium.common.exceptions import WebDriverException
+
+from helpers import config
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="screenshot")
+
+
+@dataclass
+class Screenshot:
+    """An encoded screenshot and, optionally, the DOM of the page it was taken from"""
+
+    image: bytes
+    subtype: str
+    dom: bytes | None = None
+
+
+def capture(browser, include_dom: bool = False) -> Future:
+    """
+    Capture the browser viewport and hand the encoding off to a background thread.
+
+    Only the raw capture happens on the calling thread, since the WebDriver session is not thread safe.
+
+    Returns:
+        Future: Resolves to a Screenshot.
+    """
+
+    png = browser.get_screenshot_as_png()
+
+    dom = None
+
+    if include_dom:
+        try:
+            dom = browser.page_source.encode("utf-8")
+
+        except WebDriverException as e:
+            logger.info(f"Could not capture DOM: {e}")
+
+    return _executor.submit(encode, png, dom)
+
+
+def encode(png: bytes, dom: bytes | None = None) -> Screenshot:
+    """Downscale and re-encode a PNG capture so it stays below config.SCREENSHOT_MAX_BYTES."""
+
+    image = Image.open(BytesIO(png)).convert("RGB")
+    image.thumbnail(config.SCREENSHOT_SIZE)
+
+    image_format = config.SCREENSHOT_FORMAT.upper()
+    quality = config.SCREENSHOT_QUALITY
+
+    while True:
+        buffer = BytesIO()
+        image.save(buffer, format=image_format, quality=quality)
+
+        data = buffer.getvalue()
+
+        if len(data) <= config.SCREENSHOT_MAX_BYTES or image.width <= 320:
+            break
+
+        # Too large: lower the quality first, then the resolution
+        if quality > 40:
+            quality -= 15
+
+        else:
+            image.thumbnail((image.width * 3 // 4, image.height * 3 // 4))
+
+    if dom is not None and len(dom) > config.SCREENSHOT_DOM_MAX_BYTES:
+        dom = dom[:config.SCREENSHOT_DOM_MAX_BYTES]
+
+    return Screenshot(image=data, subtype=image_format.lower(), dom=dom)
@@ -0,0 +1,156 @@
+"""Process-wide SharePoint client with a cached, optionally persisted, access token"""
+
+import logging
+import os
+import threading
+
+import msal
+from mbu_dev_shared_components.utils.fernet_encryptor import Encryptor
+from mbu_msoffice_integration.sharepoint_class import Sharepoint
+from office365.sharepoint.client_context import ClientContext
+
+from helpers import config, timing
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+
+_client: Sharepoint | None = None
+
+_token_provider = None
+
+
+class _TokenProvider:
+    """
+    Acquires app-only tokens with the certificate credentials through one msal application.
+
+    msal serves tokens from its cache until shortly before they expire. With config.SHAREPOINT_TOKEN_CACHE_PATH
+    the cache is written to disk encrypted with the OpenOrchestrator key, so a --process run can reuse
+    the token fetched by the --queue run.
+    """
+
+    def __init__(self, tenant: str, client_id: str, thumbprint: str, cert_path: str, scopes: list[str]):
+        self.scopes = scopes
+
+        self._lock = threading.Lock()
+        self._cache = msal.SerializableTokenCache()
+
+        self._load_cache()
+
+        with open(cert_path, encoding="utf-8") as f:
+            private_key = f.read()
+
+        self._app = msal.ConfidentialClientApplication(
+            client_id,
+            authority=f"https://login.microsoftonline.com/{tenant}",
+            client_credential={"thumbprint": thumbprint, "private_key": private_key},
+            token_cache=self._cache,
+        )
+
+    def _load_cache(self) -> None:
+        path = config.SHAREPOINT_TOKEN_CACHE_PATH
+
+        if not path or not os.path.exists(path):
+            return
+
+        try:
+            with open(path, "rb") as f:
+                self._cache.deserialize(Encryptor().decrypt(f.read()))
+
+        except (OSError, ValueError) as e:
+            logger.info(f"Ignoring unreadable SharePoint token cache: {e}")
+
+    def _save_cache(self) -> None:
+        path = config.SHAREPOINT_TOKEN_CACHE_PATH
+
+        if not path or not self._cache.has_state_changed:
+            return
+
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+            with open(path, "wb") as f:
+                f.write(Encryptor().encrypt(self._cache.serialize()))
+
+            # Readable by the robot account only
+            os.chmod(path, 0o600)
+
+            self._cache.has_state_changed = False
+
+        except (OSError, ValueError) as e:
+            logger.info(f"Could not save SharePoint token cache: {e}")
+
+    def __call__(self) -> dict:
+        """Return a token response, shortened by config.SHAREPOINT_TOKEN_REFRESH_MARGIN so it is renewed before it expires."""
+
+        with self._lock, timing.span("sharepoint.acquire_token"):
+            result = self._app.acquire_token_for_client(scopes=self.scopes)
+
+            self._save_cache()
+
+        if "access_token" not in result:
+            raise ValueError(f"Could not acquire a SharePoint token: {result.get('error_description') or result.get('error')}")
+
+        result = dict(result)
+        result["expires_in"] = max(int(result.get("expires_in", 0)) - config.SHAREPOINT_TOKEN_REFRESH_MARGIN, 0)
+
+        return result
+
+
+class CachedTokenSharepoint(Sharepoint):
+    """Sharepoint whose context takes its token from the shared provider instead of authenticating on construction."""
+
+    def _auth(self):
+        site_full_url = f"{self.site_url}/{self.site_type}/{self.site_name}"
+
+        return ClientContext(site_full_url).with_access_token(_get_token_provider(self))
+
+
+def _get_token_provider(sharepoint: Sharepoint) -> _TokenProvider:
+    global _token_provider  # pylint: disable=global-statement
+
+    with _lock:
+        if _token_provider is None:
+            _token_provider = _TokenProvider(
+                tenant=sharepoint.tenant,
+                client_id=sharepoint.client_id,
+                thumbprint=sharepoint.thumbprint,
+                cert_path=sharepoint.cert_path,
+                scopes=[f"{config.SHAREPOINT_SITE_URL}/.default"],
+            )
+
+        return _token_provider
+
+
+def new_sharepoint() -> Sharepoint:
+    """Create a new client with its own context, sharing the token. Use one per thread."""
+
+    return CachedTokenSharepoint(**config.SHAREPOINT_KWARGS)
+
+
+def get_sharepoint() -> Sharepoint:
+    """Return the process-wide client, creating it on first use."""
+
+    global _client  # pylint: disable=global-statement
+
+    with _lock:
+        client = _client
+
+    if client is None:
+        client = new_sharepoint()
+
+        with _lock:
+            _client = _client or client
+            client = _client
+
+    return client
+
+
+def reset() -> None:
+    """Drop the cached client and token provider."""
+
+    global _client, _token_provider  # pylint: disable=global-statement
+
+    with _lock:
+        _client = None
+        _token_provider = None
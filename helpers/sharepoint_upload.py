@@ -0,0 +1,150 @@
+"""Module for uploading many local files to a SharePoint folder concurrently"""
+
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from helpers import config, timing
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class UploadResult:
+    """Outcome of uploading a single file"""
+
+    file_name: str
+    size: int
+    status: str  # "uploaded", "skipped" or "failed"
+    attempts: int = 0
+    error: str | None = None
+
+
+def server_relative_url(sharepoint, folder_name: str) -> str:
+    """Server relative URL of a folder in the document library, built the same way as the Sharepoint class does."""
+
+    return f"/{sharepoint.site_type}/{sharepoint.site_name}/{sharepoint.document_library}/{folder_name}"
+
+
+@timing.span("sharepoint.list_remote_files")
+def list_remote_files(sharepoint, folder_name: str) -> dict[str, int]:
+    """Return the names and sizes of the files already in a SharePoint folder."""
+
+    try:
+        files = sharepoint.ctx.web.get_folder_by_server_relative_url(server_relative_url(sharepoint, folder_name)).files
+
+        sharepoint.ctx.load(files)
+        sharepoint.ctx.execute_query()
+
+        return {file.name: int(file.length) for file in files}
+
+    # office365's ClientRequestException and the network errors are OSErrors
+    except (OSError, ValueError) as e:
+        logger.info(f"Could not list files in '{folder_name}', uploading everything: {e}")
+
+        return {}
+
+
+def _upload(sharepoint, folder_name: str, file_path: str, file_name: str, size: int) -> None:
+    """Upload one file, using a chunked upload session for files above config.SHAREPOINT_UPLOAD_CHUNK_SIZE."""
+
+    folder = sharepoint.ctx.web.get_folder_by_server_relative_url(server_relative_url(sharepoint, folder_name))
+
+    if size > config.SHAREPOINT_UPLOAD_CHUNK_SIZE:
+        folder.files.create_upload_session(file_path, config.SHAREPOINT_UPLOAD_CHUNK_SIZE, file_name=file_name).execute_query()
+
+    else:
+        with open(file_path, "rb") as f:
+            folder.upload_file(file_name, f.read()).execute_query()
+
+
+def upload_files(
+    file_paths: list[str],
+    folder_name: str,
+    client_factory: Callable,
+    sharepoint=None,
+    max_workers: int | None = None,
+) -> list[UploadResult]:
+    """
+    Upload local files to a folder in the document library.
+
+    Files already in the folder with the same size are skipped. The rest are uploaded by a bounded
+    thread pool, where every worker thread gets its own client from client_factory, and each file is
+    retried with exponential backoff before it is reported as failed.
+
+    Args:
+        file_paths (list[str]): Local files to upload.
+        folder_name (str): Target folder relative to the document library.
+        client_factory (Callable): Returns an authenticated Sharepoint client.
+        sharepoint: Client already authenticated on the calling thread, used for listing the folder.
+        max_workers (int | None): Maximum number of concurrent uploads, config.SHAREPOINT_UPLOAD_WORKERS if None.
+
+    Returns:
+        list[UploadResult]: One result per file, in the order given.
+    """
+
+    if not file_paths:
+        return []
+
+    local = threading.local()
+
+    if sharepoint is not None:
+        local.sharepoint = sharepoint
+
+    def client():
+        if not hasattr(local, "sharepoint"):
+            local.sharepoint = client_factory()
+
+        return local.sharepoint
+
+    remote_files = list_remote_files(client(), folder_name)
+
+    def upload_one(file_path: str) -> UploadResult:
+        file_name = os.path.basename(file_path)
+        size = os.path.getsize(file_path)
+
+        if remote_files.get(file_name) == size:
+            return UploadResult(file_name=file_name, size=size, status="skipped")
+
+        attempt = 0
+
+        while True:
+            attempt += 1
+
+            try:
+                with timing.span("sharepoint.upload_file"):
+                    _upload(client(), folder_name, file_path, file_name, size)
+
+                return UploadResult(file_name=file_name, size=size, status="uploaded", attempts=attempt)
+
+            except (OSError, ValueError) as e:
+                if attempt >= config.SHAREPOINT_UPLOAD_RETRIES:
+                    logger.error(f"Failed to upload '{file_name}' after {attempt} attempts: {e}")
+
+                    return UploadResult(file_name=file_name, size=size, status="failed", attempts=attempt, error=str(e))
+
+                delay = config.SHAREPOINT_UPLOAD_BACKOFF * 2 ** (attempt - 1)
+
+                logger.info(f"Upload of '{file_name}' failed ({e}), retrying in {delay:.1f}s")
+
+                time.sleep(delay)
+
+    workers = min(max_workers or config.SHAREPOINT_UPLOAD_WORKERS, len(file_paths))
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sharepoint-upload") as executor:
+        results = list(executor.map(upload_one, file_paths))
+
+    uploaded = [r for r in results if r.status == "uploaded"]
+    skipped = [r for r in results if r.status == "skipped"]
+    failed = [r for r in results if r.status == "failed"]
+
+    logger.info(
+        f"Uploaded {len(uploaded)} file(s) ({sum(r.size for r in uploaded)} bytes) to '{folder_name}', "
+        f"skipped {len(skipped)} already present, {len(failed)} failed"
+    )
+
+    return results
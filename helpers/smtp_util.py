@@ -1,11 +1,24 @@
-"""This module contains a single function for sending emails using the SMTP protocol."""
+"""This module contains functions for sending emails using the SMTP protocol."""
 
-from typing import Sequence
-from email.message import EmailMessage
+import atexit
+import logging
+import mimetypes
+import queue
 import smtplib
-from io import BytesIO
+import threading
+import time
+from collections.abc import Sequence
 from dataclasses import dataclass
-import mimetypes
+from email.message import EmailMessage
+from io import BytesIO
+
+from helpers import config, timing
+
+logger = logging.getLogger(__name__)
+
+# Errors a new connection can get past. Other SMTPExceptions (refused recipients or sender, rejected data)
+# fail the same way on every attempt, and SMTPException is an OSError, so it is not caught as one.
+_TRANSIENT_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, TimeoutError)
 
 
 @dataclass
@@ -15,6 +28,7 @@ class EmailAttachment:
     file_name: str
 
 
+@timing.span("smtp.send_email")
 def send_email(receiver: str | list[str], sender: str, subject: str, body: str, smtp_server: str, smtp_port: int,
                html_body: bool = False, attachments: Sequence[EmailAttachment] | None = None) -> None:
     """Send an email using the SMTP protocol.
@@ -49,7 +63,185 @@ def send_email(receiver: str | list[str], sender: str, subject: str, body: str,
             attachment.file.seek(0)
             msg.add_attachment(attachment.file.read(), maintype=main, subtype=sub, filename=attachment.file_name)
 
-    # Send message
-    with smtplib.SMTP(smtp_server, smtp_port) as smtp:
-        smtp.starttls()
-        smtp.send_message(msg)
+    get_client(smtp_server, smtp_port).send(msg)
+
+
+@timing.span("smtp.send_messages")
+def send_messages(messages: Sequence[EmailMessage], smtp_server: str, smtp_port: int) -> None:
+    """Send several prepared messages over the shared connection to the server.
+
+    Args:
+        messages: The messages to send.
+        smtp_server: The name of the smtp server.
+        smtp_port: The port of the smtp server.
+    """
+    get_client(smtp_server, smtp_port).send_many(messages)
+
+
+class SMTPClient:
+    """An SMTP client that keeps one connection open between sends.
+
+    The connection is opened on first use, checked with NOOP when it has been idle for longer than
+    config.SMTP_HEALTHCHECK_INTERVAL, and reopened when the server has dropped it.
+    Messages can also be queued with submit() and sent by a background thread.
+    """
+
+    def __init__(self, smtp_server: str, smtp_port: int, starttls: bool = True):
+        self.smtp_server = smtp_server
+        self.smtp_port = smtp_port
+        self.starttls = starttls
+
+        self._smtp: smtplib.SMTP | None = None
+        self._last_used = 0.0
+        self._lock = threading.RLock()
+
+        self._outbox: queue.Queue = queue.Queue()
+        self._sender: threading.Thread | None = None
+
+    def _connect(self) -> smtplib.SMTP:
+        with timing.span("smtp.connect"):
+            smtp = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=config.SMTP_TIMEOUT)
+
+            if self.starttls:
+                smtp.starttls()
+
+        return smtp
+
+    def _disconnect(self) -> None:
+        if self._smtp is None:
+            return
+
+        try:
+            self._smtp.quit()
+
+        except (smtplib.SMTPException, OSError):
+            pass
+
+        self._smtp = None
+
+    def _connection(self) -> smtplib.SMTP:
+        """Return a live connection, opening or reopening it when needed."""
+
+        if self._smtp is not None and time.monotonic() - self._last_used > config.SMTP_HEALTHCHECK_INTERVAL:
+            try:
+                healthy = self._smtp.noop()[0] == 250
+
+            except (smtplib.SMTPException, OSError):
+                healthy = False
+
+            if not healthy:
+                logger.info(f"SMTP connection to {self.smtp_server} went stale, reconnecting")
+                self._disconnect()
+
+        if self._smtp is None:
+            self._smtp = self._connect()
+
+        return self._smtp
+
+    def send(self, msg: EmailMessage) -> None:
+        """Send one message, reconnecting if the server has closed the connection."""
+
+        self.send_many([msg])
+
+    def send_many(self, messages: Sequence[EmailMessage]) -> int:
+        """Send several messages in the same SMTP session.
+
+        Args:
+            messages: The messages to send.
+
+        Returns:
+            The number of messages sent.
+        """
+        with self._lock:
+            for msg in messages:
+                for attempt in range(config.SMTP_MAX_RETRIES + 1):
+                    try:
+                        self._connection().send_message(msg)
+                        break
+
+                    except _TRANSIENT_ERRORS as e:
+                        self._disconnect()
+
+                        if attempt == config.SMTP_MAX_RETRIES:
+                            raise
+
+                        logger.info(f"SMTP send failed ({e}), reconnecting")
+
+                self._last_used = time.monotonic()
+
+        return len(messages)
+
+    def submit(self, msg: EmailMessage) -> None:
+        """Queue a message for the background sender thread, starting it if needed."""
+
+        with self._lock:
+            if self._sender is None or not self._sender.is_alive():
+                self._sender = threading.Thread(target=self._send_loop, name="smtp-sender", daemon=True)
+                self._sender.start()
+
+        self._outbox.put(msg)
+
+    def _send_loop(self) -> None:
+        while True:
+            batch = [self._outbox.get()]
+
+            while True:
+                try:
+                    batch.append(self._outbox.get_nowait())
+
+                except queue.Empty:
+                    break
+
+            try:
+                self.send_many(batch)
+
+            except OSError as e:
+                logger.error(f"Failed to send {len(batch)} queued email(s): {e}")
+
+            finally:
+                for _ in batch:
+                    self._outbox.task_done()
+
+    def flush(self) -> None:
+        """Wait until every submitted message has been handled."""
+
+        if self._sender is not None:
+            self._outbox.join()
+
+    def close(self) -> None:
+        """Send what is queued and close the connection."""
+
+        self.flush()
+
+        with self._lock:
+            self._disconnect()
+
+
+_clients: dict[tuple[str, int], SMTPClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(smtp_server: str, smtp_port: int) -> SMTPClient:
+    """Return the shared client for a server, creating it on first use."""
+
+    with _clients_lock:
+        key = (smtp_server, int(smtp_port))
+
+        if key not in _clients:
+            _clients[key] = SMTPClient(smtp_server, int(smtp_port))
+
+        return _clients[key]
+
+
+def close_all() -> None:
+    """Flush and close every shared client."""
+
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+
+    for client in clients:
+        client.close()
+
+
+atexit.register(close_all)
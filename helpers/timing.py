@@ -0,0 +1,168 @@
+"""Lightweight timing of the process stages and external calls"""
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from helpers import config
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+
+_durations: dict[str, list[float]] = defaultdict(list)
+
+_current = threading.local()
+
+
+@contextmanager
+def span(name: str):
+    """
+    Time a stage of the process.
+
+    Can be used both as a context manager and as a decorator:
+
+        with timing.span("fetch_receipt"):
+            ...
+
+        @timing.span("ats.update_work_item_data")
+        def update_work_item_data(...):
+            ...
+
+    When timing is disabled the span does nothing besides yielding.
+    """
+
+    if not config.TIMING_ENABLED:
+        yield
+        return
+
+    start = time.perf_counter()
+
+    try:
+        yield
+
+    finally:
+        _record(name, time.perf_counter() - start)
+
+
+@contextmanager
+def item_span(reference: str):
+    """
+    Collect the stage timings of a single work item and write them as one JSONL record when the item is done.
+    """
+
+    if not config.TIMING_ENABLED:
+        yield
+        return
+
+    record = {"reference": reference, "stages": {}}
+    _current.record = record
+
+    start = time.perf_counter()
+
+    try:
+        yield
+
+    finally:
+        _current.record = None
+
+        record["total"] = round(time.perf_counter() - start, 4)
+
+        _record("item", record["total"])
+        _write_record(record)
+
+
+def record_value(name: str, seconds: float):
+    """Record an externally measured duration, e.g. a time-to-first-item metric."""
+
+    if config.TIMING_ENABLED:
+        _record(name, seconds)
+
+
+def _record(name: str, seconds: float):
+    """Store a measured duration for the run summary and the current item record."""
+
+    with _lock:
+        _durations[name].append(seconds)
+
+    record = getattr(_current, "record", None)
+
+    if record is not None and name != "item":
+        record["stages"][name] = round(record["stages"].get(name, 0) + seconds, 4)
+
+
+def _write_record(record: dict):
+    """Append a per-item record to the timing log."""
+
+    try:
+        log_dir = os.path.dirname(config.TIMING_LOG_PATH)
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+
+        with _lock, open(config.TIMING_LOG_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    except OSError as e:
+        logger.info(f"Could not write timing record: {e}")
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+
+    index = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1))
+
+    return sorted_values[index]
+
+
+def summary() -> dict:
+    """Aggregate count, p50, p95 and max per stage for the run so far."""
+
+    with _lock:
+        durations = {name: sorted(values) for name, values in _durations.items() if values}
+
+    return {
+        name: {
+            "count": len(values),
+            "p50": _percentile(values, 50),
+            "p95": _percentile(values, 95),
+            "max": values[-1],
+        }
+        for name, values in durations.items()
+    }
+
+
+def report():
+    """Log the aggregated stage timings for the run."""
+
+    if not config.TIMING_ENABLED:
+        return
+
+    stats = summary()
+
+    if not stats:
+        logger.info("No timings recorded.")
+        return
+
+    logger.info("Stage timings (seconds):")
+
+    for name, s in sorted(stats.items(), key=lambda kv: kv[1]["p50"], reverse=True):
+        logger.info(
+            "%-40s n=%-5d p50=%8.3f p95=%8.3f max=%8.3f",
+            name,
+            s["count"],
+            s["p50"],
+            s["p95"],
+            s["max"],
+        )
+
+
+def reset():
+    """Clear all collected timings."""
+
+    with _lock:
+        _durations.clear()
@@ -0,0 +1,134 @@
+"""Module for skipping SharePoint uploads whose content has not changed since the last upload"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import zipfile
+from io import BytesIO
+
+from helpers import config, sharepoint_upload
+
+logger = logging.getLogger(__name__)
+
+# Parts of an xlsx that change on every save without the sheet content changing
+_VOLATILE_PARTS = {"docProps/core.xml", "docProps/app.xml"}
+
+_lock = threading.Lock()
+
+_hashes: dict[str, dict] | None = None
+
+_bytes_saved = 0
+
+
+def content_hash(binary_content: bytes) -> str:
+    """
+    Hash the content of a file.
+
+    Zip based files (xlsx) are hashed from the CRCs of their parts, leaving out the document properties,
+    so a workbook saved again with the same data gets the same hash.
+    """
+
+    if binary_content[:4] == b"PK\x03\x04":
+        try:
+            with zipfile.ZipFile(BytesIO(binary_content)) as archive:
+                parts = sorted((info.filename, info.CRC, info.file_size) for info in archive.infolist() if info.filename not in _VOLATILE_PARTS)
+
+            return "zip:" + hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+        except zipfile.BadZipFile:
+            pass
+
+    return hashlib.sha256(binary_content).hexdigest()
+
+
+def _store_path() -> str:
+    return os.path.join(config.PATH, config.UPLOAD_HASH_STORE_FILE)
+
+
+def _store() -> dict[str, dict]:
+    """Load the hash store from disk on first use."""
+
+    global _hashes  # pylint: disable=global-statement
+
+    if _hashes is None:
+        try:
+            with open(_store_path(), encoding="utf-8") as f:
+                _hashes = json.load(f)
+
+        except (OSError, ValueError):
+            _hashes = {}
+
+    return _hashes
+
+
+def _save() -> None:
+    try:
+        os.makedirs(os.path.dirname(_store_path()), exist_ok=True)
+
+        with open(_store_path(), "w", encoding="utf-8") as f:
+            json.dump(_hashes, f)
+
+    except OSError as e:
+        logger.info(f"Could not save upload hashes: {e}")
+
+
+def _remote_matches(sharepoint, file_name: str, folder_name: str, size: int) -> bool:
+    """Whether SharePoint still has the file with the size that was uploaded."""
+
+    return sharepoint_upload.list_remote_files(sharepoint, folder_name).get(file_name) == size
+
+
+def upload_file_from_bytes(sharepoint, binary_content: bytes, file_name: str, folder_name: str) -> bool:
+    """
+    Upload bytes to SharePoint unless the same content was the last thing uploaded to that path.
+
+    With config.UPLOAD_GUARD_VERIFY_REMOTE the file is also looked up in SharePoint before skipping,
+    so a file deleted or replaced there is uploaded again. After an upload the file is always looked up,
+    and its hash is only stored when SharePoint has it.
+
+    Returns:
+        bool: True if the file was uploaded, False if the upload was skipped or could not be confirmed.
+    """
+
+    global _bytes_saved  # pylint: disable=global-statement
+
+    key = f"{folder_name}/{file_name}"
+    digest = content_hash(binary_content)
+
+    with _lock:
+        previous = _store().get(key)
+
+    unchanged = previous is not None and previous["hash"] == digest
+
+    if unchanged and config.UPLOAD_GUARD_VERIFY_REMOTE:
+        unchanged = _remote_matches(sharepoint, file_name, folder_name, previous["size"])
+
+    if unchanged:
+        with _lock:
+            _bytes_saved += len(binary_content)
+
+        logger.info(f"Skipped upload of '{key}', content unchanged ({len(binary_content)} bytes saved, {_bytes_saved} this run)")
+
+        return False
+
+    sharepoint.upload_file_from_bytes(binary_content=binary_content, file_name=file_name, folder_name=folder_name)
+
+    # The Sharepoint client logs a failed upload instead of raising, so the hash is only stored once SharePoint has the file
+    if not _remote_matches(sharepoint, file_name, folder_name, len(binary_content)):
+        logger.warning(f"Could not confirm the upload of '{key}', it is uploaded again next time")
+
+        return False
+
+    with _lock:
+        _store()[key] = {"hash": digest, "size": len(binary_content)}
+        _save()
+
+    return True
+
+
+def bytes_saved() -> int:
+    """Bytes not uploaded this run because the content was unchanged."""
+
+    return _bytes_saved
@@ -5,20 +5,22 @@ This is the main entry point for the process
 import asyncio
 import logging
 import sys
+import time
 
-from automation_server_client import AutomationServer, Workqueue
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import chain
 
-from mbu_dev_shared_components.database import RPAConnection
+from automation_server_client import AutomationServer, Workqueue
 
 from mbu_rpa_core.exceptions import BusinessError, ProcessError
 from mbu_rpa_core.process_states import CompletedState
 
-from helpers import ats_functions, config, outlay_ticket_creation
+from helpers import ats_functions, circuit_breaker, config, journal, row_fingerprints, smtp_util, timing
 
-from processes.application_handler import close, reset, startup
-from processes.error_handling import ErrorContext, handle_error
-from processes.process_item import process_item
-from processes.queue_handler import concurrent_add, retrieve_items_for_queue
+from processes import error_digest
+from processes.application_handler import close, reset, set_browser_manager, startup
+from processes.queue_handler import QueueFeed, retrieve_item_streams, stream_items_to_queue
 
 logger = logging.getLogger(__name__)
 
@@ -39,60 +41,130 @@ logger = logging.getLogger(__name__)
 # ╚══════════════════════════════════════════════╝
 
 
-async def populate_queue(workqueue: Workqueue):
-    """Populate the workqueue with items to be processed."""
+async def populate_queue(workqueue: Workqueue, feed: QueueFeed | None = None):
+    """Populate the workqueue with items to be processed, handing them to feed as they are added."""
 
     logger.info("Populating workqueue...")
 
-    items_to_queue = retrieve_items_for_queue()
+    try:
+        queue_references = {str(r) for r in ats_functions.get_workqueue_items(workqueue)}
+
+        streams = retrieve_item_streams(queue_references)
+
+        with timing.span("stream_items_to_queue"):
+            added = await stream_items_to_queue(workqueue, streams, skip=queue_references, on_added=feed.add if feed else None)
 
-    queue_references = {str(r) for r in ats_functions.get_workqueue_items(workqueue)}
+    finally:
+        if feed:
+            feed.finish()
 
-    new_items: list[dict] = []
-    for item in items_to_queue:
-        reference = str(item.get("reference") or "")
-        if reference and reference in queue_references:
-            logger.info(
-                "Reference: %s already in queue. Item: %s not added",
-                reference,
-                item,
-            )
-        else:
-            new_items.append(item)
+    # Rows whose items are in the queue now are skipped by the next run, unless they change
+    row_fingerprints.commit(queue_references.union(added))
 
-    await concurrent_add(workqueue, new_items)
     logger.info("Finished populating workqueue.")
+    timing.report()
+
+
+def record_outcome(reference: str, stage: str):
+    """Journal how an item ended, unless its post processing is pending and still has to be retried."""
+
+    if journal.last_stage(reference) != "post_process_pending":
+        journal.record(reference, stage)
+
+
+def resumable_items():
+    """
+    Yield the items the journal shows were started but not finished and that are still in progress in ATS.
+
+    Items ATS has closed since are journaled as closed, and items released back to the queue are left to it.
+    """
+
+    journal.compact()
+
+    for reference in journal.unfinished():
+        if journal.last_stage(reference) == "post_process_pending":
+            # The item itself is done, its post processing is retried by retry_pending_post_processing
+            continue
+
+        item = ats_functions.get_work_item_by_reference(reference)
+
+        if item is None or item.status in ("completed", "failed", "pending user action"):
+            journal.record(reference, "closed")
 
+            continue
 
-async def process_workqueue(workqueue: Workqueue):
-    """Process items from the workqueue."""
+        if item.status == "new":
+            # Released back to the queue, so it is claimed through the workqueue like any other item, and
+            # another robot cannot pick it up at the same time. Its journal entry still resumes it from its stage.
+            continue
+
+        logger.info(f"Resuming {reference} from stage '{journal.last_stage(reference)}'")
+
+        yield item
+
+
+async def process_workqueue(workqueue: Workqueue, feed: QueueFeed | None = None):
+    """Process items from the workqueue, and with feed also the items a concurrent queue run is adding."""
+
+    # The OPUS side (Selenium, Pillow for the screenshots) is only imported when processing,
+    # so --queue starts without it. benchmarks/import_budget.py checks this.
+    # pylint: disable=import-outside-toplevel
+    from helpers import helper_functions, outlay_ticket_creation
+    from helpers.browser_manager import BrowserManager
+    from processes import startup_orchestrator
+    from processes.error_handling import ErrorContext, handle_error
+    from processes.process_item import process_item
 
     logger.info("Processing workqueue...")
 
-    rpa_conn = RPAConnection(db_env="PROD", commit=False)
-    with rpa_conn:
-        opus_creds = rpa_conn.get_credential("egenbefordring_udbetaling")
-        opus_username = opus_creds.get("username")
-        opus_password = opus_creds.get("decrypted_password", "")
+    started = time.perf_counter()
+
+    headless = True
+
+    warm = await startup_orchestrator.warm_start(headless)
 
-        os2_api_key = rpa_conn.get_credential("os2_api").get("decrypted_password")
+    os2_api_key = warm.os2_api_key
+
+    # A visible spare window could take focus from the file dialog the attachment upload types into
+    browsers = BrowserManager(
+        factory=partial(outlay_ticket_creation.initialize_browser, opus_username=warm.opus_username, opus_password=warm.opus_password, headless=headless),
+        warm_spare=config.BROWSER_WARM_SPARE and headless,
+    )
+    set_browser_manager(browsers)
+
+    if warm.browser is not None:
+        browsers.adopt(warm.browser)
 
     startup()
 
+    helper_functions.retry_pending_post_processing()
+
+    items = feed.items(workqueue) if feed else workqueue
+
+    item_info = feed.item_info if feed else ats_functions.get_item_info
+
     error_count = 0
 
     while error_count < config.MAX_RETRY:
-        headless = True
+        circuit_wait = 0.0
 
-        browser = outlay_ticket_creation.initialize_browser(opus_username=opus_username, opus_password=opus_password, headless=headless)
+        for item in chain(resumable_items(), items):
+            open_circuit = None
 
-        for item in workqueue:
             try:
-                with item:
-                    data, reference = ats_functions.get_item_info(item)
+                with item, timing.item_span(item.reference):
+                    data, reference = item_info(item)
 
                     try:
                         logger.info("Processing item with reference: %s", reference)
+
+                        browser = browsers.acquire()
+
+                        if started is not None:
+                            timing.record_value("process.time_to_first_item", time.perf_counter() - started)
+
+                            started = None
+
                         process_item(data, reference, browser, headless, os2_api_key)
 
                         completed_state = CompletedState.completed(
@@ -100,8 +172,29 @@ async def process_workqueue(workqueue: Workqueue):
                         )
                         item.complete(str(completed_state))
 
+                        record_outcome(item.reference, "completed")
+
                         continue
 
+                    except circuit_breaker.CircuitOpenError as e:
+                        if journal.reached(item.reference, "created"):
+                            # The OPUS ticket exists, so handing the item back would create it again.
+                            # Its post processing is journaled as pending and retried once the circuit closes.
+                            logger.warning(f"OPUS ticket for {reference} created, post processing pending: {e}")
+
+                            if e.breaker.name != "ats":
+                                item.complete(f"OPUS ticket created, behandlet status pending: {e}")
+
+                            # With ATS down the item stays in progress, and retry_pending_post_processing completes it
+
+                        else:
+                            # The dependency is down, so hand the item back instead of failing it
+                            logger.warning(f"Releasing {reference}: {e}")
+
+                            ats_functions.release_work_item(item, str(e))
+
+                        open_circuit = e.breaker
+
                     except BusinessError as e:
                         context = ErrorContext(
                             item=item,
@@ -116,6 +209,8 @@ async def process_workqueue(workqueue: Workqueue):
                             item=item
                         )
 
+                        record_outcome(item.reference, "pending_user")
+
                     except Exception as e:
                         pe = ProcessError(str(e))
                         raise pe from e
@@ -133,14 +228,54 @@ async def process_workqueue(workqueue: Workqueue):
                     context=context,
                     item=item
                 )
+
+                record_outcome(item.reference, "failed")
+
                 error_count += 1
                 reset()
 
+            if open_circuit:
+                circuit_wait = circuit_breaker.wait_until_half_open(open_circuit, circuit_wait)
+
+                if circuit_wait is None:
+                    break
+
         break
 
+    helper_functions.retry_pending_post_processing()
+
     logger.info("Finished processing workqueue.")
+    error_digest.flush()
+    smtp_util.close_all()
+    timing.report()
     close()
 
+
+def populate_and_process(workqueue: Workqueue):
+    """
+    Run --queue and --process together, processing items as soon as they are queued.
+
+    The queue run gets its own thread and event loop, the processing stays on the main thread.
+    """
+
+    feed = QueueFeed()
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="queue") as executor:
+        queue_run = executor.submit(asyncio.run, populate_queue(workqueue, feed))
+
+        try:
+            asyncio.run(process_workqueue(workqueue, feed))
+
+        finally:
+            # Logged here too, so a failed queue run is not hidden behind a processing error
+            queue_error = queue_run.exception()
+
+            if queue_error is not None:
+                logger.error(f"Populating the workqueue failed: {queue_error!r}")
+
+        queue_run.result()
+
+
 if __name__ == "__main__":
     ats_functions.init_logger()
 
@@ -149,10 +284,13 @@ if __name__ == "__main__":
     prod_workqueue = ats.workqueue()
     process = ats.process
 
-    if "--queue" in sys.argv:
+    if "--queue" in sys.argv and "--process" in sys.argv:
+        populate_and_process(prod_workqueue)
+
+    elif "--queue" in sys.argv:
         asyncio.run(populate_queue(prod_workqueue))
 
-    if "--process" in sys.argv:
+    elif "--process" in sys.argv:
         asyncio.run(process_workqueue(prod_workqueue))
 
     sys.exit(0)
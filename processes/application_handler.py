@@ -3,15 +3,24 @@
 import logging
 
 APP = None
+BROWSERS = None
 logger = logging.getLogger(__name__)
 
 
 def get_app():
     # ruff: noqa: PLW0602
     global APP
+    if BROWSERS is not None:
+        return BROWSERS.browser
     return APP
 
 
+def set_browser_manager(manager):
+    """Register the helpers.browser_manager.BrowserManager whose current browser get_app() returns"""
+    global BROWSERS  # pylint: disable=global-statement
+    BROWSERS = manager
+
+
 def startup():
     """Function for starting applications"""
     logger.info("Starting applications...")
@@ -26,6 +35,8 @@ def startup():
 def soft_close():
     """Function for closing applications softly"""
     logger.info("Closing applications softly...")
+    if BROWSERS is not None:
+        BROWSERS.close()
 
 
 def hard_close():
@@ -43,5 +54,9 @@ def close():
 
 def reset():
     """Function for resetting application"""
+    if BROWSERS is not None:
+        # The next item gets the warm spare instead of waiting for a restart
+        BROWSERS.recycle()
+        return
     close()
     startup()
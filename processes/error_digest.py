@@ -0,0 +1,229 @@
+"""Module for batching error emails into digests"""
+
+import atexit
+import html
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from datetime import datetime
+from email.message import EmailMessage
+from email.utils import make_msgid
+
+from helpers import config, constants_cache, smtp_util
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ErrorReport:
+    """A single reported error"""
+
+    error_type: str
+    message: str
+    traceback: str
+    process_name: str | None = None
+    reference: str | None = None
+    screenshot: Future | None = None
+    occurred_at: datetime = field(default_factory=datetime.now)
+
+
+class ErrorDigest:
+    """
+    Collects error reports and sends them by email.
+
+    The first immediate_per_type errors of each error type are sent right away, the rest are
+    batched into one digest email per window_seconds (0 means once, when flushed at the end of the run).
+    Emails are built and sent on a background thread, so reporting an error only queues it.
+    """
+
+    def __init__(self, immediate_per_type: int, window_seconds: float):
+        self.immediate_per_type = immediate_per_type
+        self.window_seconds = window_seconds
+
+        self._lock = threading.Lock()
+        self._pending: list[ErrorReport] = []
+        self._counts: Counter = Counter()
+        self._window_started = time.monotonic()
+
+        self._outbox: queue.Queue = queue.Queue()
+        self._sender: threading.Thread | None = None
+
+    def report(self, report: ErrorReport) -> None:
+        """Queue an error for sending."""
+
+        with self._lock:
+            self._counts[report.error_type] += 1
+
+            immediate = self._counts[report.error_type] <= self.immediate_per_type
+
+            if not immediate:
+                self._pending.append(report)
+
+            window_due = bool(self.window_seconds) and time.monotonic() - self._window_started >= self.window_seconds
+
+        if immediate:
+            self._enqueue([report], digest=False)
+
+        if window_due:
+            self.flush(wait=False)
+
+    def flush(self, wait: bool = True) -> None:
+        """Send a digest of the pending errors and optionally wait until everything queued has been sent."""
+
+        with self._lock:
+            reports, self._pending = self._pending, []
+            self._window_started = time.monotonic()
+
+        if reports:
+            self._enqueue(reports, digest=True)
+
+        if wait and self._sender:
+            self._outbox.join()
+
+    def _enqueue(self, reports: list[ErrorReport], digest: bool) -> None:
+        with self._lock:
+            if self._sender is None or not self._sender.is_alive():
+                self._sender = threading.Thread(target=self._send_loop, name="error-digest-sender", daemon=True)
+                self._sender.start()
+
+        self._outbox.put((reports, digest))
+
+    def _send_loop(self) -> None:
+        """Send queued emails, draining everything available into one SMTP session."""
+
+        while True:
+            batch = [self._outbox.get()]
+
+            while True:
+                try:
+                    batch.append(self._outbox.get_nowait())
+
+                except queue.Empty:
+                    break
+
+            try:
+                messages = [build_message(reports, digest) for reports, digest in batch]
+
+                smtp_util.send_messages(
+                    messages=messages,
+                    smtp_server=constants_cache.get_constant("smtp_server")["value"],
+                    smtp_port=constants_cache.get_constant("smtp_port")["value"],
+                )
+
+                logger.info(f"Sent {len(messages)} error email(s)")
+
+            except Exception as e:  # noqa: BLE001 - the sender thread has to outlive any failure, or later errors go unreported
+                logger.error(f"Failed to send error email(s): {e}")
+
+            finally:
+                for _ in batch:
+                    self._outbox.task_done()
+
+
+def build_message(reports: list[ErrorReport], digest: bool) -> EmailMessage:
+    """Build a single-error email or a digest, with screenshots as inline MIME parts and page DOMs as attachments."""
+
+    process_name = next((r.process_name for r in reports if r.process_name), None)
+
+    if digest:
+        types = Counter(r.error_type for r in reports)
+        summary = ", ".join(f"{n} {t}" for t, n in types.most_common())
+        subject = f"Error digest: {len(reports)} errors ({summary})"
+
+    else:
+        subject = "Error screenshot"
+
+    if process_name:
+        subject += f": {process_name}"
+
+    msg = EmailMessage()
+    msg["to"] = constants_cache.get_constant(config.ERROR_EMAIL)["value"]
+    msg["from"] = constants_cache.get_constant(config.ERROR_SENDER)["value"]
+    msg["subject"] = subject
+
+    images = []
+    sections = []
+
+    for report in reports:
+        image_html = ""
+
+        shot = _resolve_screenshot(report)
+
+        if shot:
+            cid = make_msgid(domain="egenbefordring")
+            images.append((cid, shot))
+            image_html = f'<img src="cid:{cid[1:-1]}" alt="Screenshot">'
+
+        sections.append(f"""
+            <hr>
+            <p>Time: {report.occurred_at:%Y-%m-%d %H:%M:%S}</p>
+            <p>Reference: {html.escape(report.reference or "")}</p>
+            <p>Error type: {html.escape(report.error_type)}</p>
+            <p>Error message: {html.escape(report.message)}</p>
+            <pre>{html.escape(report.traceback or "")}</pre>
+            {image_html}
+        """)
+
+    html_message = f"""
+        <html>
+            <body>
+                {"".join(sections)}
+            </body>
+        </html>
+    """
+
+    msg.set_content("Please enable HTML to view this message.")
+    msg.add_alternative(html_message, subtype="html")
+
+    html_part = msg.get_payload()[1]
+
+    for cid, shot in images:
+        html_part.add_related(shot.image, maintype="image", subtype=shot.subtype, cid=cid)
+
+    for index, (_, shot) in enumerate(images, start=1):
+        if shot.dom:
+            msg.add_attachment(shot.dom, maintype="text", subtype="html", filename=f"dom_{index}.html")
+
+    return msg
+
+
+def _resolve_screenshot(report: ErrorReport):
+    """Wait for the background encoding of a report's screenshot."""
+
+    if report.screenshot is None:
+        return None
+
+    try:
+        return report.screenshot.result(timeout=config.SCREENSHOT_TIMEOUT)
+
+    except (TimeoutError, OSError, ValueError, KeyError) as e:
+        # Timed out, or Pillow could not encode the capture
+        logger.info(f"Screenshot for {report.reference} not available: {e}")
+
+        return None
+
+
+_digest = ErrorDigest(
+    immediate_per_type=config.ERROR_IMMEDIATE_PER_TYPE,
+    window_seconds=config.ERROR_DIGEST_WINDOW,
+)
+
+
+def report_error(report: ErrorReport) -> None:
+    """Queue an error report on the process-wide digest."""
+
+    _digest.report(report)
+
+
+def flush(wait: bool = True) -> None:
+    """Send the pending digest of the process-wide digest."""
+
+    _digest.flush(wait=wait)
+
+
+# Make sure batched errors are not lost if the run ends without an explicit flush
+atexit.register(flush)
@@ -1,19 +1,21 @@
 """Module for handling errors"""
 
-import base64
 import json
-import smtplib
+import logging
 from collections.abc import Callable
+from concurrent.futures import Future
 from dataclasses import dataclass
-from email.message import EmailMessage
-from io import BytesIO
 
 from automation_server_client import WorkItem
-from mbu_dev_shared_components.database.connection import RPAConnection
 from mbu_rpa_core.exceptions import BusinessError, ProcessError
-from PIL import ImageGrab
+from selenium.common.exceptions import WebDriverException
 
-from helpers import helper_functions
+from helpers import config, helper_functions, screenshot, timing
+from helpers.circuit_breaker import CircuitOpenError
+from processes import error_digest
+from processes.application_handler import get_app
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass
@@ -66,6 +68,7 @@ def handle_error(
             error=error,
             add_screenshot=context.add_screenshot,
             process_name=context.process_name,
+            reference=context.item.reference if context.item else None,
         )
 
     # Handle the Excel row --> update row with 'x' in behandlet_fejl
@@ -74,88 +77,64 @@ def handle_error(
 
         item_reference = item.reference
 
-        helper_functions.handle_post_process(failed=True, item_data=item_data, item_reference=item_reference)
+        try:
+            helper_functions.handle_post_process(failed=True, item_data=item_data, item_reference=item_reference)
+
+        except CircuitOpenError as e:
+            # Journaled as pending by handle_post_process, and retried once the circuit closes
+            logger.warning(f"Post processing of {item_reference} is pending: {e}")
 
 
 def send_error_email(
     error: ProcessError | BusinessError,
     add_screenshot: bool = False,
     process_name: str | None = None,
+    reference: str | None = None,
 ) -> None:
     """
-    Send email to defined recipient with error information
+    Queue an error email. The first errors of each type are sent right away,
+    later ones are batched into a digest (see processes.error_digest).
     Args:
         error (ProcessError | BusinessError): The error to include in the email.
         add_screenshot (bool): Whether to include a screenshot in the email.
         process_name (str | None): Name of the process where the error occurred.
+        reference (str | None): Reference of the work item that failed.
     Returns:
         None
-    Raises:
-        Exception: If sending the email fails.
     """
-    rpa_conn = RPAConnection(db_env="PROD", commit=False)
-    with rpa_conn:
-        error_email = rpa_conn.get_constant("Error Email")["value"]
-        error_sender = rpa_conn.get_constant("Email Friend")[
-            "value"
-        ]  # Find in database...
-        smtp_server = rpa_conn.get_constant("smtp_server")["value"]
-        smtp_port = rpa_conn.get_constant("smtp_port")["value"]
-
-    # Create message
-    msg = EmailMessage()
-    msg["to"] = error_email
-    msg["from"] = error_sender
-    msg["subject"] = "Error screenshot" + f": {process_name}" if process_name else ""
-
-    # Create an HTML message with the exception and screenshot
     error_dict = error.__dictinfo__()
 
-    if add_screenshot:
-        screenshot = grab_screenshot()
-        html_message = f"""
-                <html>
-                    <body>
-                        <p>Error type: {error_dict["type"]}</p>
-                        <p>Error message: {error_dict["message"]}</p>
-                        <p>{error_dict["traceback"]}</p>
-                        <img src="data:image/png;base64,{screenshot}" alt="Screenshot">
-                    </body>
-                </html>
-            """
-    else:
-        html_message = f"""
-                <html>
-                    <body>
-                        <p>Error type: {error_dict["type"]}</p>
-                        <p>Error message: {error_dict["message"]}</p>
-                        <p>{error_dict["traceback"]}</p>
-                    </body>
-                </html>
-            """
-
-    msg.set_content("Please enable HTML to view this message.")
-    msg.add_alternative(html_message, subtype="html")
-
-    # Send message
-    with smtplib.SMTP(smtp_server, smtp_port) as smtp:
-        smtp.starttls()
-        smtp.send_message(msg)
-
-
-def grab_screenshot() -> str:
+    screenshot_future = grab_screenshot() if add_screenshot else None
+
+    error_digest.report_error(
+        error_digest.ErrorReport(
+            error_type=error_dict["type"],
+            message=error_dict["message"],
+            traceback=error_dict["traceback"],
+            process_name=process_name,
+            reference=reference,
+            screenshot=screenshot_future,
+        )
+    )
+
+
+@timing.span("grab_screenshot")
+def grab_screenshot() -> Future | None:
     """
-    Grabs screenshot.
+    Grabs a screenshot of the active OPUS browser.
 
     Returns:
-        str: Screenshot in base64 format.
-    Raises:
-        Exception: If screenshot capture fails.
+        Future | None: Resolves to a helpers.screenshot.Screenshot, None if there is no browser to capture.
     """
-    # Take screenshot and convert to base64
-    screenshot = ImageGrab.grab()
-    buffer = BytesIO()
-    screenshot.save(buffer, format="PNG")
-    screenshot_base64 = base64.b64encode(buffer.getvalue()).decode("utf-8")
+    browser = get_app()
+
+    if browser is None:
+        return None
+
+    try:
+        return screenshot.capture(browser, include_dom=config.SCREENSHOT_INCLUDE_DOM)
+
+    except WebDriverException as e:
+        logger.info(f"Could not capture screenshot: {e}")
 
-    return screenshot_base64
+        return None
@@ -10,7 +10,7 @@ import pandas as pd
 
 from mbu_msoffice_integration.sharepoint_class import Sharepoint
 
-from helpers import ats_functions, config, helper_functions
+from helpers import ats_functions, circuit_breaker, config, helper_functions, result_workbook, sharepoint_client, sharepoint_upload, timing, upload_guard
 
 logger = logging.getLogger(__name__)
 
@@ -85,27 +85,33 @@ def finalize_process(current_run_file_name: str):
         logger.info("All runs are yet to be completed or failed")
 
 
+@timing.span("sharepoint.update_sharepoint")
+@circuit_breaker.guard("sharepoint")
 def update_sharepoint(excel_rows: list, file_name: str, folder_dest: str, failed_work_items: bool):
     """Update the SharePoint folders."""
 
     logger.info("Updating SharePoint folders.")
 
-    sharepoint = Sharepoint(**config.SHAREPOINT_KWARGS)
+    sharepoint = sharepoint_client.get_sharepoint()
 
-    df = pd.DataFrame(excel_rows)
-    df = helper_functions.ensure_columns(df=df, column_order=COLUMNS)
+    bytes_data = None
 
-    buffer = BytesIO()
+    if config.RESULT_WRITER_MODE == "patch":
+        original = result_workbook.load_original(file_name=file_name, sharepoint=sharepoint)
 
-    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
-        df.to_excel(writer, index=False)
+        if original:
+            bytes_data = result_workbook.patch_workbook(original=original, excel_rows=excel_rows)
 
-    buffer.seek(0)
-    bytes_data = buffer.read()
+        else:
+            logger.info("Original workbook not available, rebuilding the result workbook")
 
-    sharepoint.upload_file_from_bytes(binary_content=bytes_data, file_name=file_name, folder_name=f"{config.FOLDER_NAME}/{folder_dest}")
+    if bytes_data is None:
+        bytes_data = build_result_workbook(excel_rows=excel_rows)
 
-    logger.info(f"Excel file uploaded to the {folder_dest} folder")
+    uploaded = upload_guard.upload_file_from_bytes(sharepoint=sharepoint, binary_content=bytes_data, file_name=file_name, folder_name=f"{config.FOLDER_NAME}/{folder_dest}")
+
+    if uploaded:
+        logger.info(f"Excel file uploaded to the {folder_dest} folder")
 
     if failed_work_items:
         receipt_folder_name = os.path.splitext(file_name)[0]
@@ -115,6 +121,24 @@ def update_sharepoint(excel_rows: list, file_name: str, folder_dest: str, failed
     # delete_file_from_sharepoint(file_name=file_name, sharepoint=sharepoint)
 
 
+@timing.span("result_workbook.rebuild")
+def build_result_workbook(excel_rows: list) -> bytes:
+    """Build the result workbook from the rows stored on the work items."""
+
+    df = pd.DataFrame(excel_rows)
+    df = helper_functions.ensure_columns(df=df, column_order=COLUMNS)
+
+    buffer = BytesIO()
+
+    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+        df.to_excel(writer, index=False)
+
+    buffer.seek(0)
+
+    return buffer.read()
+
+
+@timing.span("sharepoint.upload_folder_to_sharepoint")
 def upload_folder_to_sharepoint(folder_dest: str, receipt_folder_name: str, sharepoint: Sharepoint) -> None:
     """Upload a folder and its contents to SharePoint."""
 
@@ -134,13 +158,25 @@ def upload_folder_to_sharepoint(folder_dest: str, receipt_folder_name: str, shar
     local_folder_path = os.path.join(config.PATH, receipt_folder_name)
 
     if os.path.exists(local_folder_path):
-        for file_name in os.listdir(local_folder_path):
-            file_full_path = os.path.join(local_folder_path, file_name)
+        file_paths = [
+            os.path.join(local_folder_path, file_name)
+            for file_name in sorted(os.listdir(local_folder_path))
+            if os.path.isfile(os.path.join(local_folder_path, file_name))
+        ]
+
+        results = sharepoint_upload.upload_files(
+            file_paths=file_paths,
+            folder_name=f"{config.FOLDER_NAME}/Fejlet/{receipt_folder_name}",
+            client_factory=sharepoint_client.new_sharepoint,
+            sharepoint=sharepoint,
+        )
+
+        failed = [r.file_name for r in results if r.status == "failed"]
 
-            if os.path.isfile(file_full_path):
-                sharepoint.upload_file(folder_name=f"{config.FOLDER_NAME}/Fejlet/{receipt_folder_name}", file_path=file_full_path, file_name=file_name)
+        if failed:
+            logger.error(f"{len(failed)} file(s) could not be uploaded to SharePoint: {', '.join(failed)}")
 
-    logger.info(f"Folder '{local_folder_path}' and its contents have been uploaded successfully to SharePoint.")
+    logger.info(f"Folder '{local_folder_path}' and its contents have been uploaded to SharePoint.")
 
 
 def delete_file_from_sharepoint(file_name: str, sharepoint: Sharepoint) -> None:
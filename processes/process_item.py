@@ -1,10 +1,10 @@
 """Module to handle item processing"""
 # from mbu_rpa_core.exceptions import ProcessError, BusinessError
 
-import os
 import logging
+import os
 
-from helpers import outlay_ticket_creation, helper_functions
+from helpers import helper_functions, journal, outlay_ticket_creation, timing
 
 logger = logging.getLogger(__name__)
 
@@ -19,11 +19,37 @@ def process_item(item_data: dict, item_reference: str, browser, headless, os2_ap
 
     receipts = []
 
-    folder_path, file_content = helper_functions.fetch_receipt(item_data=item_data, os2_api_key=os2_api_key)
+    # Recording "started" over an earlier stage would throw away what a crashed run got done
+    if journal.last_stage(item_reference) in (None, *journal.FINAL_STAGES):
+        journal.record(item_reference, "started")
+
+    folder_path = helper_functions.receipt_folder_path(item_data)
+
+    if journal.reached(item_reference, "receipt_fetched") and helper_functions.receipt_exists(folder_path=folder_path, item_data=item_data):
+        logger.info(f"Resuming {item_reference}: receipt already fetched")
+
+    else:
+        with timing.span("fetch_receipt"):
+            folder_path, file_content = helper_functions.fetch_receipt(item_data=item_data, os2_api_key=os2_api_key)
+
+        receipts.append(file_content)
+
+        journal.record(item_reference, "receipt_fetched")
+
+    if journal.reached(item_reference, "created"):
+        logger.info(f"Resuming {item_reference}: OPUS ticket already created")
 
-    receipts.append(file_content)
+    else:
+        with timing.span("handle_opus"):
+            outlay_ticket_creation.handle_opus(
+                item_data=item_data,
+                path=folder_path,
+                browser=browser,
+                headless=headless,
+                on_stage=lambda stage: journal.record(item_reference, stage),
+            )
 
-    outlay_ticket_creation.handle_opus(item_data=item_data, path=folder_path, browser=browser, headless=headless)
+        journal.record(item_reference, "created")
 
     helper_functions.remove_attachment_if_exists(folder_path=folder_path, item_data=item_data)
 
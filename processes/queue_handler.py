@@ -3,131 +3,283 @@
 import asyncio
 import json
 import logging
+import threading
+import time
 
-from automation_server_client import Workqueue
-
-from mbu_msoffice_integration.sharepoint_class import Sharepoint
+from collections.abc import Callable, Container, Iterator
 
-from mbu_dev_shared_components.database.connection import RPAConnection
+from automation_server_client import Workqueue
 
-from helpers import config, helper_functions
+from helpers import ats_functions, config, constants_cache, helper_functions, row_fingerprints, sharepoint_client, timing
 
 logger = logging.getLogger(__name__)
 
 
-def retrieve_items_for_queue() -> list[dict]:
-    """Function to populate queue"""
-    data = []
-    references = []
+def retrieve_item_streams(queue_references: Container[str] = frozenset()) -> dict[str, Iterator[dict]]:
+    """
+    Prepare the queue run and return a lazy stream of queue items for every sheet in the folder.
+
+    Nothing is downloaded until a stream is iterated. queue_references are the references already in the queue.
+    """
 
     helper_functions.delete_all_files_in_path(config.PATH)
 
-    with RPAConnection(db_env="PROD", commit=False) as rpa_conn:
-        egenbefordring_procargs = json.loads(rpa_conn.get_constant(constant_name="egenbefordring_procargs").get("value"))
+    egenbefordring_procargs = json.loads(constants_cache.get_constant(config.PROCARGS).get("value"))
 
-        naeste_agent = egenbefordring_procargs.get("naeste_agent")
+    naeste_agent = egenbefordring_procargs.get("naeste_agent")
 
-    sharepoint = Sharepoint(**config.SHAREPOINT_KWARGS)
+    sharepoint = sharepoint_client.get_sharepoint()
 
-    file_name = helper_functions.fetch_files(folder_name=config.FOLDER_NAME, sharepoint=sharepoint)
+    file_names = helper_functions.fetch_files(folder_name=config.FOLDER_NAME, sharepoint=sharepoint)
 
-    data_df = helper_functions.load_excel_data(file_name=file_name, sharepoint=sharepoint)
+    if len(file_names) <= 1:
+        return {file_name: iter_items_for_file(file_name, naeste_agent, sharepoint, queue_references) for file_name in file_names}
 
-    processed_df = helper_functions.process_data(data_df, naeste_agent, file_name)
+    # The SharePoint client context is not thread safe, so each file gets its own client sharing the token
+    return {file_name: iter_items_for_file(file_name, naeste_agent, sharepoint_client.new_sharepoint(), queue_references) for file_name in file_names}
 
-    approved_df = processed_df[processed_df["is_godkendt"]]
 
-    # Loop through each approved row and build queue data
-    for _, row in approved_df.iterrows():
-        row_data = {k: helper_functions.nan_to_none(v) for k, v in row.to_dict().items()}
+def iter_items_for_file(file_name: str, naeste_agent: str, sharepoint, queue_references: Container[str] = frozenset()) -> Iterator[dict]:
+    """
+    Download one sheet and stream the queue items for its approved rows.
 
-        reference_file_name = str(file_name).replace(".xlsx", "")
+    Rows go through parse -> filter -> transform one at a time, so the first item is ready as soon as
+    the first approved row is parsed, and memory does not grow with the size of the sheet. Unchanged rows
+    are only filtered out while their item is in queue_references.
+    """
 
-        # Reference = posteringstekst + unique UUID
-        reference = f"{reference_file_name}_{row_data.get('uuid')}"
+    bytes_data = helper_functions.download_sheet(file_name=file_name, sharepoint=sharepoint)
 
-        data.append(row_data)
+    rows = helper_functions.iter_approved_rows(bytes_data)
 
-        references.append(reference)
+    rows = row_fingerprints.filter_rows(rows, reference_prefix(file_name), queue_references)
 
-    items = [
-        {"reference": ref, "data": d} for ref, d in zip(references, data, strict=True)
-    ]
+    count = 0
 
-    return items
+    for row in helper_functions.transform_rows(rows, naeste_agent, file_name):
+        count += 1
 
+        yield queue_item(row, file_name)
 
-def create_sort_key(item: dict) -> str:
-    """
-    Create a sort key based on the entire JSON structure.
-    Converts the item to a sorted JSON string for consistent ordering.
+    logger.info(f"{count} new or changed approved rows in {file_name}")
+
+
+def queue_item(row: dict, file_name: str) -> dict:
+    """The queue item for a processed row."""
+
+    row_data = {k: helper_functions.nan_to_none(v) for k, v in row.items()}
+
+    # Reference = posteringstekst + unique UUID
+    reference = f"{reference_prefix(file_name)}_{row_data.get('uuid')}"
+
+    return {"reference": reference, "data": row_data}
+
+
+def reference_prefix(file_name: str) -> str:
+    """The part of a queue reference that names the sheet the row came from."""
+
+    return str(file_name).replace(".xlsx", "")
+
+
+async def add_item(workqueue: Workqueue, item: dict) -> bool:
     """
-    return json.dumps(item, sort_keys=True, ensure_ascii=False)
+    Add one item to the workqueue, retrying with exponential backoff.
 
+    Returns:
+        bool: True if the item was added, False if it failed after all retries.
+    """
 
-async def concurrent_add(workqueue: Workqueue, items: list[dict]) -> None:
+    reference = str(item.get("reference") or "")
+    data = {"item": item}
+
+    for attempt in range(1, config.MAX_RETRIES + 1):
+        try:
+            await asyncio.to_thread(workqueue.add_item, data, reference)
+            logger.info("Added item to queue with reference: %s", reference)
+            return True
+
+        except Exception as e:
+            if attempt >= config.MAX_RETRIES:
+                logger.error(
+                    "Failed to add item %s after %d attempts: %s",
+                    reference,
+                    attempt,
+                    e,
+                )
+                return False
+
+            backoff = config.RETRY_BASE_DELAY * (2 ** (attempt - 1))
+
+            logger.warning(
+                "Error adding %s (attempt %d/%d). Retrying in %.2fs... %s",
+                reference,
+                attempt,
+                config.MAX_RETRIES,
+                backoff,
+                e,
+            )
+            await asyncio.sleep(backoff)
+
+    return False
+
+
+async def stream_items_to_queue(workqueue: Workqueue, streams: dict[str, Iterator[dict]], skip: set[str], on_added: Callable[[dict], None] | None = None) -> list[str]:
     """
-    Populate the workqueue with items to be processed.
-    Uses concurrency and retries with exponential backoff.
+    Add the items of the sheet streams to the workqueue while the sheets are still being parsed.
+
+    Each stream is drained on its own thread (at most config.QUEUE_FILE_WORKERS at a time) into a buffer
+    of config.QUEUE_BUFFER_SIZE items, which config.MAX_CONCURRENCY workers add to the queue. A full buffer
+    pauses the parsing, so memory stays flat however large the sheets are.
+
+    A sheet that fails to load is logged and left for the next run. Items added before the failure stay
+    in the queue.
 
     Args:
         workqueue (Workqueue): The workqueue to populate.
-        items (list[dict]): List of items to add to the queue.
+        streams (dict[str, Iterator[dict]]): Queue item streams by file name, see retrieve_item_streams.
+        skip (set[str]): References already in the queue.
+        on_added (Callable[[dict], None] | None): Called with each item once it is in the queue.
 
     Returns:
-        None
+        list[str]: The references of the items that were added.
 
     Raises:
-        Exception: If adding an item fails after all retries.
+        Exception: The first error, if every sheet failed to load.
     """
-    sem = asyncio.Semaphore(config.MAX_CONCURRENCY)
-
-    async def add_one(it: dict):
-        reference = str(it.get("reference") or "")
-        data = {"item": it}
-
-        async with sem:
-            for attempt in range(1, config.MAX_RETRIES + 1):
-                try:
-                    await asyncio.to_thread(workqueue.add_item, data, reference)
-                    logger.info("Added item to queue with reference: %s", reference)
-                    return True
-
-                except Exception as e:
-                    if attempt >= config.MAX_RETRIES:
-                        logger.error(
-                            "Failed to add item %s after %d attempts: %s",
-                            reference,
-                            attempt,
-                            e,
-                        )
-                        return False
-
-                    backoff = config.RETRY_BASE_DELAY * (2 ** (attempt - 1))
-
-                    logger.warning(
-                        "Error adding %s (attempt %d/%d). Retrying in %.2fs... %s",
-                        reference,
-                        attempt,
-                        config.MAX_RETRIES,
-                        backoff,
-                        e,
-                    )
-                    await asyncio.sleep(backoff)
-
-    if not items:
+
+    if not streams:
         logger.info("No new items to add.")
-        return
+        return []
 
-    sorted_items = sorted(items, key=create_sort_key)
-    logger.info(
-        "Processing %d items sorted by complete JSON structure", len(sorted_items)
-    )
+    loop = asyncio.get_running_loop()
+    buffer: asyncio.Queue = asyncio.Queue(maxsize=config.QUEUE_BUFFER_SIZE)
+    files = asyncio.Semaphore(config.QUEUE_FILE_WORKERS)
+
+    start = time.perf_counter()
+    seen: set[str] = set()
+    added: list[str] = []
+    errors = []
+    failures = 0
+    first_item = True
+
+    def drain(stream: Iterator[dict]) -> None:
+        for item in stream:
+            reference = str(item.get("reference") or "")
+
+            if reference and (reference in skip or reference in seen):
+                logger.info("Reference: %s already in queue. Item not added", reference)
+                continue
+
+            seen.add(reference)
+
+            asyncio.run_coroutine_threadsafe(buffer.put(item), loop).result()
+
+    async def produce(file_name: str, stream: Iterator[dict]) -> None:
+        async with files:
+            try:
+                await asyncio.to_thread(drain, stream)
+
+            # A sheet can fail in the download, the parse or the transform of any row. It should not stop the
+            # other sheets, and the error is raised below if every sheet failed.
+            except Exception as e:  # noqa: BLE001
+                logger.error(f"Could not load {file_name}, it is left for the next run: {e}")
+
+                errors.append(e)
 
-    results = await asyncio.gather(*(add_one(i) for i in sorted_items))
-    successes = sum(1 for r in results if r)
-    failures = len(results) - successes
+    async def consume() -> None:
+        nonlocal failures, first_item
+
+        while (item := await buffer.get()) is not None:
+            if await add_item(workqueue, item):
+                added.append(str(item.get("reference") or ""))
+
+                if on_added:
+                    on_added(item)
+
+                if first_item:
+                    first_item = False
+
+                    timing.record_value("queue.time_to_first_item", time.perf_counter() - start)
+
+            else:
+                failures += 1
+
+    consumers = [asyncio.create_task(consume()) for _ in range(config.MAX_CONCURRENCY)]
+
+    await asyncio.gather(*(produce(file_name, stream) for file_name, stream in streams.items()))
+
+    for _ in consumers:
+        await buffer.put(None)
+
+    await asyncio.gather(*consumers)
 
     logger.info(
-        "Summary: %d succeeded, %d failed out of %d", successes, failures, len(results)
+        "Summary: %d succeeded, %d failed out of %d", len(added), failures, len(added) + failures
     )
+
+    if len(errors) == len(streams):
+        raise errors[0]
+
+    return added
+
+
+class QueueFeed:
+    """
+    Hands the items a --queue run adds to a --process run in the same process.
+
+    The processing side claims items from the workqueue as before, but waits for more while the queue run is
+    still adding them, and unpacks the data of items this process wrote from memory instead of the work item.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._items: dict[str, dict] = {}
+        self._added = 0
+        self.finished = False
+
+    def add(self, item: dict) -> None:
+        """Note an item the queue run has added."""
+
+        with self._condition:
+            # The first items added are the first claimed, later ones are read from the work item instead
+            if len(self._items) < config.PIPELINE_CACHE_SIZE:
+                self._items[str(item.get("reference") or "")] = item
+
+            self._added += 1
+
+            self._condition.notify_all()
+
+    def finish(self) -> None:
+        """Mark the queue run as done, adding or not."""
+
+        with self._condition:
+            self.finished = True
+
+            self._condition.notify_all()
+
+    def items(self, workqueue: Workqueue) -> Iterator:
+        """Claim items from the workqueue until it is empty and the queue run has finished."""
+
+        while True:
+            with self._condition:
+                finished = self.finished
+                added = self._added
+
+            yield from workqueue
+
+            if finished:
+                return
+
+            with self._condition:
+                self._condition.wait_for(lambda seen=added: self.finished or self._added != seen)
+
+    def item_info(self, item) -> tuple[dict, str]:
+        """Unpack an item like ats_functions.get_item_info, from memory if this process added it."""
+
+        with self._condition:
+            queued = self._items.pop(str(item.reference), None)
+
+        if queued is None:
+            return ats_functions.get_item_info(item)
+
+        return queued["data"], queued["reference"]
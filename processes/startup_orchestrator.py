@@ -0,0 +1,95 @@
+"""Overlapped startup of the --process run: Chrome, credentials, ATS and OS2Forms at the same time"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+
+import requests
+
+from helpers import (
+    ats_functions,
+    config,
+    constants_cache,
+    outlay_ticket_creation,
+    timing,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WarmStart:
+    """What the process needs before its first item"""
+
+    opus_username: str
+    opus_password: str
+    os2_api_key: str
+    browser: object | None = None
+
+
+def _fetch_credentials() -> tuple[str, str, str]:
+    """Fetch the credentials, which prefetches every constant of the run in the same database connection."""
+
+    with timing.span("startup.credentials"):
+        opus_creds = constants_cache.get_credential(config.OPUS_CREDENTIAL)
+
+        os2_api_key = constants_cache.get_credential(config.OS2_API_CREDENTIAL).get("decrypted_password")
+
+    return opus_creds.get("username"), opus_creds.get("decrypted_password", ""), os2_api_key
+
+
+def _check_os2forms() -> None:
+    """Log a warning if OS2Forms does not answer, the receipt downloads will fail the same way."""
+
+    try:
+        with timing.span("startup.os2forms"):
+            requests.head(config.OS2FORMS_URL, timeout=10)
+
+    except requests.exceptions.RequestException as e:
+        logger.warning(f"OS2Forms is not reachable: {e}")
+
+
+async def _launch_and_log_in(headless: bool, credentials: asyncio.Task):
+    """Launch Chrome right away and log in as soon as the credentials arrive."""
+
+    browser = await asyncio.to_thread(outlay_ticket_creation.launch_browser, headless=headless)
+
+    try:
+        opus_username, opus_password, _ = await credentials
+
+        await asyncio.to_thread(outlay_ticket_creation.log_in, browser, opus_username, opus_password)
+
+    except BaseException:
+        await asyncio.to_thread(browser.quit)
+
+        raise
+
+    return browser
+
+
+async def warm_start(headless: bool) -> WarmStart:
+    """
+    Launch Chrome, fetch the credentials and constants, open the ATS connection and check OS2Forms concurrently.
+
+    A browser that fails to start or log in is logged and left out, so the first item launches one the usual
+    way and fails like it did before. Failing to fetch the credentials stops the run.
+    """
+
+    with timing.span("startup"):
+        credentials = asyncio.create_task(asyncio.to_thread(_fetch_credentials))
+
+        browser, _, _ = await asyncio.gather(
+            _launch_and_log_in(headless, credentials),
+            asyncio.to_thread(ats_functions.warm_up),
+            asyncio.to_thread(_check_os2forms),
+            return_exceptions=True,
+        )
+
+        opus_username, opus_password, os2_api_key = await credentials
+
+    if isinstance(browser, BaseException):
+        logger.warning(f"Could not start the OPUS browser during startup: {browser}")
+
+        browser = None
+
+    return WarmStart(opus_username=opus_username, opus_password=opus_password, os2_api_key=os2_api_key, browser=browser)
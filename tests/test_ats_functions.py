@@ -0,0 +1,109 @@
+"""Paging through the ATS workqueue listing"""
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from helpers import ats_functions
+
+START = datetime(2026, 1, 1)
+
+
+class _Response:
+    def __init__(self, payload: dict):
+        self._payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self) -> dict:
+        return self._payload
+
+
+class _PagedATS:
+    """Serves a workqueue listing page by page, in the order the items were given."""
+
+    def __init__(self, items: list[dict], filters_status: bool = True):
+        self.items = items
+        self.filters_status = filters_status
+        self.requests = 0
+
+    def get(self, url, headers=None, timeout=None):  # pylint: disable=unused-argument
+        self.requests += 1
+
+        query = {key: values[0] for key, values in parse_qs(urlparse(url).query).items()}
+
+        items = self.items
+
+        if self.filters_status and "status" in query:
+            items = [item for item in items if item["status"] == query["status"]]
+
+        page, size = int(query["page"]), int(query["size"])
+
+        return _Response({"items": items[(page - 1) * size:page * size]})
+
+
+def _items(count: int) -> list[dict]:
+    """Items created an hour apart, every third one failed, oldest first."""
+
+    return [
+        {"reference": f"EGB-{i}", "status": "failed" if i % 3 == 0 else "completed", "created_at": (START + timedelta(hours=i)).isoformat()}
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def ats(monkeypatch):
+    def install(items: list[dict], filters_status: bool = True) -> _PagedATS:
+        fake = _PagedATS(items, filters_status=filters_status)
+
+        monkeypatch.setattr(ats_functions, "URL", "https://ats.example")
+        monkeypatch.setattr(ats_functions, "TOKEN", "token")
+        monkeypatch.setattr(ats_functions, "SESSION", fake)
+
+        return fake
+
+    return install
+
+
+def _expected(items: list[dict], from_date: datetime, to_date: datetime) -> list[str]:
+    return [
+        item["reference"] for item in items
+        if item["status"] == "failed" and from_date < datetime.fromisoformat(item["created_at"]) < to_date
+    ]
+
+
+@pytest.mark.parametrize("order", ["oldest_first", "newest_first", "shuffled"])
+def test_failed_items_of_the_period_in_any_order(ats, order):
+    items = _items(1500)
+
+    if order == "newest_first":
+        items.reverse()
+
+    elif order == "shuffled":
+        items = items[::2] + items[1::2]
+
+    fake = ats(items)
+
+    from_date, to_date = START + timedelta(hours=100), START + timedelta(hours=1000)
+
+    failed = ats_functions.get_failed_workqueue_items(SimpleNamespace(id=1), from_date, to_date)
+
+    assert [item["reference"] for item in failed] == _expected(items, from_date, to_date)
+
+    # The 500 failed items take 3 pages, and the empty fourth ends the listing
+    assert fake.requests == 4
+
+
+def test_status_is_checked_when_ats_ignores_the_filter(ats):
+    items = _items(450)
+
+    ats(items, filters_status=False)
+
+    from_date, to_date = START, START + timedelta(days=365)
+
+    failed = ats_functions.get_failed_workqueue_items(SimpleNamespace(id=1), from_date, to_date)
+
+    assert [item["reference"] for item in failed] == _expected(items, from_date, to_date)
@@ -0,0 +1,57 @@
+"""The warm spare browser in helpers/browser_manager.py"""
+
+import pytest
+
+from helpers import browser_manager, config
+
+
+class FakeBrowser:
+    """A browser that answers and records whether it was quit"""
+
+    def __init__(self, name):
+        self.name = name
+        self.quit_called = False
+
+    def execute_script(self, script):
+        return 1
+
+    def execute_cdp_cmd(self, cmd, params):
+        return {"metrics": []}
+
+    def quit(self):
+        self.quit_called = True
+
+
+@pytest.mark.parametrize("logged_in", [True, False])
+def test_spare_is_only_adopted_while_logged_in(monkeypatch, logged_in):
+    launched = []
+
+    def factory():
+        launched.append(FakeBrowser(f"browser-{len(launched)}"))
+
+        return launched[-1]
+
+    monkeypatch.setattr(config, "BROWSER_RECYCLE_AFTER", 1)
+    monkeypatch.setattr(browser_manager.opus_session, "is_logged_in", lambda browser: logged_in)
+
+    manager = browser_manager.BrowserManager(factory=factory, warm_spare=True)
+
+    try:
+        first = manager.acquire()
+        spare = manager._spare.result()  # pylint: disable=protected-access
+
+        second = manager.acquire()
+
+    finally:
+        manager.close()
+
+    assert first.name == "browser-0"
+    assert spare.name == "browser-1"
+
+    if logged_in:
+        assert second is spare
+
+    else:
+        # The logged out spare is dropped, and a new browser is launched in its place
+        assert second.name == "browser-2"
+        assert spare.quit_called
@@ -0,0 +1,16 @@
+"""The import-time budget of main.py per mode, see benchmarks/import_budget.py"""
+
+import pytest
+
+from benchmarks import import_budget
+
+
+@pytest.mark.parametrize("mode", list(import_budget.MODES))
+def test_mode_imports_within_budget(monkeypatch, mode):
+    # Set for the fresh interpreters, as main_cli does
+    monkeypatch.setenv("OPENORCHESTRATORKEY", "test-key")
+
+    result = import_budget.run_mode(mode, runs=3, budget=import_budget.MODES[mode]["budget"], top=10)
+
+    assert result["forbidden_imports"] == []
+    assert not result["over_budget"], f"{mode} imports in {result['seconds']}s, slowest: {result['slowest']}"
@@ -0,0 +1,112 @@
+"""Resuming an item from the stages a crashed run left in the journal"""
+
+import os
+
+import pytest
+
+from helpers import config, helper_functions, journal, outlay_ticket_creation
+from processes import process_item
+
+REFERENCE = "EGB-1"
+
+ITEM_DATA = {"uuid": "1234", "file_name": "Egenbefordring.xlsx"}
+
+
+def save_receipt() -> str:
+    """Save the receipt where fetch_receipt puts it."""
+
+    folder_path = helper_functions.receipt_folder_path(ITEM_DATA)
+    os.makedirs(folder_path, exist_ok=True)
+
+    with open(os.path.join(folder_path, "receipt_1234.pdf"), "wb") as f:
+        f.write(b"%PDF")
+
+    return folder_path
+
+
+@pytest.fixture
+def calls(tmp_path, monkeypatch):
+    """Replace the steps of an item with stubs that record which of them ran."""
+
+    monkeypatch.setattr(config, "JOURNAL_PATH", str(tmp_path / "journal.jsonl"))
+    monkeypatch.setattr(config, "PATH", str(tmp_path))
+    monkeypatch.setattr(journal, "_last_entries", None)
+
+    ran = []
+
+    def fetch_receipt(item_data, os2_api_key):  # pylint: disable=unused-argument
+        ran.append("fetch_receipt")
+
+        return save_receipt(), b"%PDF"
+
+    monkeypatch.setattr(helper_functions, "fetch_receipt", fetch_receipt)
+    monkeypatch.setattr(outlay_ticket_creation, "handle_opus", lambda **_kwargs: ran.append("handle_opus"))
+    monkeypatch.setattr(helper_functions.ats_functions, "update_work_item_data", lambda *_args: ran.append("update_work_item_data"))
+    monkeypatch.setattr(helper_functions.finalize_process, "finalize_process", lambda **_kwargs: ran.append("finalize_process"))
+
+    return ran
+
+
+def crash_after(*stages: str, receipt: bool = True) -> None:
+    """Leave a journal like a run that stopped after the given stages, and reload it like a new run does."""
+
+    for stage in stages:
+        journal.record(REFERENCE, stage)
+
+    if receipt:
+        save_receipt()
+
+    journal._last_entries = None  # pylint: disable=protected-access
+
+
+def run_item() -> None:
+    process_item.process_item(item_data=dict(ITEM_DATA), item_reference=REFERENCE, browser=None, headless=True, os2_api_key="key")
+
+
+def test_new_item_runs_every_step(calls):
+    run_item()
+
+    assert calls == ["fetch_receipt", "handle_opus", "update_work_item_data", "finalize_process"]
+    assert journal.last_stage(REFERENCE) == "reported"
+
+
+def test_resume_after_the_receipt_was_fetched(calls):
+    crash_after("started", "receipt_fetched")
+
+    run_item()
+
+    assert calls == ["handle_opus", "update_work_item_data", "finalize_process"]
+
+
+def test_receipt_is_fetched_again_when_it_is_gone(calls):
+    crash_after("started", "receipt_fetched", receipt=False)
+
+    run_item()
+
+    assert calls == ["fetch_receipt", "handle_opus", "update_work_item_data", "finalize_process"]
+
+
+def test_resume_after_the_ticket_was_created(calls):
+    crash_after("started", "receipt_fetched", "form_filled", "controlled", "created")
+
+    run_item()
+
+    assert calls == ["update_work_item_data", "finalize_process"]
+
+
+def test_resume_after_the_item_was_reported(calls):
+    crash_after("started", "receipt_fetched", "created", "reported")
+
+    run_item()
+
+    assert calls == ["finalize_process"]
+
+
+def test_item_finished_earlier_starts_over(calls):
+    crash_after("started", "receipt_fetched", "created", "reported")
+    journal.record(REFERENCE, "completed")
+    journal._last_entries = None  # pylint: disable=protected-access
+
+    run_item()
+
+    assert calls == ["fetch_receipt", "handle_opus", "update_work_item_data", "finalize_process"]
@@ -0,0 +1,112 @@
+"""The process loop in main.py"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import main
+from helpers import (
+    ats_functions,
+    browser_manager,
+    circuit_breaker,
+    config,
+    helper_functions,
+    journal,
+)
+from processes import process_item, startup_orchestrator
+
+
+@pytest.fixture(autouse=True)
+def journal_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "JOURNAL_PATH", str(tmp_path / "journal.jsonl"))
+    monkeypatch.setattr(journal, "_last_entries", None)
+
+
+def test_resume_only_items_still_in_progress(monkeypatch):
+    statuses = {"EGB-1": "in progress", "EGB-2": "new", "EGB-3": "completed"}
+
+    for reference in statuses:
+        journal.record(reference, "receipt_fetched")
+
+    monkeypatch.setattr(main.ats_functions, "get_work_item_by_reference", lambda reference: SimpleNamespace(reference=reference, status=statuses[reference]))
+
+    assert [item.reference for item in main.resumable_items()] == ["EGB-1"]
+
+    # The released item keeps its stage for when the queue hands it out, the closed one is done
+    assert journal.last_stage("EGB-2") == "receipt_fetched"
+    assert journal.last_stage("EGB-3") == "closed"
+
+
+class FakeItem:
+    """A work item that keeps its status, like the ATS client does"""
+
+    def __init__(self, reference):
+        self.reference = reference
+        self.status = "in progress"
+        self.data = {"item": {"data": {"file_name": "Egenbefordring.xlsx"}, "reference": reference}}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def complete(self, message):
+        self.status = "completed"
+
+    def pending_user(self, message):
+        self.status = "pending user action"
+
+
+@pytest.mark.parametrize("down", ["sharepoint", "ats"])
+def test_created_item_is_completed_once_its_post_processing_is_done(monkeypatch, down):
+    item = FakeItem("EGB-1")
+    state = {"down": down, "finalized": []}
+
+    def reachable(name):
+        if state["down"] == name:
+            raise circuit_breaker.CircuitOpenError(circuit_breaker.BREAKERS[name])
+
+    def get_work_item_by_reference(reference):
+        reachable("ats")
+
+        return item
+
+    def finalize_process(current_run_file_name):
+        reachable("sharepoint")
+
+        # Anything but completed would put the file in "Fejlet"
+        state["finalized"].append(item.status)
+
+    def process(data, reference, browser, headless, os2_api_key):
+        journal.record(reference, "created")
+
+        helper_functions.handle_post_process(failed=False, item_data=data, item_reference=reference)
+
+    async def warm_start(headless):
+        return SimpleNamespace(os2_api_key="", opus_username="", opus_password="", browser=None)
+
+    monkeypatch.setattr(ats_functions, "update_work_item_data", lambda item_reference, failed: reachable("ats"))
+    monkeypatch.setattr(ats_functions, "get_work_item_by_reference", get_work_item_by_reference)
+    monkeypatch.setattr(helper_functions.finalize_process, "finalize_process", finalize_process)
+    monkeypatch.setattr(process_item, "process_item", process)
+    monkeypatch.setattr(startup_orchestrator, "warm_start", warm_start)
+    monkeypatch.setattr(browser_manager, "BrowserManager", lambda **kwargs: SimpleNamespace(acquire=lambda: None))
+    monkeypatch.setattr(circuit_breaker, "wait_until_half_open", lambda breaker, waited: None)
+
+    for name in ("set_browser_manager", "startup", "reset", "close"):
+        monkeypatch.setattr(main, name, lambda *args: None)
+
+    asyncio.run(main.process_workqueue([item]))
+
+    assert journal.last_stage(item.reference) == "post_process_pending"
+    assert item.status == ("in progress" if down == "ats" else "completed")
+
+    state["down"] = None
+
+    helper_functions.retry_pending_post_processing()
+
+    assert item.status == "completed"
+    assert state["finalized"] == ["completed"]
+    assert journal.last_stage(item.reference) == "closed"
@@ -0,0 +1,63 @@
+"""Network report from a browser's performance log"""
+
+import json
+
+import pytest
+
+from helpers import config, network_filter
+
+
+class _Browser:
+    """Performance log that empties when read, like Chrome's."""
+
+    def __init__(self):
+        self.log = []
+
+    def request(self, request_id: str, size: int, from_cache: bool = False):
+        events = [("Network.requestWillBeSent", {})]
+
+        if from_cache:
+            events.append(("Network.requestServedFromCache", {}))
+
+        events.append(("Network.loadingFinished", {"encodedDataLength": size}))
+
+        for method, params in events:
+            self.log.append({"message": json.dumps({"message": {"method": method, "params": {"requestId": request_id, **params}}})})
+
+    def get_log(self, log_type: str) -> list[dict]:
+        assert log_type == "performance"
+
+        entries, self.log = self.log, []
+
+        return entries
+
+
+@pytest.fixture(autouse=True)
+def report_on(monkeypatch):
+    monkeypatch.setattr(config, "NETWORK_REPORT", True)
+
+
+def test_page_report_counts_only_the_page_after_clear_log():
+    browser = _Browser()
+
+    # The login, before the item's first page
+    browser.request("login", 5000)
+
+    network_filter.clear_log(browser)
+
+    browser.request("page", 2048)
+    browser.request("script", 1024, from_cache=True)
+
+    report = network_filter.page_report(browser, "navigate_to_opus")
+
+    assert report == {"requests": 2, "blocked": 0, "from_cache": 1, "bytes_transferred": 2048, "bytes_from_cache": 0}
+
+
+def test_no_report_when_turned_off(monkeypatch):
+    monkeypatch.setattr(config, "NETWORK_REPORT", False)
+
+    browser = _Browser()
+    browser.request("page", 2048)
+
+    assert network_filter.page_report(browser, "navigate_to_opus") is None
+    assert browser.log
@@ -0,0 +1,41 @@
+"""--queue and --process run together"""
+
+import logging
+
+import pytest
+
+import main
+
+
+def test_failed_queue_run_is_raised_after_processing(monkeypatch):
+    processed = []
+
+    async def populate_queue(workqueue, feed):  # pylint: disable=unused-argument
+        raise ConnectionError("SharePoint is down")
+
+    async def process_workqueue(workqueue, feed):  # pylint: disable=unused-argument
+        processed.append(workqueue)
+
+    monkeypatch.setattr(main, "populate_queue", populate_queue)
+    monkeypatch.setattr(main, "process_workqueue", process_workqueue)
+
+    with pytest.raises(ConnectionError):
+        main.populate_and_process("workqueue")
+
+    assert processed == ["workqueue"]
+
+
+def test_failed_queue_run_is_logged_when_processing_fails(monkeypatch, caplog):
+    async def populate_queue(workqueue, feed):  # pylint: disable=unused-argument
+        raise ConnectionError("SharePoint is down")
+
+    async def process_workqueue(workqueue, feed):  # pylint: disable=unused-argument
+        raise RuntimeError("OPUS is down")
+
+    monkeypatch.setattr(main, "populate_queue", populate_queue)
+    monkeypatch.setattr(main, "process_workqueue", process_workqueue)
+
+    with caplog.at_level(logging.ERROR), pytest.raises(RuntimeError):
+        main.populate_and_process("workqueue")
+
+    assert "SharePoint is down" in caplog.text
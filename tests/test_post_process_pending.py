@@ -0,0 +1,62 @@
+"""Post processing put off by an open circuit, and retried once it closes"""
+
+import pytest
+
+from helpers import circuit_breaker, config, helper_functions, journal
+
+REFERENCE = "EGB-1"
+
+ITEM_DATA = {"uuid": "1234", "file_name": "Egenbefordring.xlsx"}
+
+
+@pytest.fixture
+def ats(tmp_path, monkeypatch):
+    """ATS that is down until the test brings it back, and a finalize step that records its calls."""
+
+    monkeypatch.setattr(config, "JOURNAL_PATH", str(tmp_path / "journal.jsonl"))
+    monkeypatch.setattr(journal, "_last_entries", None)
+
+    breaker = circuit_breaker.CircuitBreaker("ats", window=10, min_calls=1, failure_rate=0.5, open_seconds=60)
+
+    state = {"up": False, "updates": [], "finalized": []}
+
+    def update_work_item_data(item_reference, failed):
+        if not state["up"]:
+            raise circuit_breaker.CircuitOpenError(breaker)
+
+        state["updates"].append((item_reference, failed))
+
+    monkeypatch.setattr(helper_functions.ats_functions, "update_work_item_data", update_work_item_data)
+    monkeypatch.setattr(helper_functions.finalize_process, "finalize_process", lambda current_run_file_name: state["finalized"].append(current_run_file_name))
+
+    return state
+
+
+def test_open_circuit_leaves_the_post_processing_pending(ats):
+    journal.record(REFERENCE, "created")
+
+    with pytest.raises(circuit_breaker.CircuitOpenError):
+        helper_functions.handle_post_process(failed=True, item_data=ITEM_DATA, item_reference=REFERENCE)
+
+    # A new run reads the pending post processing back from the journal
+    journal.compact()
+    journal._last_entries = None  # pylint: disable=protected-access
+
+    assert journal.reached(REFERENCE, "created")
+    assert not journal.reached(REFERENCE, "reported")
+    [pending] = journal.pending_post_processing()
+
+    assert (pending["reference"], pending["failed"], pending["file_name"]) == (REFERENCE, True, "Egenbefordring.xlsx")
+
+    helper_functions.retry_pending_post_processing()
+
+    assert journal.last_stage(REFERENCE) == "post_process_pending"
+
+    ats["up"] = True
+
+    helper_functions.retry_pending_post_processing()
+
+    assert ats["updates"] == [(REFERENCE, True)]
+    assert ats["finalized"] == ["Egenbefordring.xlsx"]
+    assert journal.last_stage(REFERENCE) == "closed"
+    assert not journal.pending_post_processing()
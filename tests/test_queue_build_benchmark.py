@@ -0,0 +1,72 @@
+"""
+pytest-benchmark suite for the queue build stages, with the peak traced memory of each stage in extra_info.
+
+benchmarks/queue_build.py runs the same stages on larger sheets from the command line. Compare runs with
+    python -m pytest tests/test_queue_build_benchmark.py --benchmark-autosave --benchmark-compare
+"""
+
+import os
+
+import pytest
+
+from benchmarks import dataset, queue_build
+from benchmarks.fakes import FakeSharepoint
+from helpers import config, helper_functions
+from processes.queue_handler import iter_items_for_file, queue_item
+
+ROWS = 200
+
+
+@pytest.fixture(autouse=True)
+def environment(tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENORCHESTRATORKEY", os.getenv("OPENORCHESTRATORKEY", "benchmark-key"))
+    monkeypatch.setattr(config, "PATH", str(tmp_path))
+    monkeypatch.setattr(config, "ROW_FINGERPRINT_PATH", "")
+
+
+@pytest.fixture(scope="module")
+def sheet() -> bytes:
+    return dataset.workbook_bytes(dataset.iter_rows(ROWS, seed=0))
+
+
+@pytest.fixture
+def sharepoint(tmp_path, sheet):
+    fake = FakeSharepoint(root=str(tmp_path / "sharepoint"))
+    fake.upload_file_from_bytes(sheet, queue_build.FILE_NAME, config.FOLDER_NAME)
+
+    return fake
+
+
+def run_stage(benchmark, func):
+    """Time func with pytest-benchmark and note its peak traced memory."""
+
+    _, _, peak = queue_build._measure(func, memory=True)  # pylint: disable=protected-access
+
+    benchmark.extra_info["rows"] = ROWS
+    benchmark.extra_info["peak_mb"] = round(peak / 1024 / 1024, 1)
+
+    return benchmark.pedantic(func, rounds=3, iterations=1)
+
+
+@pytest.mark.benchmark(group="queue_build")
+def test_download_sheet(benchmark, sharepoint):
+    assert run_stage(benchmark, lambda: helper_functions.download_sheet(file_name=queue_build.FILE_NAME, sharepoint=sharepoint))
+
+
+@pytest.mark.benchmark(group="queue_build")
+def test_iter_approved_rows(benchmark, sheet):
+    assert run_stage(benchmark, lambda: list(helper_functions.iter_approved_rows(sheet)))
+
+
+@pytest.mark.benchmark(group="queue_build")
+def test_transform_rows(benchmark, sheet):
+    rows = list(helper_functions.iter_approved_rows(sheet))
+
+    items = run_stage(benchmark, lambda: [queue_item(row, queue_build.FILE_NAME) for row in helper_functions.transform_rows(rows, "AZ00000", queue_build.FILE_NAME)])
+
+    assert len(items) == len(rows)
+
+
+@pytest.mark.benchmark(group="queue_build")
+def test_streamed(benchmark, sharepoint):
+    assert run_stage(benchmark, lambda: sum(1 for _ in iter_items_for_file(queue_build.FILE_NAME, "AZ00000", sharepoint)))
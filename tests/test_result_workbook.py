@@ -0,0 +1,147 @@
+"""The worksheet XML writer against the openpyxl writer, on the same original workbooks"""
+
+import zipfile
+from io import BytesIO
+
+import pytest
+from openpyxl import load_workbook
+
+from helpers import result_workbook
+
+_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>
+<Override PartName="/xl/sharedStrings.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>
+</Types>"""
+
+_ROOT_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>
+</Relationships>"""
+
+_WORKBOOK = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<sheets><sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets>
+</workbook>"""
+
+_WORKBOOK_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>
+<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings" Target="sharedStrings.xml"/>
+</Relationships>"""
+
+
+def _s(ref: str, index: int) -> str:
+    return f'<c r="{ref}" t="s"><v>{index}</v></c>'
+
+
+def _n(ref: str, value) -> str:
+    return f'<c r="{ref}"><v>{value}</v></c>'
+
+
+def _inline(ref: str, text: str) -> str:
+    return f'<c r="{ref}" t="inlineStr"><is><t>{text}</t></is></c>'
+
+
+def workbook(rows: list[str], shared: list[str]) -> bytes:
+    """A minimal xlsx with the given <row> elements and shared strings."""
+
+    sheet = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+        + "".join(rows)
+        + "</sheetData></worksheet>"
+    )
+
+    strings = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f'<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" count="{len(shared)}" uniqueCount="{len(shared)}">'
+        + "".join(f"<si><t>{text}</t></si>" for text in shared)
+        + "</sst>"
+    )
+
+    buffer = BytesIO()
+
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        archive.writestr("_rels/.rels", _ROOT_RELS)
+        archive.writestr("xl/workbook.xml", _WORKBOOK)
+        archive.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+        archive.writestr("xl/worksheets/sheet1.xml", sheet)
+        archive.writestr("xl/sharedStrings.xml", strings)
+
+    return buffer.getvalue()
+
+
+def cells(data: bytes) -> list[tuple]:
+    ws = load_workbook(BytesIO(data)).active
+
+    return [tuple(row) for row in ws.iter_rows(values_only=True)]
+
+
+# Shared strings: 0 uuid, 1 navn, 2 behandlet_ok, 3 behandlet_fejl, 4 a-1, 5 Anna, 6 Bo, 7 Carl, 8 not-run
+SHARED = ["uuid", "navn", "behandlet_ok", "behandlet_fejl", "a-1", "Anna", "Bo", "Carl", "not-run"]
+
+HEADER = f'<row r="1" spans="1:4">{_s("A1", 0)}{_s("B1", 1)}{_s("C1", 2)}{_s("D1", 3)}</row>'
+
+ROWS = [
+    HEADER,
+    # A shared string uuid, with no result cells yet
+    f'<row r="2" spans="1:2">{_s("A2", 4)}{_s("B2", 5)}</row>',
+    # A numeric uuid
+    f'<row r="3" spans="1:2">{_n("A3", 123)}{_s("B3", 6)}</row>',
+    # A row without cells
+    '<row r="4"/>',
+    # An inline string uuid, with an empty result cell to replace
+    f'<row r="5" spans="1:3">{_inline("A5", "inline-1")}{_s("B5", 7)}<c r="C5"/></row>',
+    # A row the run did not process
+    f'<row r="6">{_s("A6", 8)}</row>',
+]
+
+EXCEL_ROWS = [
+    {"uuid": "a-1", "behandlet_ok": "x"},
+    {"uuid": 123, "behandlet_fejl": "x"},
+    {"uuid": "inline-1", "behandlet_ok": "x"},
+]
+
+
+def test_both_writers_mark_the_same_rows():
+    original = workbook(ROWS, SHARED)
+
+    from_xml = result_workbook._patch_xml(original, EXCEL_ROWS)  # pylint: disable=protected-access
+    from_openpyxl = result_workbook._patch_with_openpyxl(original, EXCEL_ROWS)  # pylint: disable=protected-access
+
+    assert from_xml is not None
+    assert cells(from_xml) == cells(from_openpyxl)
+    assert cells(from_xml) == [
+        ("uuid", "navn", "behandlet_ok", "behandlet_fejl"),
+        ("a-1", "Anna", "x", None),
+        (123, "Bo", None, "x"),
+        (None, None, None, None),
+        ("inline-1", "Carl", "x", None),
+        ("not-run", None, None, None),
+    ]
+
+
+def test_header_without_result_columns_falls_back_to_openpyxl():
+    header = f'<row r="1">{_s("A1", 0)}{_s("B1", 1)}</row>'
+    original = workbook([header, *ROWS[1:3]], SHARED)
+
+    assert result_workbook._patch_xml(original, EXCEL_ROWS) is None  # pylint: disable=protected-access
+
+    assert cells(result_workbook.patch_workbook(original, EXCEL_ROWS)) == [
+        ("uuid", "navn", "behandlet_ok", "behandlet_fejl"),
+        ("a-1", "Anna", "x", None),
+        (123, "Bo", None, "x"),
+    ]
+
+
+def test_header_without_uuid_is_an_error():
+    header = f'<row r="1">{_s("B1", 1)}{_s("C1", 2)}{_s("D1", 3)}</row>'
+    original = workbook([header, f'<row r="2">{_s("B2", 5)}</row>'], SHARED)
+
+    with pytest.raises(ValueError, match="no uuid column"):
+        result_workbook.patch_workbook(original, EXCEL_ROWS)
@@ -0,0 +1,32 @@
+"""Skipping the unchanged sheet rows in helpers/row_fingerprints.py"""
+
+import pytest
+
+from helpers import config, row_fingerprints
+
+PREFIX = "Egenbefordring"
+
+ROWS = [{"uuid": "1", "beloeb_i_alt": 10.0}, {"uuid": "2", "beloeb_i_alt": 20.0}]
+
+
+@pytest.fixture(autouse=True)
+def fingerprint_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "ROW_FINGERPRINT_PATH", str(tmp_path / "row_fingerprints.json"))
+    monkeypatch.setattr(row_fingerprints, "_fingerprints", None)
+    monkeypatch.setattr(row_fingerprints, "_pending", {})
+
+
+def kept(rows, queue_references):
+    return [row["uuid"] for row in row_fingerprints.filter_rows(rows, PREFIX, queue_references)]
+
+
+def test_unchanged_rows_are_skipped_only_while_their_item_is_queued():
+    assert kept(ROWS, set()) == ["1", "2"]
+
+    row_fingerprints.commit({f"{PREFIX}_1", f"{PREFIX}_2"})
+
+    # The item of row 2 was deleted from the queue, so the row is queued again
+    assert kept(ROWS, {f"{PREFIX}_1"}) == ["2"]
+
+    # A changed row is kept even while its item is queued
+    assert kept([{"uuid": "1", "beloeb_i_alt": 15.0}], {f"{PREFIX}_1"}) == ["1"]
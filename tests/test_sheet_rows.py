@@ -0,0 +1,60 @@
+"""The streamed sheet rows against the pandas based reading they replaced"""
+
+import os
+from io import BytesIO
+
+import pandas as pd
+import pytest
+
+from benchmarks import dataset
+from helpers import helper_functions
+
+
+@pytest.fixture(autouse=True)
+def encryption_key(monkeypatch):
+    monkeypatch.setenv("OPENORCHESTRATORKEY", os.getenv("OPENORCHESTRATORKEY", "test-key"))
+
+
+def pandas_rows(bytes_data: bytes) -> list[dict]:
+    """The approved rows as load_excel_data and process_data read them."""
+
+    df = pd.read_excel(BytesIO(bytes_data), dtype={column: str for column in helper_functions.TEXT_COLUMNS})
+
+    df = df[df["godkendt"].astype(str).str.lower().str.contains("x", na=False)]
+
+    return [row.to_dict() for _, row in df.iterrows()]
+
+
+def item_data(rows: list[dict]) -> list[str]:
+    """The item data transform_row formats, with the CPR number decrypted and each value's type."""
+
+    encryptor = helper_functions.Encryptor()
+
+    items = []
+
+    for row in rows:
+        item = helper_functions.transform_row(row, "AZ00000", "Egenbefordring.xlsx", encryptor)
+        item["cpr_encrypted"] = encryptor.decrypt(item["cpr_encrypted"].encode())
+
+        # Read as openpyxl gives the cells, see iter_approved_rows
+        del item["raw_excel_data"]
+
+        items.append(repr(item))
+
+    return items
+
+
+def test_streamed_rows_give_the_same_item_data_as_pandas():
+    rows = dataset.generate_rows(200, seed=5)
+
+    # A CPR number typed in as a number
+    rows[1]["cpr_nr"] = int(rows[1]["cpr_nr"])
+
+    # A whole number stored as a float in a column of mixed values
+    rows[2]["beloeb_i_alt"] = 250.0
+
+    bytes_data = dataset.workbook_bytes(rows)
+
+    expected = item_data(pandas_rows(bytes_data))
+
+    assert item_data(helper_functions.iter_approved_rows(bytes_data)) == expected
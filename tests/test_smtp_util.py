@@ -0,0 +1,152 @@
+"""SMTPClient against a local aiosmtpd server"""
+
+import smtplib
+import socket
+from email.message import EmailMessage
+
+import pytest
+from aiosmtpd.controller import Controller
+
+from helpers import config, smtp_util
+
+
+class _Inbox:
+    """aiosmtpd handler that keeps the delivered messages and refuses one recipient."""
+
+    REFUSED = "refused@example.com"
+
+    def __init__(self):
+        self.messages = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):  # pylint: disable=unused-argument
+        if address == self.REFUSED:
+            return "550 No such user"
+
+        envelope.rcpt_tos.append(address)
+
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):  # pylint: disable=unused-argument
+        self.messages.append(envelope)
+
+        return "250 Message accepted"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+
+        return s.getsockname()[1]
+
+
+def _message(receiver: str = "case@example.com", subject: str = "Test") -> EmailMessage:
+    msg = EmailMessage()
+    msg["to"] = receiver
+    msg["from"] = "robot@example.com"
+    msg["subject"] = subject
+    msg.set_content("Body")
+
+    return msg
+
+
+class _Server:
+    """A local SMTP server that can be restarted on the same port."""
+
+    def __init__(self):
+        self.inbox = _Inbox()
+        self.hostname = "127.0.0.1"
+        self.port = _free_port()
+        self.controller = None
+
+    def start(self):
+        self.controller = Controller(self.inbox, hostname=self.hostname, port=self.port)
+        self.controller.start()
+
+    def stop(self):
+        self.controller.stop()
+
+
+@pytest.fixture
+def server():
+    smtp_server = _Server()
+    smtp_server.start()
+
+    yield smtp_server
+
+    smtp_server.stop()
+
+
+@pytest.fixture
+def client(server, monkeypatch):
+    monkeypatch.setattr(config, "SMTP_MAX_RETRIES", 2)
+    monkeypatch.setattr(config, "SMTP_HEALTHCHECK_INTERVAL", 3600)
+
+    smtp_client = smtp_util.SMTPClient(server.hostname, server.port, starttls=False)
+
+    connections = []
+    connect = smtp_client._connect  # pylint: disable=protected-access
+
+    def counting_connect():
+        connections.append(1)
+
+        return connect()
+
+    monkeypatch.setattr(smtp_client, "_connect", counting_connect)
+
+    yield smtp_client, connections
+
+    smtp_client.close()
+
+
+def test_send_many_uses_one_connection(server, client):
+    inbox = server.inbox
+    smtp_client, connections = client
+
+    sent = smtp_client.send_many([_message(subject=f"Test {i}") for i in range(3)])
+
+    assert sent == 3
+    assert len(inbox.messages) == 3
+    assert len(connections) == 1
+
+
+def test_reconnects_after_the_server_drops_the_connection(server, client):
+    inbox = server.inbox
+    smtp_client, connections = client
+
+    smtp_client.send(_message())
+
+    # Restart the server on the same port, which drops the open session
+    server.stop()
+    server.start()
+
+    smtp_client.send(_message())
+
+    assert len(inbox.messages) == 2
+    assert len(connections) == 2
+
+
+def test_permanent_errors_are_not_retried(server, client):
+    inbox = server.inbox
+    smtp_client, connections = client
+
+    with pytest.raises(smtplib.SMTPRecipientsRefused):
+        smtp_client.send(_message(receiver=_Inbox.REFUSED))
+
+    assert not inbox.messages
+    assert len(connections) == 1
+
+
+def test_gives_up_after_the_retries(client, monkeypatch):
+    smtp_client, connections = client
+
+    def refuse():
+        connections.append(1)
+
+        raise ConnectionRefusedError("Connection refused")
+
+    monkeypatch.setattr(smtp_client, "_connect", refuse)
+
+    with pytest.raises(ConnectionRefusedError):
+        smtp_client.send(_message())
+
+    assert len(connections) == config.SMTP_MAX_RETRIES + 1
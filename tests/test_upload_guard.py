@@ -0,0 +1,40 @@
+"""Upload guard against the local SharePoint stand-in"""
+
+import pytest
+
+from benchmarks.fakes import FakeSharepoint
+from helpers import config, upload_guard
+
+
+class _FailingSharepoint(FakeSharepoint):
+    """Logs a failed upload instead of raising, like the Sharepoint client does."""
+
+    def upload_file_from_bytes(self, binary_content: bytes, file_name: str, folder_name: str):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def hash_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "PATH", str(tmp_path / "robot"))
+    monkeypatch.setattr(config, "UPLOAD_GUARD_VERIFY_REMOTE", False)
+    monkeypatch.setattr(upload_guard, "_hashes", None)
+
+
+def test_unchanged_content_is_skipped(tmp_path):
+    sharepoint = FakeSharepoint(root=str(tmp_path / "sharepoint"))
+
+    assert upload_guard.upload_file_from_bytes(sharepoint, b"content", "file.txt", "Behandlet")
+    assert not upload_guard.upload_file_from_bytes(sharepoint, b"content", "file.txt", "Behandlet")
+
+    assert sharepoint.uploads == 1
+
+
+def test_failed_upload_is_not_recorded(tmp_path):
+    root = str(tmp_path / "sharepoint")
+
+    assert not upload_guard.upload_file_from_bytes(_FailingSharepoint(root=root), b"content", "file.txt", "Behandlet")
+
+    sharepoint = FakeSharepoint(root=root)
+
+    assert upload_guard.upload_file_from_bytes(sharepoint, b"content", "file.txt", "Behandlet")
+    assert sharepoint.uploads == 1